@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import sys
+from src.config import Config
+from src.log import setup_logging
+from .corpus import PROFILES, build_corpus, corpus_spec
+from .harness import SUITES, compare, run_benchmarks
+
+def _print_report(report):
+    for warning in report["warnings"]:
+        print(f"Warning: {warning}, numbers may not be comparable")
+    if report["missing"]:
+        print(f"Not run: {len(report['missing'])} baseline cases, e.g. {', '.join(report['missing'][:3])}")
+    for title, findings in (("REGRESSION", report["regressions"]), ("improved", report["improvements"])):
+        for f in findings:
+            print(f"{title}: {f['name']} {f['metric']} {f['baseline']:.4g} -> {f['current']:.4g} "
+                  f"({f['change']:+.1%})")
+    for f in report["changes"]:
+        print(f"CHANGED: {f['name']} {f['metric']} {f['baseline']} -> {f['current']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark the extraction pipeline on a synthetic PDF corpus")
+    parser.add_argument("--weights", default=Config.MODEL_WEIGHTS_PATH,
+                       help="Local model weights file (default: $LAYOUT_MODEL_WEIGHTS); no network is used")
+    parser.add_argument("--corpus-dir", default="benchmark_corpus",
+                       help="Where the synthetic PDFs are built and cached")
+    parser.add_argument("--profile-pages", type=int, default=8,
+                       help="Pages of each text/tables/figures/scanned document")
+    parser.add_argument("--large-pages", type=int, default=2,
+                       help="Pages of the large-format document")
+    parser.add_argument("--sizes", default="1,100",
+                       help="Page counts of the mixed documents, e.g. 1,10,100,1000")
+    parser.add_argument("--documents", default=None,
+                       help="Comma-separated corpus documents to run, e.g. text-8,mixed-100 (default: all)")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                       help="Comma-separated suites: e2e (process_pdf) and stages (render, inference, crop)")
+    parser.add_argument("--repeat", type=int, default=1,
+                       help="Runs per case, the fastest is kept")
+    parser.add_argument("--threads", type=int, default=None,
+                       help="Torch threads (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                       help="Pages per inference batch (default: Config.BATCH_SIZE)")
+    parser.add_argument("--pipelined", action="store_true",
+                       help="Run the e2e suite with the pipelined executor")
+    parser.add_argument("--output-format", choices=["files", "manifest", "lazy"], default=None,
+                       help="Crop output format of the e2e suite (default: Config.OUTPUT_FORMAT)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                       help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=None,
+                       help="Saved results to compare against; exits with status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                       help="Tolerated relative slowdown before a regression is flagged")
+    parser.add_argument("--memory-threshold", type=float, default=0.20,
+                       help="Tolerated relative peak memory growth before a regression is flagged")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                       help="Log pipeline progress")
+    args = parser.parse_args()
+
+    if not args.weights or not os.path.exists(args.weights):
+        print("Error: benchmarks need a local weights file, pass --weights or set LAYOUT_MODEL_WEIGHTS.")
+        sys.exit(2)
+    suites = [suite for suite in args.suites.split(",") if suite]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        print(f"Error: unknown suites {sorted(unknown)}, expected {SUITES}")
+        sys.exit(2)
+    setup_logging("info" if args.verbose else None)
+    # Settle the network question before anything imports the hub
+    os.environ["HF_HUB_OFFLINE"] = "1"
+
+    spec = corpus_spec(profile_pages=args.profile_pages, large_pages=args.large_pages,
+                       sizes=[int(size) for size in args.sizes.split(",") if size])
+    if args.documents:
+        wanted = set(args.documents.split(","))
+        spec = [entry for entry in spec if entry[0] in wanted]
+        if not spec:
+            print(f"Error: no corpus documents match {args.documents}")
+            sys.exit(2)
+    print(f"Building corpus in {args.corpus_dir} ({len(spec)} documents, profiles: {', '.join(PROFILES)})")
+    documents = build_corpus(args.corpus_dir, spec)
+
+    options = {"batch_size": args.batch_size, "pipelined": args.pipelined or None,
+               "output_format": args.output_format}
+    results = run_benchmarks(documents, args.weights, suites=suites, repeat=args.repeat, threads=args.threads,
+                             options={k: v for k, v in options.items() if v is not None})
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report = compare(results, baseline, threshold=args.threshold, memory_threshold=args.memory_threshold)
+        _print_report(report)
+        if report["regressions"] or report["changes"]:
+            print(f"{len(report['regressions'])} regressions, {len(report['changes'])} output changes "
+                  f"against {args.baseline}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
@@ -0,0 +1,274 @@
+import hashlib
+import io
+import json
+import os
+import random
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+# Bump when the generators change so cached corpora are rebuilt
+CORPUS_VERSION = 1
+CORPUS_FILE = "corpus.json"
+
+LETTER = (612, 792)
+A1_LANDSCAPE = (2384, 1684)
+
+_WORDS = ("layout detection model page table figure caption section result method data value "
+          "analysis system document image region column text header footer measure report sample "
+          "process output input number series average total report design study feature").split()
+# Fixed metadata and no new file ID keep the bytes identical across builds
+_METADATA = {"title": "Synthetic benchmark document", "author": "benchmarks", "subject": "", "keywords": "",
+             "creator": "benchmarks.corpus", "producer": "PyMuPDF", "creationDate": "D:20240101000000Z",
+             "modDate": "D:20240101000000Z", "trapped": "", "format": "PDF 1.7", "encryption": None}
+
+def _sentence(rng, words):
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+def _paragraph(rng, sentences):
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+def _margins(page, rng, page_no):
+    """Running header and page number, present on every generated page"""
+    rect = page.rect
+    page.insert_text((54, 36), f"Synthetic report {rng.randint(1, 99)}", fontsize=8)
+    page.insert_text((rect.width / 2 - 10, rect.height - 28), str(page_no), fontsize=8)
+
+def _text_page(doc, rng, page_no, size=LETTER):
+    page = doc.new_page(width=size[0], height=size[1])
+    _margins(page, rng, page_no)
+    width, height = size
+    columns = rng.choice((1, 2))
+    gap = 18
+    column_width = (width - 108 - gap * (columns - 1)) / columns
+    page.insert_text((54, 80), _sentence(rng, 5).rstrip("."), fontsize=18)
+    for column in range(columns):
+        x0 = 54 + column * (column_width + gap)
+        y = 110
+        while y < height - 120:
+            if rng.random() < 0.25:
+                page.insert_text((x0, y + 12), _sentence(rng, 4).rstrip("."), fontsize=13)
+                y += 24
+            block = fitz.Rect(x0, y, x0 + column_width, min(y + rng.randint(80, 180), height - 60))
+            page.insert_textbox(block, _paragraph(rng, 8), fontsize=9.5)
+            y = block.y1 + 14
+    return page
+
+def _table(page, rng, rect, rows, cols):
+    """Ruled table with a header row and numeric cells"""
+    row_height = rect.height / rows
+    col_width = rect.width / cols
+    for r in range(rows + 1):
+        y = rect.y0 + r * row_height
+        page.draw_line((rect.x0, y), (rect.x1, y), width=1.2 if r in (0, 1, rows) else 0.4)
+    for c in range(cols + 1):
+        x = rect.x0 + c * col_width
+        page.draw_line((x, rect.y0), (x, rect.y1), width=0.4)
+    for r in range(rows):
+        for c in range(cols):
+            text = rng.choice(_WORDS).title() if r == 0 or c == 0 else f"{rng.uniform(0, 1000):.1f}"
+            page.insert_text((rect.x0 + c * col_width + 3, rect.y0 + (r + 0.7) * row_height), text,
+                             fontsize=min(9, row_height * 0.6))
+
+def _tables_page(doc, rng, page_no, size=LETTER):
+    page = doc.new_page(width=size[0], height=size[1])
+    _margins(page, rng, page_no)
+    width, height = size
+    y = 70
+    for _ in range(rng.randint(1, 3)):
+        rows, cols = rng.randint(5, 14), rng.randint(3, 7)
+        table_height = rows * 16
+        if y + table_height + 60 > height - 60:
+            break
+        page.insert_text((54, y + 12), f"Table {rng.randint(1, 20)}: {_sentence(rng, 6)}", fontsize=9)
+        _table(page, rng, fitz.Rect(54, y + 22, width - 54, y + 22 + table_height), rows, cols)
+        y += table_height + 40
+        page.insert_textbox(fitz.Rect(54, y, width - 54, y + 70), _paragraph(rng, 3), fontsize=9.5)
+        y += 84
+    return page
+
+def _raster(rng, width, height):
+    """Deterministic photo-like RGB image: gradients plus a few filled shapes"""
+    nprng = np.random.default_rng(rng.getrandbits(32))
+    yy, xx = np.mgrid[0:height, 0:width]
+    pixels = np.stack([(xx * 255 // max(width - 1, 1)), (yy * 255 // max(height - 1, 1)),
+                       np.full_like(xx, rng.randint(0, 255))], axis=-1).astype(np.float32)
+    for _ in range(6):
+        cx, cy, radius = nprng.integers(0, width), nprng.integers(0, height), nprng.integers(10, max(11, width // 3))
+        inside = (xx - cx) ** 2 + (yy - cy) ** 2 < radius ** 2
+        pixels[inside] = nprng.integers(0, 255, 3)
+    pixels += nprng.normal(0, 8, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+def _jpeg(image, quality=85):
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+def _bar_chart(page, rng, rect):
+    """Vector figure: axes and bars"""
+    page.draw_line((rect.x0, rect.y1), (rect.x1, rect.y1), width=1)
+    page.draw_line((rect.x0, rect.y0), (rect.x0, rect.y1), width=1)
+    bars = rng.randint(4, 10)
+    bar_width = rect.width / (bars * 1.5)
+    for i in range(bars):
+        top = rect.y1 - rect.height * rng.uniform(0.1, 0.95)
+        x0 = rect.x0 + bar_width * (0.5 + 1.5 * i)
+        page.draw_rect(fitz.Rect(x0, top, x0 + bar_width, rect.y1), color=(0, 0, 0),
+                       fill=(rng.random(), rng.random(), rng.random()))
+
+def _figures_page(doc, rng, page_no, size=LETTER):
+    page = doc.new_page(width=size[0], height=size[1])
+    _margins(page, rng, page_no)
+    width, height = size
+    y = 70
+    while y < height - 260:
+        figure_height = rng.randint(160, 260)
+        rect = fitz.Rect(90, y, width - 90, y + figure_height)
+        if rng.random() < 0.5:
+            page.insert_image(rect, stream=_jpeg(_raster(rng, int(rect.width), int(rect.height))))
+        else:
+            _bar_chart(page, rng, rect)
+        page.insert_text((90, rect.y1 + 16), f"Figure {rng.randint(1, 40)}: {_sentence(rng, 8)}", fontsize=9)
+        y = rect.y1 + 28
+        page.insert_textbox(fitz.Rect(54, y, width - 54, y + 60), _paragraph(rng, 2), fontsize=9.5)
+        y += 72
+    return page
+
+def _scanned_page(doc, rng, page_no, size=LETTER):
+    """A generated page rasterised, tilted and noised, with no text layer"""
+    source = fitz.open()
+    rng.choice((_text_page, _tables_page, _figures_page))(source, rng, page_no, size)
+    pix = source[0].get_pixmap(matrix=fitz.Matrix(150 / 72, 150 / 72), colorspace=fitz.csGRAY)
+    source.close()
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    image = image.rotate(rng.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=255)
+    nprng = np.random.default_rng(rng.getrandbits(32))
+    pixels = np.asarray(image, dtype=np.float32) * rng.uniform(0.85, 0.95) + nprng.normal(12, 10, (pix.height, pix.width))
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    page = doc.new_page(width=size[0], height=size[1])
+    page.insert_image(page.rect, stream=_jpeg(image, quality=70))
+    return page
+
+def _large_page(doc, rng, page_no, size=A1_LANDSCAPE):
+    """Poster-sized page: several columns of text, tables and figures"""
+    page = doc.new_page(width=size[0], height=size[1])
+    _margins(page, rng, page_no)
+    width, height = size
+    page.insert_text((72, 120), _sentence(rng, 6).rstrip("."), fontsize=54)
+    columns = 4
+    column_width = (width - 144 - 36 * (columns - 1)) / columns
+    for column in range(columns):
+        x0 = 72 + column * (column_width + 36)
+        y = 180
+        while y < height - 320:
+            kind = rng.choice(("text", "table", "figure"))
+            if kind == "text":
+                block = fitz.Rect(x0, y, x0 + column_width, y + 220)
+                page.insert_textbox(block, _paragraph(rng, 14), fontsize=14)
+            elif kind == "table":
+                block = fitz.Rect(x0, y + 20, x0 + column_width, y + 260)
+                _table(page, rng, block, rng.randint(6, 12), rng.randint(3, 5))
+            else:
+                block = fitz.Rect(x0, y, x0 + column_width, y + 260)
+                page.insert_image(block, stream=_jpeg(_raster(rng, int(block.width / 2), int(block.height / 2))))
+            y = block.y1 + 40
+    return page
+
+_GENERATORS = {"text": _text_page, "tables": _tables_page, "figures": _figures_page,
+               "scanned": _scanned_page, "large": _large_page}
+# Profiles a document can be built from; "mixed" cycles through the regular page types
+PROFILES = tuple(_GENERATORS) + ("mixed",)
+_MIXED = ("text", "tables", "figures", "text", "scanned")
+
+def build_document(path, profile, pages, seed=0):
+    """
+    Write one synthetic PDF
+
+    The same profile, page count and seed always produce the same bytes.
+
+    Args:
+        path (str): Output PDF path
+        profile (str): One of PROFILES
+        pages (int): Number of pages
+        seed (int): Seed of the generator
+
+    Returns:
+        str: path
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown corpus profile '{profile}', expected one of {PROFILES}")
+    # String seeds are hashed with SHA-512, independent of PYTHONHASHSEED
+    rng = random.Random(f"{profile}-{pages}-{seed}")
+    doc = fitz.open()
+    for page_no in range(1, pages + 1):
+        kind = _MIXED[(page_no - 1) % len(_MIXED)] if profile == "mixed" else profile
+        _GENERATORS[kind](doc, rng, page_no)
+    doc.set_metadata(_METADATA)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return path
+
+def corpus_spec(profile_pages=8, sizes=(1, 100), large_pages=2, seed=0):
+    """
+    Describe the default corpus
+
+    Args:
+        profile_pages (int): Pages of each single-profile document
+        sizes (tuple): Page counts of the mixed documents, e.g. (1, 10, 100, 1000)
+        large_pages (int): Pages of the large-format document
+        seed (int): Generator seed
+
+    Returns:
+        list: (name, profile, pages, seed) per document
+    """
+    spec = [(f"{profile}-{profile_pages}", profile, profile_pages, seed)
+            for profile in ("text", "tables", "figures", "scanned")]
+    spec.append((f"large-{large_pages}", "large", large_pages, seed))
+    spec.extend((f"mixed-{pages}", "mixed", pages, seed) for pages in sizes)
+    return spec
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_corpus(corpus_dir, spec):
+    """
+    Build the corpus, reusing documents already built with the same generator version
+
+    Args:
+        corpus_dir (str): Directory for the PDFs and corpus.json
+        spec (list): (name, profile, pages, seed) per document, see corpus_spec
+
+    Returns:
+        list: {"name", "path", "profile", "pages", "sha256"} per document, in spec order
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    index_path = os.path.join(corpus_dir, CORPUS_FILE)
+    index = {}
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("version") == CORPUS_VERSION:
+            index = saved["documents"]
+
+    documents = []
+    for name, profile, pages, seed in spec:
+        path = os.path.join(corpus_dir, f"{name}.pdf")
+        entry = index.get(name)
+        if not (entry and entry["profile"] == profile and entry["pages"] == pages and entry["seed"] == seed
+                and os.path.exists(path) and _sha256(path) == entry["sha256"]):
+            build_document(path, profile, pages, seed)
+            entry = {"profile": profile, "pages": pages, "seed": seed, "sha256": _sha256(path)}
+            index[name] = entry
+        documents.append({"name": name, "path": path, "profile": profile, "pages": pages,
+                          "sha256": entry["sha256"]})
+
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CORPUS_VERSION, "documents": index}, f, indent=2)
+    return documents
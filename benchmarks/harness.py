@@ -0,0 +1,251 @@
+import multiprocessing
+import os
+import platform
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+RESULTS_VERSION = 1
+SUITES = ("e2e", "stages")
+# Direction of every compared metric: +1 if larger is better, -1 if smaller is better
+COMPARED_METRICS = {"pages_per_second": 1, "latency_p50": -1, "latency_p95": -1, "peak_rss_bytes": -1}
+
+def _offline():
+    """Keep the Hugging Face hub from touching the network, the weights are local"""
+    os.environ["HF_HUB_OFFLINE"] = "1"
+
+def _latency_stats(latencies, wall_seconds=None):
+    latencies = np.asarray(latencies, dtype=np.float64)
+    total = wall_seconds if wall_seconds is not None else float(latencies.sum())
+    return {
+        "pages": int(latencies.size),
+        "wall_seconds": round(total, 6),
+        "pages_per_second": round(latencies.size / total, 4) if total else 0.0,
+        "latency_p50": round(float(np.percentile(latencies, 50)), 6) if latencies.size else None,
+        "latency_p95": round(float(np.percentile(latencies, 95)), 6) if latencies.size else None,
+    }
+
+def _count_files(*directories):
+    count = 0
+    for directory in directories:
+        for _, _, files in os.walk(directory):
+            count += len(files)
+    return count
+
+def _load_detector(settings):
+    from src.layout_detector import LayoutDetector
+    detector = LayoutDetector(device="cpu", weights_path=settings["weights_path"],
+                              detections_dir=os.path.join(settings["work_dir"], "detections"))
+    # Model loading and the first inference stay out of the measurements
+    detector.warm_up()
+    return detector
+
+def _run_e2e(document, settings):
+    """Run the whole document through process_pdf's page generator"""
+    import main
+    from src.config import Config
+    from src.metrics import PipelineMetrics, peak_rss_bytes
+
+    _load_detector(settings)
+    metrics = PipelineMetrics()
+    latencies = []
+    started = time.perf_counter()
+    for result in main.iter_process_pdf(document["path"], output_root=settings["work_dir"], device="cpu",
+                                        weights_path=settings["weights_path"], metrics=metrics,
+                                        **settings["options"]):
+        latencies.append(result.seconds)
+    wall = time.perf_counter() - started
+
+    pages_dir, entities_dir, _ = Config.output_dirs(settings["work_dir"])
+    summary = metrics.summary()
+    result = {"name": f"e2e/{document['name']}", "suite": "e2e", "document": document["name"]}
+    result.update(_latency_stats(latencies, wall))
+    result.update(peak_rss_bytes=peak_rss_bytes(), files=_count_files(pages_dir, entities_dir),
+                  bytes_written=summary["bytes_written"], stages=summary["stages"])
+    return [result]
+
+def _run_stages(document, settings):
+    """Time rendering, inference and cropping separately, one stage at a time"""
+    from src.config import Config
+    from src.entity_cropper import EntityCropper
+    from src.metrics import peak_rss_bytes
+    from src.pdf_processor import PDFProcessor
+
+    detector = _load_detector(settings)
+    batch_size = settings["options"].get("batch_size") or Config.BATCH_SIZE
+    entities_dir = os.path.join(settings["work_dir"], Config.DEFAULT_ENTITIES_DIR)
+    cropper = EntityCropper(entities_dir, output_format="files")
+    latencies = {"render": [], "inference": [], "crop": []}
+    with PDFProcessor() as processor:
+        page_numbers = list(range(1, processor.get_page_count(document["path"]) + 1))
+        # Pages go through in inference batches so only one batch of rasters is held
+        for start in range(0, len(page_numbers), batch_size):
+            batch = page_numbers[start:start + batch_size]
+            images = []
+            for page_num in batch:
+                started = time.perf_counter()
+                images.append(processor.render_page(document["path"], page_num))
+                latencies["render"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            detections = detector.detect_pages(images, batch_size=batch_size)
+            latencies["inference"].extend([(time.perf_counter() - started) / len(batch)] * len(batch))
+
+            for page_num, image, page_detections in zip(batch, images, detections):
+                started = time.perf_counter()
+                cropper.crop_entities_from_results(image, page_detections, page_num)
+                latencies["crop"].append(time.perf_counter() - started)
+                cropper.release_page(page_num)
+    cropper.close()
+
+    # Stages share the process, so they report the same peak
+    peak = peak_rss_bytes()
+    results = []
+    for stage, stage_latencies in latencies.items():
+        result = {"name": f"{stage}/{document['name']}", "suite": "stages", "document": document["name"]}
+        result.update(_latency_stats(stage_latencies))
+        result.update(peak_rss_bytes=peak, files=_count_files(entities_dir) if stage == "crop" else None)
+        results.append(result)
+    return results
+
+def _run_case(suite, document, settings):
+    """Entry point of the worker process running one benchmark case"""
+    _offline()
+    import torch
+    torch.set_num_threads(settings["threads"])
+    shutil.rmtree(settings["work_dir"], ignore_errors=True)
+    os.makedirs(settings["work_dir"], exist_ok=True)
+    try:
+        return (_run_e2e if suite == "e2e" else _run_stages)(document, settings)
+    finally:
+        shutil.rmtree(settings["work_dir"], ignore_errors=True)
+
+def environment(weights_path):
+    """Describe the machine and library versions, results only compare within one environment"""
+    import fitz
+    import torch
+    import ultralytics
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "ultralytics": ultralytics.__version__,
+        "pymupdf": fitz.VersionBind,
+        "weights": os.path.basename(weights_path),
+        "weights_bytes": os.path.getsize(weights_path),
+    }
+
+def run_benchmarks(documents, weights_path, suites=SUITES, repeat=1, threads=None, options=None,
+                   work_dir="benchmark_work"):
+    """
+    Run every suite on every document, each case in a fresh process
+
+    A fresh process per case keeps peak RSS and the model's warm state from
+    leaking between cases. With repeat > 1 the fastest run of a case is kept.
+
+    Args:
+        documents (list): Corpus entries from build_corpus
+        weights_path (str): Local model weights file, inference runs on CPU
+        suites (tuple): "e2e" (process_pdf end to end) and/or "stages" (render,
+            inference and crop on their own)
+        repeat (int): Runs per case
+        threads (int): Torch threads, defaults to the CPU count
+        options (dict): Extra iter_process_pdf arguments for the e2e suite, e.g. {"pipelined": True}
+        work_dir (str): Scratch directory for outputs, removed after every case
+
+    Returns:
+        dict: Results document with environment, settings and one entry per case and stage
+    """
+    settings = {"weights_path": os.path.abspath(weights_path), "threads": threads or os.cpu_count() or 1,
+                "options": dict(options or {}), "work_dir": os.path.abspath(work_dir)}
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for document in documents:
+        for suite in suites:
+            runs = []
+            for _ in range(max(1, repeat)):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    runs.append(pool.submit(_run_case, suite, document, settings).result())
+            # Keep the fastest run of every result of the case
+            for index in range(len(runs[0])):
+                results.append(max((run[index] for run in runs), key=lambda r: r["pages_per_second"]))
+            for result in results[-len(runs[0]):]:
+                print(format_result(result))
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(weights_path),
+        "settings": {"threads": settings["threads"], "repeat": repeat, "suites": list(suites),
+                     "options": settings["options"]},
+        "corpus": [{k: d[k] for k in ("name", "profile", "pages", "sha256")} for d in documents],
+        "results": results,
+    }
+
+def format_result(result):
+    """One report line for a result"""
+    line = (f"{result['name']:<28} {result['pages']:>5} pages  {result['pages_per_second']:>8.2f} pages/s  "
+            f"p50 {result['latency_p50'] * 1000:>8.1f} ms  p95 {result['latency_p95'] * 1000:>8.1f} ms")
+    if result.get("peak_rss_bytes"):
+        line += f"  peak {result['peak_rss_bytes'] / 1e6:>6.0f} MB"
+    if result.get("files") is not None:
+        line += f"  {result['files']} files"
+    return line
+
+def compare(current, baseline, threshold=0.10, memory_threshold=0.20):
+    """
+    Compare results against a baseline
+
+    Throughput and latencies regress when they are more than threshold worse,
+    peak memory when it is more than memory_threshold higher. A different
+    number of output files means the output changed and is reported too.
+
+    Args:
+        current (dict): Results from run_benchmarks
+        baseline (dict): Saved results to compare against
+        threshold (float): Tolerated relative slowdown
+        memory_threshold (float): Tolerated relative peak memory growth
+
+    Returns:
+        dict: "regressions", "improvements" and "changes" (lists of findings), "missing"
+            (cases only in the baseline) and "warnings" (reasons the runs may not be comparable)
+    """
+    report = {"regressions": [], "improvements": [], "changes": [], "missing": [], "warnings": []}
+    if current.get("environment") != baseline.get("environment"):
+        report["warnings"].append("environment differs from the baseline")
+    # A run of a subset of suites or documents still compares with a full baseline
+    for key in ("threads", "repeat", "options"):
+        if current["settings"].get(key) != baseline["settings"].get(key):
+            report["warnings"].append(f"setting {key} differs from the baseline")
+    baseline_corpus = {d["name"]: d["sha256"] for d in baseline.get("corpus", [])}
+    for document in current.get("corpus", []):
+        if baseline_corpus.get(document["name"], document["sha256"]) != document["sha256"]:
+            report["warnings"].append(f"corpus document {document['name']} differs from the baseline")
+
+    baseline_results = {r["name"]: r for r in baseline["results"]}
+    current_names = set()
+    for result in current["results"]:
+        current_names.add(result["name"])
+        before = baseline_results.get(result["name"])
+        if before is None:
+            continue
+        for metric, direction in COMPARED_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            limit = memory_threshold if metric == "peak_rss_bytes" else threshold
+            finding = {"name": result["name"], "metric": metric, "baseline": old, "current": new,
+                       "change": round(change, 4)}
+            if change * direction < -limit:
+                report["regressions"].append(finding)
+            elif change * direction > limit:
+                report["improvements"].append(finding)
+        if before.get("files") != result.get("files"):
+            report["changes"].append({"name": result["name"], "metric": "files",
+                                      "baseline": before.get("files"), "current": result.get("files")})
+    report["missing"] = sorted(set(baseline_results) - current_names)
+    return report
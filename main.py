@@ -1,118 +1,588 @@
 import argparse
+import asyncio
+import glob
+import itertools
 import os
-import time
-from src.pdf_processor import PDFProcessor
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
 from src.layout_detector import LayoutDetector
 from src.entity_cropper import EntityCropper
+from src.detections import DetectionFilter
+from src.crop_cache import LazyCropSource
+from src.batch_runner import collect_documents, run_batch
+from src.checkpoint import CheckpointJournal
+from src.entity_store import EntityStore
+from src.log import get_logger, setup_logging
+from src.memory_budget import MemoryBudget, parse_size
+from src.metrics import PipelineMetrics, format_summary, start_metrics_server
+from src.pipeline import PageExtractor, PageResult
+from src.overlay import OverlayRenderer
+from src.page_selection import StopCondition, parse_page_ranges, select_pages
+from src.page_triage import PageTriage
+from src.result_cache import hash_file, settings_fingerprint
+from src.workspace import JobWorkspace
 from src.utils import get_image_files, clear_directory, setup_environment
 
-def process_pdf(pdf_path, clear_existing=True, progress_callback=None):
+logger = get_logger("main")
+
+def iter_process_pdf(pdf_path, clear_existing=True, render_backend=None,
+                save_page_images=None, batch_size=None, two_pass=None, pipelined=None,
+                queue_depth=None, device=None, weights_path=None, backend=None, int8=None,
+                use_cache=None, output_root=None, workspace=None, output_format=None,
+                include_classes=None, exclude_classes=None, min_confidence=None, min_area=None,
+                min_area_fraction=None, crop_format=None, crop_quality=None, resume=False,
+                retry_failed=False, pages=None, first_pages=None, every=None, max_entities=None,
+                time_budget=None, skip_blank=None, dedup_pages=None, text_fast_path=None,
+                attach_text=None, tiling=None, max_memory=None, checkpoint=None, metrics=None,
+                trace=False):
     """
-    Process a PDF file to extract layout entities page by page
+    Process a PDF file and yield each page's entities as soon as the page is done
+    
+    Nothing is accumulated across pages, so memory stays flat on long
+    documents. Closing the generator early (e.g. breaking out of the loop
+    after the first table) stops before the remaining pages are rendered.
     
     Args:
         pdf_path (str): Path to the PDF file
         clear_existing (bool): Whether to clear existing output directories
-        progress_callback (callable): Optional callback function for progress updates
+        render_backend (str): Page rendering backend, defaults to Config.RENDER_BACKEND
+        save_page_images (bool): Also write rendered pages to disk, defaults to Config.SAVE_PAGE_IMAGES
+        batch_size (int): Pages per inference batch, defaults to Config.BATCH_SIZE
+        two_pass (bool): Detect on a page rendered at Config.IMAGE_SIZE and re-render only
+            detected regions at full resolution, defaults to Config.TWO_PASS_RENDER
+        pipelined (bool): Overlap rendering, inference and crop encoding in concurrent
+            stages, defaults to Config.PIPELINED
+        queue_depth (int): Maximum pages in flight in pipelined mode, defaults to Config.QUEUE_DEPTH
+        device (str): Torch device for inference, defaults to Config.MODEL_DEVICE
+        weights_path (str): Local model weights file, defaults to Config.MODEL_WEIGHTS_PATH
+        backend (str): Inference backend (torch, onnx, openvino), defaults to Config.INFERENCE_BACKEND
+        int8 (bool): Use an INT8 quantized export, defaults to Config.QUANTIZE_INT8
+        use_cache (bool): Reuse detections and crops cached from earlier runs of the same
+            document and settings, defaults to Config.RESULT_CACHE_ENABLED
+        output_root (str): Directory to place output_pages/, cropped_entities/ and
+            detections/ under, defaults to the working directory
+        workspace (JobWorkspace): Isolated job workspace to write all outputs to; takes
+            precedence over output_root and makes concurrent runs safe
+        output_format (str): "files" for one JPEG per entity, "manifest" for a single
+            manifest with packed crop shards, or "lazy" for a manifest whose crops are
+            rendered from the PDF on first access, defaults to Config.OUTPUT_FORMAT
+        include_classes (list): Only crop these classes, defaults to Config.INCLUDE_CLASSES
+        exclude_classes (list): Never crop these classes, defaults to Config.EXCLUDE_CLASSES
+        min_confidence (dict): Per-class minimum confidence, defaults to Config.CLASS_MIN_CONFIDENCE
+        min_area (dict): Per-class minimum box area as a fraction of the page area,
+            defaults to Config.CLASS_MIN_AREA
+        min_area_fraction (float): Minimum box area for every other class, defaults to
+            Config.MIN_AREA_FRACTION
+        crop_format (str): Crop codec (jpeg, png, webp, npy), defaults to Config.CROP_FORMAT
+        crop_quality (int): jpeg/webp quality, defaults to Config.CROP_QUALITY
+        resume (bool): Continue an interrupted run from its checkpoint journal, skipping
+            finished pages and keeping their outputs; starts a journal when there is none,
+            so a run started with resume=True can itself be resumed
+        retry_failed (bool): Only re-run the pages the checkpoint journal recorded as failed
+        pages (str | list): Pages to process, e.g. "1-5,40,90-95" or [1, 2, 3];
+            defaults to every page
+        first_pages (int): Only process the first N selected pages
+        every (int): Only process every k-th selected page
+        max_entities (int | dict): Stop once any class reaches this many entities, or a
+            listed class its own count, e.g. {"Table": 10}
+        time_budget (float): Stop starting new pages after this many seconds
+        skip_blank (bool): Skip blank pages before inference, defaults to Config.SKIP_BLANK_PAGES
+        dedup_pages (bool): Reuse detections for near-duplicate pages, defaults to Config.DEDUP_PAGES
+        text_fast_path (bool): Take detections of trivial born-digital pages from the text
+            layer instead of the model, defaults to Config.TEXT_FAST_PATH
+        attach_text (bool): Store the text-layer text inside every box with the crop
+            metadata, defaults to Config.ATTACH_TEXT
+        tiling (bool): Detect on overlapping tiles of very wide or very large pages,
+            defaults to Config.TILING_ENABLED
+        max_memory (int | str): Memory budget of the process, e.g. "2GB"; pages are rendered
+            at a lower DPI where their rasters would not fit, and pipelined prefetch waits
+            for free memory; defaults to Config.MAX_MEMORY (no budget)
+        checkpoint (bool): Journal every page even without resume or retry_failed, e.g. to
+            draw overlays afterwards, defaults to Config.CHECKPOINT_ENABLED
+        metrics (PipelineMetrics): Collects per-stage timings, bytes written and memory use
+            for the document; a new one is used when omitted, each PageResult carries
+            its page's share either way
+        trace (bool): Write a Chrome trace of every stage to Config.TRACE_FILE in the
+            output root
         
-    Returns:
-        dict: All extracted entities by type with page numbers
+    Yields:
+        PageResult: One result per successfully processed page, in page order; when
+            resuming, pages finished by the earlier run are yielded first from the journal
     """
+    if workspace is not None:
+        workspace.touch()
+        output_root = workspace.root
+    if max_memory is None:
+        max_memory = Config.MAX_MEMORY
+    max_memory = parse_size(max_memory) if max_memory else None
+    
     # Setup environment
-    setup_environment()
+    setup_environment(output_root)
+    pages_dir, entities_dir, detections_dir = Config.output_dirs(output_root)
     
-    # Clear existing files if requested
-    if clear_existing:
-        from src.config import Config
-        clear_directory(Config.DEFAULT_OUTPUT_DIR)
-        clear_directory(Config.DEFAULT_ENTITIES_DIR)
-        clear_directory(Config.DEFAULT_DETECTIONS_DIR)
+    # Clear existing files if requested, a resumed run keeps them
+    if clear_existing and not (resume or retry_failed):
+        clear_directory(pages_dir)
+        clear_directory(entities_dir)
+        clear_directory(detections_dir)
+    
+    if save_page_images is None:
+        save_page_images = Config.SAVE_PAGE_IMAGES
+    if two_pass is None:
+        two_pass = Config.TWO_PASS_RENDER
+    if pipelined is None:
+        pipelined = Config.PIPELINED
+    if int8 is None:
+        int8 = Config.QUANTIZE_INT8
+    if use_cache is None:
+        use_cache = Config.RESULT_CACHE_ENABLED
+    if checkpoint is None:
+        checkpoint = Config.CHECKPOINT_ENABLED
+    # The result cache and the checkpoint journal key on the same content hash,
+    # read the PDF for it once
+    doc_hash = hash_file(pdf_path) if use_cache or checkpoint or resume or retry_failed else None
+    if metrics is None:
+        metrics = PipelineMetrics(trace=trace)
+    elif trace:
+        metrics.trace = True
     
     # Initialize components
-    pdf_processor = PDFProcessor()
-    layout_detector = LayoutDetector()
-    entity_cropper = EntityCropper()
+    # The detector shares one warm model per weights/device across calls
+    layout_detector = LayoutDetector(device=device or Config.MODEL_DEVICE,
+                                     weights_path=weights_path or Config.MODEL_WEIGHTS_PATH,
+                                     backend=backend or Config.INFERENCE_BACKEND,
+                                     int8=int8,
+                                     detections_dir=detections_dir)
+    memory_budget = None
+    if max_memory:
+        # The budget left for page rasters is measured with the model loaded
+        layout_detector.warm_up()
+        memory_budget = MemoryBudget(max_memory, pages_per_batch=batch_size or Config.BATCH_SIZE)
+        logger.info("Memory budget %d MB, %d MB for page rasters", max_memory // 2 ** 20,
+                    memory_budget.raster_bytes // 2 ** 20)
+    output_format = output_format or Config.OUTPUT_FORMAT
+    detection_filter = DetectionFilter(
+        include_classes=include_classes if include_classes is not None else Config.INCLUDE_CLASSES,
+        exclude_classes=exclude_classes if exclude_classes is not None else Config.EXCLUDE_CLASSES,
+        min_confidence=min_confidence if min_confidence is not None else Config.CLASS_MIN_CONFIDENCE,
+        min_area=min_area if min_area is not None else Config.CLASS_MIN_AREA,
+        default_min_area=min_area_fraction if min_area_fraction is not None else Config.MIN_AREA_FRACTION
+    )
+    entity_cropper = EntityCropper(entities_dir, output_format=output_format,
+                                   detection_filter=detection_filter,
+                                   crop_format=crop_format or Config.CROP_FORMAT,
+                                   quality=crop_quality or Config.CROP_QUALITY,
+                                   metrics=metrics)
+    if output_format == "lazy" or (output_format == "manifest" and not Config.MANIFEST_PACK_CROPS):
+        # Crops without a shard are re-rendered from this PDF, so it must outlive the run
+        LazyCropSource.write_source(entities_dir, pdf_path, Config.RENDER_DPI,
+                                    render_backend or Config.RENDER_BACKEND)
+    extractor = PageExtractor(
+        pdf_path, layout_detector, entity_cropper,
+        render_backend=render_backend or Config.RENDER_BACKEND,
+        batch_size=batch_size or Config.BATCH_SIZE,
+        two_pass=two_pass,
+        save_page_images=save_page_images,
+        pages_dir=pages_dir,
+        queue_depth=queue_depth or Config.QUEUE_DEPTH,
+        use_cache=use_cache,
+        triage=PageTriage(skip_blank=Config.SKIP_BLANK_PAGES if skip_blank is None else skip_blank,
+                          dedup=Config.DEDUP_PAGES if dedup_pages is None else dedup_pages),
+        text_fast_path=Config.TEXT_FAST_PATH if text_fast_path is None else text_fast_path,
+        attach_text=Config.ATTACH_TEXT if attach_text is None else attach_text,
+        tiling=Config.TILING_ENABLED if tiling is None else tiling,
+        metrics=metrics,
+        memory_budget=memory_budget,
+        doc_hash=doc_hash
+    )
     
     # Convert PDF to images one page at a time
-    print(f"Processing PDF: {os.path.basename(pdf_path)}")
+    logger.info("Processing PDF: %s", os.path.basename(pdf_path))
     
     # Get total number of pages first
-    total_pages = pdf_processor.get_page_count(pdf_path)
-    print(f"Total pages to process: {total_pages}")
+    total_pages = extractor.get_page_count()
+    logger.info("Total pages to process: %d", total_pages)
+    
+    # Journal every page so an interrupted run can be resumed; hashing the PDF and
+    # syncing a record per page is only paid for when asked for
+    journal = None
+    if checkpoint or resume or retry_failed:
+        journal = CheckpointJournal(
+            CheckpointJournal.path_for(output_root), doc_hash,
+            settings_fingerprint(**layout_detector.settings(), two_pass=two_pass, output_format=output_format,
+                                 crop_format=entity_cropper.crop_format, filter=detection_filter.settings(),
+                                 text_fast_path=extractor.text_fast_path, attach_text=extractor.attach_text,
+                                 tiling=extractor.tiling, **({"max_memory": max_memory} if max_memory else {})),
+            pdf_path=pdf_path
+        )
+        extractor.journal = journal
+    selected = select_pages(total_pages, pages, first_pages, every)
+    if len(selected) < total_pages:
+        logger.info("Selected %d of %d pages", len(selected), total_pages)
+    completed = []
+    if journal is not None:
+        if journal.start(resume=resume or retry_failed):
+            completed = journal.completed_pages()
+        if resume or retry_failed:
+            # Outputs of pages the journal has not recorded as done may be partial,
+            # drop them before those pages are written again
+            removed = entity_cropper.trim_pages(completed)
+            if removed:
+                logger.info("Removed %d entities of unfinished pages", removed)
+    selected_set = set(selected)
+    completed = [p for p in completed if p in selected_set]
+    if retry_failed:
+        page_numbers = [p for p in journal.failed_pages() if p in selected_set]
+    else:
+        done = set(completed)
+        page_numbers = [p for p in selected if p not in done]
+    if completed:
+        logger.info("Resuming: %d pages already done, %d to process", len(completed), len(page_numbers))
+    
+    stop_condition = StopCondition(max_entities, time_budget)
+    page_results = extractor.iter_pipelined(page_numbers) if pipelined else extractor.iter_serial(page_numbers)
+    
+    try:
+        replayed = (PageResult(page_num, total_pages, journal.entities(page_num),
+                               journal.detections(page_num), 0.0) for page_num in completed)
+        for result in itertools.chain(replayed, page_results):
+            entity_cropper.release_page(result.page_num)
+            stop_reason = stop_condition.update(result.entities) if stop_condition.active else None
+            yield result
+            if stop_reason:
+                # Closing the stage iterator below stops the pages still in flight
+                logger.info("Stopping early after page %d: %s", result.page_num, stop_reason)
+                return
+        
+        failed = journal.failed_pages() if journal is not None else {}
+        if failed:
+            logger.warning("%d pages failed, re-run them with --retry-failed", len(failed))
+            for page_num, error in failed.items():
+                logger.warning("  page %d: %s", page_num, error)
+    finally:
+        page_results.close()
+        extractor.close()
+        entity_cropper.close()
+        metrics.finish()
+        if metrics.trace:
+            trace_path = metrics.write_trace(os.path.join(output_root or "", Config.TRACE_FILE))
+            logger.info("Wrote stage trace to %s", trace_path)
+
+async def aiter_process_pdf(pdf_path, **options):
+    """
+    Async variant of iter_process_pdf
     
-    all_entities = {}
+    Pages are processed on a worker thread so the event loop stays free.
     
-    # Process each page one by one
-    for page_num in range(1, total_pages + 1):
-        start_time = time.time()
-        print(f"\n=== Processing Page {page_num}/{total_pages} ===")
+    Args:
+        pdf_path (str): Path to the PDF file
+        **options: Any iter_process_pdf keyword argument
         
-        try:
-            # Convert current page to image
-            print(f"Converting page {page_num} to image...")
-            img_path = pdf_processor.convert_pdf_page_to_image(pdf_path, page_num)
-            
-            if not img_path or not os.path.exists(img_path):
-                print(f"Warning: Failed to convert page {page_num} to image")
-                continue
-                
-            # Detect layout using YOLO
-            print("Detecting layout...")
-            results = layout_detector.detect_layout(img_path, save=True)
-            
-            # Crop entities from the current page
-            print("Cropping entities...")
-            entity_cropper.crop_entities_from_results(img_path, results, page_num)
-            
-            # Get entities for current page
-            page_entities = entity_cropper.get_entities_by_page(page_num)
-            
-            # Update all entities
-            for entity_type, files in page_entities.items():
-                if entity_type not in all_entities:
-                    all_entities[entity_type] = []
-                all_entities[entity_type].extend(files)
-            
-            # Calculate and print stats for current page
-            page_processing_time = time.time() - start_time
-            items_count = sum(len(files) for files in page_entities.values())
-            print(f"Page {page_num} completed in {page_processing_time:.2f} seconds")
-            print(f"Extracted {items_count} items from page {page_num}")
-            
-            # Call progress callback if provided (for Streamlit)
-            if progress_callback:
-                progress_callback({
-                    'current_page': page_num,
-                    'total_pages': total_pages,
-                    'items_extracted': items_count,
-                    'page_entities': page_entities,
-                    'all_entities': all_entities
-                })
-                
-        except Exception as e:
-            print(f"Error processing page {page_num}: {str(e)}")
-    
-    # Print final summary
-    print("\n=== FINAL EXTRACTION SUMMARY ===")
+    Yields:
+        PageResult: One result per successfully processed page, in page order
+    """
+    loop = asyncio.get_running_loop()
+    # One thread drives the generator, its stages keep thread-local document handles
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="process-pdf")
+    pages = iter_process_pdf(pdf_path, **options)
+    try:
+        while True:
+            result = await loop.run_in_executor(executor, next, pages, None)
+            if result is None:
+                break
+            yield result
+    finally:
+        await loop.run_in_executor(executor, pages.close)
+        executor.shutdown(wait=False)
+
+def process_pdf(pdf_path, clear_existing=True, progress_callback=None, **options):
+    """
+    Process a PDF file to extract layout entities page by page
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        clear_existing (bool): Whether to clear existing output directories
+        progress_callback (callable): Optional callback function for progress updates
+        **options: Any iter_process_pdf keyword argument; pass metrics=PipelineMetrics()
+            to read the stage timings after the call
+        
+    Returns:
+        EntityStore: All extracted entities by type, in page order; a read-only mapping
+            that spills to its own SQLite file in the output root (the temp directory
+            without one) on long documents; close() it to delete that file
+    """
+    output_root = options["workspace"].root if options.get("workspace") else options.get("output_root")
+    all_entities = EntityStore(output_root, max_in_memory=Config.ENTITY_STORE_MAX_IN_MEMORY)
+    triaged = {"blank": 0, "duplicate": 0, "text_layer": 0}
+    metrics = options.pop("metrics", None) or PipelineMetrics()
+    for result in iter_process_pdf(pdf_path, clear_existing=clear_existing, metrics=metrics, **options):
+        page_num, page_entities = result.page_num, result.entities
+        if result.triage:
+            triaged[result.triage] += 1
+        
+        # Update all entities
+        all_entities.add(page_entities)
+        
+        # Log stats for current page
+        items_count = result.items_count
+        logger.info("Page %d completed in %.2f seconds, extracted %d items", page_num, result.seconds, items_count)
+        if result.metrics is not None:
+            logger.debug("Page %d: %s", page_num, format_summary(result.metrics))
+        
+        # Call progress callback if provided (for Streamlit); all_entities is the
+        # store itself, entity_counts reads nothing back from disk
+        if progress_callback:
+            progress_callback({
+                'current_page': page_num,
+                'total_pages': result.total_pages,
+                'items_extracted': items_count,
+                'page_entities': page_entities,
+                'all_entities': all_entities,
+                'entity_counts': all_entities.counts()
+            })
+    
+    # Log final summary
     total_items = 0
-    for entity_type, files in all_entities.items():
-        count = len(files)
+    for entity_type, count in all_entities.counts().items():
         total_items += count
-        print(f"{entity_type}: {count} items")
+        logger.info("%s: %d items", entity_type, count)
     
-    print(f"\nTotal items extracted: {total_items}")
+    logger.info("Total items extracted: %d", total_items)
+    if any(triaged.values()):
+        logger.info("Skipped blank pages: %d, duplicate pages (detections reused): %d, "
+                    "pages taken from the text layer: %d",
+                    triaged["blank"], triaged["duplicate"], triaged["text_layer"])
+    logger.info("Stages: %s", format_summary(metrics.summary()))
     return all_entities
 
+def render_overlays(output_root=None, pages=None):
+    """
+    Draw annotated detection images for pages of a finished run
+    
+    Args:
+        output_root (str): Output root of the run, defaults to the working directory
+        pages (str | list): Pages to draw, e.g. "1-5,40"; defaults to every page
+        
+    Returns:
+        list: Paths of the overlay images
+    """
+    renderer = OverlayRenderer(output_root)
+    try:
+        available = renderer.pages()
+        selected = parse_page_ranges(pages, max(available, default=0)) if pages else available
+        return [renderer.render(page_num) for page_num in selected if page_num in available]
+    finally:
+        renderer.close()
+
+def parse_class_values(values, flag):
+    """Parse repeated CLASS=VALUE arguments into a dict of floats"""
+    parsed = {}
+    for value in values or []:
+        cls_name, sep, number = value.partition("=")
+        if not sep:
+            raise SystemExit(f"Error: {flag} expects CLASS=VALUE, got '{value}'")
+        parsed[cls_name] = float(number)
+    return parsed
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Document Layout Analysis Pipeline")
-    parser.add_argument("pdf_path", help="Path to the PDF file to process")
+    parser.add_argument("pdf_path", nargs="+",
+                       help="PDF file to process; several files, directories, glob patterns "
+                            "or manifest files switch to batch mode")
     parser.add_argument("--keep-existing", action="store_true", 
                        help="Keep existing output files instead of clearing them")
+    parser.add_argument("--render-backend", choices=["pymupdf", "pdf2image"], default=None,
+                       help="Page rendering backend (default: Config.RENDER_BACKEND)")
+    parser.add_argument("--save-pages", action="store_true",
+                       help="Also write rendered page images to the output directory (debug)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                       help="Pages per inference batch (default: Config.BATCH_SIZE)")
+    parser.add_argument("--two-pass", action="store_true",
+                       help="Detect on low-resolution pages and re-render only detected regions at full DPI")
+    parser.add_argument("--pipelined", action="store_true",
+                       help="Run rendering, inference and crop encoding as concurrent stages")
+    parser.add_argument("--queue-depth", type=int, default=None,
+                       help="Maximum pages in flight in pipelined mode (default: Config.QUEUE_DEPTH)")
+    parser.add_argument("--weights", default=None,
+                       help="Local model weights file, skips the Hugging Face hub (offline use)")
+    parser.add_argument("--device", default=None,
+                       help="Torch device for inference, e.g. cpu or cuda:0")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default=None,
+                       help="Inference backend (default: Config.INFERENCE_BACKEND)")
+    parser.add_argument("--int8", action="store_true",
+                       help="Use an INT8 quantized export of the onnx/openvino backend; openvino "
+                            "calibrates on Config.INT8_CALIBRATION_DATA, which must be set")
+    parser.add_argument("--cache", action="store_true",
+                       help="Reuse cached detections and crops for previously processed pages")
+    parser.add_argument("--output-format", choices=["files", "manifest", "lazy"], default=None,
+                       help="One file per entity, a single manifest with packed crops, or a "
+                            "manifest whose crops are rendered on first access "
+                            "(default: Config.OUTPUT_FORMAT)")
+    parser.add_argument("--crop-format", choices=["jpeg", "png", "webp", "npy"], default=None,
+                       help="Codec for saved crops (default: Config.CROP_FORMAT)")
+    parser.add_argument("--crop-quality", type=int, default=None,
+                       help="jpeg/webp crop quality (default: Config.CROP_QUALITY)")
+    parser.add_argument("--include-classes", default=None,
+                       help="Comma-separated classes to crop, e.g. Table,Picture (default: all)")
+    parser.add_argument("--exclude-classes", default=None,
+                       help="Comma-separated classes never to crop, e.g. Page-header,Page-footer")
+    parser.add_argument("--min-confidence", action="append", metavar="CLASS=VALUE",
+                       help="Per-class minimum confidence, may be repeated")
+    parser.add_argument("--min-area", action="append", metavar="[CLASS=]FRACTION",
+                       help="Minimum box area as a fraction of the page area, for every class "
+                            "or per class with CLASS=FRACTION; may be repeated")
+    parser.add_argument("--resume", action="store_true",
+                       help="Continue an interrupted run from its checkpoint, skipping finished pages; "
+                            "also start the checkpoint, so pass it to the first run too")
+    parser.add_argument("--retry-failed", action="store_true",
+                       help="Only re-run pages the checkpoint recorded as failed")
+    parser.add_argument("--pages", default=None,
+                       help="Pages to process, e.g. 1-5,40,90-95 (default: all)")
+    parser.add_argument("--first-pages", type=int, default=None,
+                       help="Only process the first N selected pages")
+    parser.add_argument("--every", type=int, default=None,
+                       help="Only process every k-th selected page")
+    parser.add_argument("--max-entities", action="append", metavar="[CLASS=]N",
+                       help="Stop once any class, or the given class, reaches N entities; "
+                            "may be repeated per class")
+    parser.add_argument("--time-budget", type=float, default=None,
+                       help="Stop starting new pages after this many seconds per document")
+    parser.add_argument("--skip-blank", action="store_true",
+                       help="Skip blank pages before inference")
+    parser.add_argument("--dedup-pages", action="store_true",
+                       help="Reuse detections for near-duplicate pages within a document")
+    parser.add_argument("--text-fast-path", action="store_true",
+                       help="Skip the model on trivial born-digital pages, using their text layer")
+    parser.add_argument("--attach-text", action="store_true",
+                       help="Store the text-layer text inside each box with the crop metadata")
+    parser.add_argument("--tiling", action="store_true",
+                       help="Detect on overlapping tiles of very wide or very large pages")
+    parser.add_argument("--max-memory", default=None, metavar="SIZE",
+                       help="Memory budget, e.g. 2GB; lowers the render DPI of pages that would not "
+                            "fit and holds back prefetching (default: Config.MAX_MEMORY, no budget)")
+    parser.add_argument("--overlays", nargs="?", const="", default=None, metavar="PAGES",
+                       help="After processing, draw detection overlays into the detections "
+                            "directory for the given pages (default: all pages)")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Worker processes for batch mode (default: Config.BATCH_WORKERS)")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                       help="Torch threads per batch worker (default: CPU count / workers)")
+    parser.add_argument("--job-id", default=None,
+                       help="Write outputs to an isolated job workspace under Config.WORKSPACE_ROOT")
+    parser.add_argument("--output-dir", default=None,
+                       help="Root output directory (batch mode default: Config.BATCH_OUTPUT_DIR)")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                       help="Log per-page progress; repeat (-vv) to also log every saved crop")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error"], default=None,
+                       help="Log level (default: Config.LOG_LEVEL)")
+    parser.add_argument("--trace", action="store_true",
+                       help="Write a Chrome trace of the stage timings to the output directory")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                       help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running")
     
     args = parser.parse_args()
+    log_level = args.log_level or {0: Config.LOG_LEVEL, 1: "info"}.get(args.verbose, "debug")
+    setup_logging(log_level)
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
+    
+    # --max-entities N caps every class, CLASS=N values cap only the listed classes
+    class_limits = [value for value in args.max_entities or [] if "=" in value]
+    if class_limits:
+        max_entities = {k: int(v) for k, v in parse_class_values(class_limits, "--max-entities").items()}
+    else:
+        max_entities = int(args.max_entities[-1]) if args.max_entities else None
+    
+    min_area_fraction = None
+    class_min_area = []
+    for value in args.min_area or []:
+        if "=" in value:
+            class_min_area.append(value)
+        else:
+            min_area_fraction = float(value)
     
-    if not os.path.exists(args.pdf_path):
-        print(f"Error: PDF file '{args.pdf_path}' not found.")
-        exit(1)
+    model_kwargs = dict(
+        device=args.device,
+        weights_path=args.weights,
+        backend=args.backend,
+        int8=args.int8 or None
+    )
+    process_kwargs = dict(
+        clear_existing=not args.keep_existing,
+        render_backend=args.render_backend,
+        save_page_images=args.save_pages or None,
+        batch_size=args.batch_size,
+        two_pass=args.two_pass or None,
+        pipelined=args.pipelined or None,
+        queue_depth=args.queue_depth,
+        use_cache=args.cache or None,
+        output_format=args.output_format,
+        include_classes=args.include_classes.split(",") if args.include_classes else None,
+        exclude_classes=args.exclude_classes.split(",") if args.exclude_classes else None,
+        min_confidence=parse_class_values(args.min_confidence, "--min-confidence") or None,
+        min_area=parse_class_values(class_min_area, "--min-area") or None,
+        min_area_fraction=min_area_fraction,
+        crop_format=args.crop_format,
+        crop_quality=args.crop_quality,
+        resume=args.resume,
+        retry_failed=args.retry_failed,
+        pages=args.pages,
+        first_pages=args.first_pages,
+        every=args.every,
+        max_entities=max_entities,
+        time_budget=args.time_budget,
+        skip_blank=args.skip_blank or None,
+        dedup_pages=args.dedup_pages or None,
+        text_fast_path=args.text_fast_path or None,
+        attach_text=args.attach_text or None,
+        tiling=args.tiling or None,
+        max_memory=args.max_memory,
+        # Overlays are drawn from the detections in the checkpoint journal
+        checkpoint=True if args.overlays is not None else None,
+        trace=args.trace,
+        **model_kwargs
+    )
     
-    process_pdf(args.pdf_path, clear_existing=not args.keep_existing)
\ No newline at end of file
+    single = args.pdf_path[0]
+    if len(args.pdf_path) == 1 and args.workers is None and single.lower().endswith(".pdf") \
+            and not glob.has_magic(single):
+        if not os.path.exists(single):
+            print(f"Error: PDF file '{single}' not found.")
+            exit(1)
+        
+        workspace = JobWorkspace(args.job_id) if args.job_id else None
+        metrics = PipelineMetrics()
+        entities = process_pdf(single, output_root=args.output_dir, workspace=workspace, metrics=metrics,
+                               **process_kwargs)
+        entity_counts = entities.counts()
+        counts = ", ".join(f"{entity_type}: {count}" for entity_type, count in entity_counts.items())
+        summary = metrics.summary()
+        print(f"Extracted {sum(entity_counts.values())} items from {summary['pages']} pages "
+              f"in {summary['wall_seconds']:.1f}s" + (f" ({counts})" if counts else ""))
+        print(f"Stages: {format_summary(summary)}")
+        entities.close()
+        if args.overlays is not None:
+            overlays = render_overlays(workspace.root if workspace else args.output_dir, args.overlays or None)
+            print(f"Drew {len(overlays)} detection overlays")
+        if workspace is not None:
+            print(f"Job {workspace.job_id} outputs: {workspace.root}")
+    else:
+        documents = collect_documents(args.pdf_path)
+        missing = [path for path in documents if not os.path.exists(path)]
+        for path in missing:
+            print(f"Warning: PDF file '{path}' not found, skipping.")
+        documents = [path for path in documents if path not in missing]
+        if not documents:
+            print("Error: no PDF files found.")
+            exit(1)
+        
+        aggregate = run_batch(documents, process_pdf,
+                              output_dir=args.output_dir or Config.BATCH_OUTPUT_DIR,
+                              workers=args.workers or Config.BATCH_WORKERS,
+                              torch_threads=args.torch_threads,
+                              model_kwargs={k: v for k, v in model_kwargs.items() if v is not None},
+                              process_kwargs=process_kwargs,
+                              log_level=log_level)
+        print(f"Documents: {aggregate['documents_succeeded']}/{aggregate['documents_total']} succeeded, "
+              f"{aggregate['pages']} pages in {aggregate['wall_seconds']:.1f}s "
+              f"({aggregate['pages_per_second']:.2f} pages/sec), {aggregate['items']} items")
@@ -0,0 +1,57 @@
+import argparse
+import time
+from src.config import Config
+from src.log import setup_logging
+from src.service import ExtractionService, start_service
+from main import iter_process_pdf
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP service running layout extraction jobs on warm models")
+    parser.add_argument("--host", default=Config.SERVICE_HOST,
+                       help="Interface to bind; the API has no authentication (default: Config.SERVICE_HOST)")
+    parser.add_argument("--port", type=int, default=Config.SERVICE_PORT,
+                       help="Port to listen on (default: Config.SERVICE_PORT)")
+    parser.add_argument("--workers", type=int, default=Config.SERVICE_WORKERS,
+                       help="Jobs processed at once (default: Config.SERVICE_WORKERS)")
+    parser.add_argument("--queue-size", type=int, default=Config.SERVICE_QUEUE_SIZE,
+                       help="Jobs allowed to wait before submissions are refused (default: Config.SERVICE_QUEUE_SIZE)")
+    parser.add_argument("--weights", default=None,
+                       help="Local model weights file, skips the Hugging Face hub (offline use)")
+    parser.add_argument("--device", default=None,
+                       help="Torch device(s) for inference, e.g. cpu or cuda:0,cuda:1 to spread workers")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default=None,
+                       help="Inference backend (default: Config.INFERENCE_BACKEND)")
+    parser.add_argument("--int8", action="store_true",
+                       help="Use an INT8 quantized export of the onnx/openvino backend")
+    parser.add_argument("--workspace-root", default=Config.WORKSPACE_ROOT,
+                       help="Directory holding the per-job workspaces (default: Config.WORKSPACE_ROOT)")
+    parser.add_argument("--input-root", default=Config.SERVICE_INPUT_ROOT,
+                       help="Directory whose PDFs clients may submit by path instead of uploading "
+                            "(default: Config.SERVICE_INPUT_ROOT, uploads only)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                       help="Also log every request, page and crop")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error"], default=None,
+                       help="Log level (default: info, which logs every job)")
+    args = parser.parse_args()
+    setup_logging(args.log_level or ("debug" if args.verbose else "info"))
+
+    model_kwargs = dict(
+        devices=args.device.split(",") if args.device else None,
+        weights_path=args.weights or Config.MODEL_WEIGHTS_PATH,
+        backend=args.backend or Config.INFERENCE_BACKEND,
+        int8=args.int8 or Config.QUANTIZE_INT8
+    )
+    service = ExtractionService(iter_process_pdf, workers=args.workers, queue_size=args.queue_size,
+                                model_kwargs=model_kwargs, workspace_root=args.workspace_root,
+                                input_root=args.input_root)
+    service.start()
+    server = start_service(service, port=args.port, host=args.host)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {args.workers} workers, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        service.stop(timeout=30)
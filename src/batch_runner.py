@@ -0,0 +1,194 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .config import Config
+from .entity_store import EntityStore
+from .log import get_logger, setup_logging
+from .metrics import REGISTRY, PipelineMetrics
+
+logger = get_logger(__name__)
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def collect_documents(inputs):
+    """
+    Expand directories, glob patterns and manifest files into a list of PDFs
+
+    Args:
+        inputs (list): PDF paths, directories (searched recursively), glob
+            patterns, or manifest files listing one PDF path per line
+
+    Returns:
+        list: Unique PDF paths in the order they were found
+    """
+    documents = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = sorted(glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True))
+        elif glob.has_magic(item):
+            found = sorted(glob.glob(item, recursive=True))
+        elif os.path.isfile(item) and not item.lower().endswith(".pdf"):
+            # Manifest: one path per line, relative paths resolve against the manifest
+            base = os.path.dirname(os.path.abspath(item))
+            with open(item, encoding="utf-8") as f:
+                lines = [line.strip() for line in f]
+            found = [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+        else:
+            found = [item]
+        documents.extend(found)
+
+    seen = set()
+    unique = []
+    for path in documents:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def document_output_root(output_dir, pdf_path):
+    """Return a per-document output directory that cannot collide across inputs"""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    digest = hashlib.sha1(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_dir, f"{stem}-{digest}")
+
+def _init_worker(torch_threads, model_kwargs, log_level=None):
+    """Pin the worker's torch thread count and load its model once"""
+    if log_level:
+        # Spawned workers start with logging unconfigured
+        setup_logging(log_level)
+    import torch
+    torch.set_num_threads(torch_threads)
+    from .layout_detector import LayoutDetector
+    LayoutDetector(**model_kwargs).warm_up()
+
+def _new_summary(pdf_path, output_root, error=None):
+    return {"pdf": pdf_path, "output_root": output_root, "pages": 0, "document_pages": 0, "items": 0,
+            "entities": {}, "seconds": 0.0, "error": error, "metrics": None}
+
+def _run_document(process_fn, pdf_path, output_root, process_kwargs):
+    from .pdf_processor import PDFProcessor
+    start = time.time()
+    summary = _new_summary(pdf_path, output_root)
+    metrics = PipelineMetrics()
+    
+    def count_page(update):
+        # Only pages actually processed count, not those left out by --pages or an early stop
+        summary["pages"] += 1
+    
+    try:
+        with PDFProcessor() as processor:
+            summary["document_pages"] = processor.get_page_count(pdf_path)
+        entities = process_fn(pdf_path, output_root=output_root, metrics=metrics,
+                              progress_callback=count_page, **process_kwargs)
+        if isinstance(entities, EntityStore):
+            summary["entities"] = entities.counts()
+            # Only the counts leave the worker, drop any spill file
+            entities.close()
+        else:
+            summary["entities"] = {entity_type: len(files) for entity_type, files in entities.items()}
+        summary["items"] = sum(summary["entities"].values())
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["metrics"] = metrics.summary()
+    summary["seconds"] = round(time.time() - start, 3)
+    return summary
+
+def run_batch(documents, process_fn, output_dir=Config.BATCH_OUTPUT_DIR, workers=Config.BATCH_WORKERS,
+              torch_threads=None, model_kwargs=None, process_kwargs=None, log_level=None):
+    """
+    Process many PDFs across a pool of worker processes
+
+    Each worker loads one model at start-up and keeps it for every document it
+    handles. Torch threads are split between workers so they do not
+    oversubscribe the CPU.
+
+    Args:
+        documents (list): PDF paths to process
+        process_fn (callable): Module-level function with process_pdf's signature
+        output_dir (str): Root directory, each document gets its own sub-directory
+        workers (int): Number of worker processes
+        torch_threads (int): Torch threads per worker, defaults to cpu_count // workers
+        model_kwargs (dict): LayoutDetector arguments used to warm each worker's model
+        process_kwargs (dict): Extra keyword arguments for process_fn
+        log_level (str): Log level to configure in the worker processes
+
+    Returns:
+        dict: Aggregate statistics with the per-document summaries under "documents"
+    """
+    workers = max(1, min(workers, len(documents) or 1))
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    model_kwargs = model_kwargs or {}
+    process_kwargs = process_kwargs or {}
+    os.makedirs(output_dir, exist_ok=True)
+    summary_path = os.path.join(output_dir, "batch_summary.jsonl")
+
+    # Children read these at torch import time, before the initializer runs
+    saved_env = {name: os.environ.get(name) for name in _THREAD_ENV_VARS}
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(torch_threads)
+
+    logger.info("Processing %d documents with %d workers x %d threads", len(documents), workers, torch_threads)
+    start = time.time()
+    summaries = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(torch_threads, model_kwargs, log_level)) as pool, \
+                open(summary_path, "w", encoding="utf-8") as summary_file:
+            futures = {
+                pool.submit(_run_document, process_fn, pdf_path,
+                            document_output_root(output_dir, pdf_path), process_kwargs): pdf_path
+                for pdf_path in documents
+            }
+            for future in as_completed(futures):
+                pdf_path = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    # A worker that died (BrokenProcessPool) fails every document still pending
+                    summary = _new_summary(pdf_path, document_output_root(output_dir, pdf_path),
+                                           f"{type(e).__name__}: {e}")
+                summaries[pdf_path] = summary
+                if summary["metrics"] is not None:
+                    # Worker processes have their own registry, fold their totals into this one
+                    REGISTRY.add(summary["metrics"])
+                summary_file.write(json.dumps(summary) + "\n")
+                summary_file.flush()
+                status = "FAILED " + summary["error"] if summary["error"] else f"{summary['items']} items"
+                logger.info("[%d/%d] %s: %d pages in %.1fs, %s", len(summaries), len(documents),
+                            summary["pdf"], summary["pages"], summary["seconds"], status)
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    wall_seconds = time.time() - start
+    ordered = [summaries[pdf_path] for pdf_path in documents if pdf_path in summaries]
+    succeeded = [s for s in ordered if s["error"] is None]
+    total_pages = sum(s["pages"] for s in succeeded)
+    aggregate = {
+        "documents_total": len(documents),
+        "documents_succeeded": len(succeeded),
+        "documents_failed": len(ordered) - len(succeeded),
+        "pages": total_pages,
+        "items": sum(s["items"] for s in succeeded),
+        "workers": workers,
+        "torch_threads_per_worker": torch_threads,
+        "wall_seconds": round(wall_seconds, 3),
+        "pages_per_second": round(total_pages / wall_seconds, 3) if wall_seconds else 0.0,
+        "documents_per_second": round(len(succeeded) / wall_seconds, 3) if wall_seconds else 0.0,
+        "documents": ordered,
+    }
+    with open(os.path.join(output_dir, "batch_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(aggregate, f, indent=2)
+
+    logger.info("Batch done: %d/%d documents succeeded, %d pages in %.1fs (%.2f pages/sec), %d items",
+                aggregate["documents_succeeded"], aggregate["documents_total"], aggregate["pages"],
+                aggregate["wall_seconds"], aggregate["pages_per_second"], aggregate["items"])
+    return aggregate
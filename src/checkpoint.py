@@ -0,0 +1,146 @@
+import json
+import os
+import shutil
+import time
+from .config import Config
+from .detections import PageDetections
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+_HEADER = "journal.json"
+
+def _atomic_write_json(path, data):
+    """Write JSON to a temporary file and rename it over path"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class CheckpointJournal:
+    """
+    Records finished and failed pages of one run so it can be resumed
+
+    Every page gets its own small JSON file that is replaced atomically, so a
+    crash at any point leaves each record either absent or complete, and
+    writing a record costs the same on page 2 as on page 2,000. A header file
+    ties the journal to the document hash and the detection settings; a
+    journal written for anything else is discarded on resume. Only the status
+    of each page is kept in memory, detections and entities are read back
+    from the page's file when asked for.
+    """
+
+    def __init__(self, root, doc_hash, settings, pdf_path=None):
+        self.root = root
+        self.doc_hash = doc_hash
+        self.settings = settings
+        self.pdf_path = os.path.abspath(pdf_path) if pdf_path else None
+        self.pages = {}
+
+    @classmethod
+    def load(cls, root):
+        """
+        Open an existing journal read-only, e.g. to draw overlays of a finished run
+
+        Args:
+            root (str): Journal directory
+
+        Returns:
+            CheckpointJournal: The journal with its page records loaded
+        """
+        with open(os.path.join(root, _HEADER), encoding="utf-8") as f:
+            header = json.load(f)
+        journal = cls(root, header["doc_hash"], header["settings"], header.get("pdf_path"))
+        journal._load_pages()
+        return journal
+
+    @staticmethod
+    def _status(record):
+        """The part of a record kept in memory"""
+        return {"status": record["status"], "error": record.get("error"),
+                "has_detections": bool(record.get("detections"))}
+
+    def _load_pages(self):
+        self.pages = {}
+        for name in os.listdir(self.root):
+            if name.startswith("page_") and name.endswith(".json"):
+                with open(os.path.join(self.root, name), encoding="utf-8") as f:
+                    record = json.load(f)
+                self.pages[record["page"]] = self._status(record)
+
+    def _read(self, page_num):
+        with open(self.record_path(page_num), encoding="utf-8") as f:
+            return json.load(f)
+
+    def record_path(self, page_num):
+        """Return the file holding a page's record"""
+        return os.path.join(self.root, f"page_{page_num:05d}.json")
+
+    def start(self, resume=False):
+        """
+        Open the journal, loading earlier records when resuming
+
+        Args:
+            resume (bool): Keep records of a previous run of the same document and settings
+
+        Returns:
+            bool: True if earlier records were loaded
+        """
+        header_path = os.path.join(self.root, _HEADER)
+        header = None
+        if resume and os.path.exists(header_path):
+            with open(header_path, encoding="utf-8") as f:
+                header = json.load(f)
+            if header.get("doc_hash") != self.doc_hash or header.get("settings") != self.settings:
+                logger.warning("Checkpoint belongs to another document or settings, starting over")
+                header = None
+
+        if header is None:
+            shutil.rmtree(self.root, ignore_errors=True)
+            os.makedirs(self.root, exist_ok=True)
+            _atomic_write_json(header_path, {"doc_hash": self.doc_hash, "settings": self.settings,
+                                             "pdf_path": self.pdf_path, "created": time.time()})
+            self.pages = {}
+            return False
+
+        self._load_pages()
+        return True
+
+    def page_done(self, page_num, detections, entities, seconds):
+        """Record a finished page with its detections and entities"""
+        record = {"page": page_num, "status": "done", "seconds": round(seconds, 3),
+                  "detections": detections.to_dict() if detections is not None else None,
+                  "entities": entities}
+        _atomic_write_json(self.record_path(page_num), record)
+        self.pages[page_num] = self._status(record)
+
+    def page_failed(self, page_num, error):
+        """Record a failed page and its error"""
+        record = {"page": page_num, "status": "failed", "error": f"{type(error).__name__}: {error}"}
+        _atomic_write_json(self.record_path(page_num), record)
+        self.pages[page_num] = self._status(record)
+
+    def completed_pages(self):
+        return sorted(p for p, r in self.pages.items() if r["status"] == "done")
+
+    def failed_pages(self):
+        """Return {page_num: error} for pages whose last attempt failed"""
+        return {p: r["error"] for p, r in sorted(self.pages.items()) if r["status"] == "failed"}
+
+    def has_detections(self, page_num):
+        return self.pages[page_num]["has_detections"]
+
+    def detections(self, page_num):
+        if not self.has_detections(page_num):
+            return None
+        return PageDetections.from_dict(self._read(page_num)["detections"])
+
+    def entities(self, page_num):
+        return self._read(page_num)["entities"]
+
+    @staticmethod
+    def path_for(output_root=None):
+        """Return the journal directory of an output root"""
+        return os.path.join(output_root or "", Config.CHECKPOINT_DIR)
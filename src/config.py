@@ -29,6 +29,21 @@ class Config:
     # Model settings
     MODEL_REPO_ID = "DILHTWD/documentlayoutsegmentation_YOLOv8_ondoclaynet"
     MODEL_FILENAME = "yolov8x-doclaynet-epoch64-imgsz640-initiallr1e-4-finallr1e-5.pt"
+    # Local weights file that skips the Hugging Face hub entirely (offline use)
+    MODEL_WEIGHTS_PATH = os.environ.get("LAYOUT_MODEL_WEIGHTS")
+    # Torch device for inference, None lets ultralytics pick
+    MODEL_DEVICE = os.environ.get("LAYOUT_MODEL_DEVICE")
+    # Run a dummy inference right after the model is loaded
+    WARMUP_ON_LOAD = True
+    # Inference backend: "torch", "onnx" (ONNX Runtime) or "openvino"
+    INFERENCE_BACKEND = "torch"
+    # Use an INT8 quantized export (dynamic for ONNX, calibrated for OpenVINO)
+    QUANTIZE_INT8 = False
+    # Dataset yaml of document pages calibrating OpenVINO INT8 exports, required
+    # for backend "openvino" with QUANTIZE_INT8
+    INT8_CALIBRATION_DATA = None
+    # Exported ONNX/OpenVINO artifacts are cached here
+    EXPORT_DIR = "model_exports"
     
     # Default directories
     DEFAULT_OUTPUT_DIR = "output_pages"
@@ -38,6 +53,159 @@ class Config:
     # Model settings
     CONFIDENCE_THRESHOLD = 0.25
     IMAGE_SIZE = 640
+    # Number of pages sent to the model in one predict call
+    BATCH_SIZE = 4
+    
+    # Tiling settings for posters, drawings and spreads
+    # Pages wider than TILE_MAX_ASPECT or larger than TILE_MAX_PIXELS are split
+    # into TILE_SIZE px tiles overlapping by TILE_OVERLAP, inferred in one batch
+    # together with the whole page, and merged with class-aware NMS
+    TILING_ENABLED = False
+    # At RENDER_DPI = 200 an A4/Letter page is ~4M pixels; A3 pages and two-page
+    # spreads (~7.7M) are tiled, scale with the square of the DPI
+    TILE_MAX_ASPECT = 1.8
+    TILE_MAX_PIXELS = 6_000_000
+    TILE_SIZE = 1600
+    TILE_OVERLAP = 0.2
+    TILE_NMS_IOU = 0.5
+    
+    # Class filter settings, applied to the detections before anything is cropped
+    # INCLUDE_CLASSES = None keeps every class, e.g. ["Table", "Picture"]
+    INCLUDE_CLASSES = None
+    EXCLUDE_CLASSES = []
+    # Per-class minimum confidence, e.g. {"Table": 0.5}
+    CLASS_MIN_CONFIDENCE = {}
+    # Minimum box area as a fraction of the page area, with per-class overrides
+    MIN_AREA_FRACTION = 0.0
+    CLASS_MIN_AREA = {}
+    
+    # Rendering settings
+    # "pymupdf" renders pages in-process from one open document handle,
+    # "pdf2image" shells out to poppler's pdftoppm for every page
+    RENDER_BACKEND = "pymupdf"
+    RENDER_DPI = 200
+    # Rendered pages are handed to the detector and cropper in memory;
+    # enable to also write them to DEFAULT_OUTPUT_DIR for debugging
+    SAVE_PAGE_IMAGES = False
+    # Render pages for detection at IMAGE_SIZE on the long side and re-render
+    # only the detected regions at RENDER_DPI (via PyMuPDF clips) for the crops
+    TWO_PASS_RENDER = False
+    
+    # Crop output format
+    # "files" writes one JPEG per detection under DEFAULT_ENTITIES_DIR/<class>/,
+    # "manifest" writes one manifest.jsonl plus boxes.npy and packs the crops
+    # into tar shards of about MANIFEST_SHARD_BYTES (metadata only when
+    # MANIFEST_PACK_CROPS is off), "lazy" writes the manifest metadata only and
+    # renders each crop from the PDF on first access, keeping up to
+    # CROP_CACHE_MB of crops in an LRU cache
+    OUTPUT_FORMAT = "files"
+    MANIFEST_SHARD_BYTES = 256 * 1024 * 1024
+    MANIFEST_PACK_CROPS = True
+    CROP_CACHE_MB = 256
+    # Crop codec: "jpeg", "png", "webp" or "npy" (raw RGB array); CROP_QUALITY
+    # applies to jpeg/webp, CROP_OPTIMIZE to jpeg/png
+    CROP_FORMAT = "jpeg"
+    CROP_QUALITY = 90
+    CROP_OPTIMIZE = False
+    # Threads encoding and writing crops, PIL releases the GIL while encoding
+    ENCODE_WORKERS = 4
+    
+    # Pipelined execution settings
+    # When enabled, rendering, inference and crop encoding run as concurrent
+    # stages; QUEUE_DEPTH caps the number of pages in flight at once
+    PIPELINED = False
+    RENDER_WORKERS = 2
+    CROP_WORKERS = 4
+    QUEUE_DEPTH = 16
+    
+    # Memory budget settings, used when MAX_MEMORY (bytes) or --max-memory is set
+    # MEMORY_RASTER_FRACTION of what the budget leaves after the model is loaded
+    # goes to page rasters in flight; a page whose raster does not fit its share
+    # of a batch is rendered at a lower DPI (not below MIN_RENDER_DPI), pipelined
+    # prefetch waits for free raster memory, and the run's entity references
+    # spill beyond ENTITY_STORE_MAX_IN_MEMORY to a per-run ENTITY_STORE_PREFIX*.sqlite
+    # file in the output root
+    MAX_MEMORY = None
+    MEMORY_RASTER_FRACTION = 0.5
+    # A page raster exists as the PyMuPDF pixmap, the PIL image and the array
+    # ultralytics keeps with its results
+    RASTER_BYTES_PER_PIXEL = 9
+    MIN_RENDER_DPI = 72
+    ENTITY_STORE_MAX_IN_MEMORY = 10_000
+    ENTITY_STORE_PREFIX = "entity_store-"
+    
+    # Result cache settings
+    # Detections are cached per document hash and page; with CACHE_CROPS the
+    # crop files are cached too so repeat runs skip rendering entirely
+    RESULT_CACHE_ENABLED = False
+    CACHE_DIR = ".layout_cache"
+    CACHE_MAX_BYTES = 1024 * 1024 * 1024
+    CACHE_CROPS = True
+    
+    # Page triage before inference, both run on a TRIAGE_THUMB_SIZE thumbnail
+    # Blank pages (no content, or pixel std below BLANK_PAGE_STD) are skipped
+    SKIP_BLANK_PAGES = False
+    BLANK_PAGE_STD = 4.0
+    # Pages whose 256-bit perceptual hash is within DUPLICATE_HASH_DISTANCE bits
+    # of an earlier page are duplicate candidates (scan noise alone flips about
+    # a dozen bits); the hash sees layout, not text, so a candidate only reuses
+    # the earlier page's detections when at most DUPLICATE_MAX_CHANGED of its pixels differ by more than
+    # DUPLICATE_PIXEL_DELTA gray levels, compared at DUPLICATE_CHECK_SIZE pixels
+    DEDUP_PAGES = False
+    DUPLICATE_HASH_DISTANCE = 24
+    DUPLICATE_CHECK_SIZE = 256
+    DUPLICATE_PIXEL_DELTA = 64
+    DUPLICATE_MAX_CHANGED = 0.005
+    TRIAGE_THUMB_SIZE = 128
+    
+    # Text layer settings for born-digital PDFs
+    # TEXT_FAST_PATH builds detections for trivial pages (single-column text, no
+    # images, at most TEXT_FAST_PATH_MAX_DRAWINGS vector paths) from the text
+    # layer without running the model; ATTACH_TEXT stores the text inside every
+    # box with the crop metadata
+    TEXT_FAST_PATH = False
+    TEXT_FAST_PATH_MAX_DRAWINGS = 5
+    ATTACH_TEXT = False
+    
+    # Checkpoint journal directory, inside the output root, used by --resume
+    # The journal hashes the PDF and syncs one record per page, so it is only
+    # written with --resume/--retry-failed, or always with CHECKPOINT_ENABLED
+    CHECKPOINT_DIR = "checkpoint"
+    CHECKPOINT_ENABLED = False
+    
+    # Logging and metrics
+    # Library code logs through the "layout" logger and is silent until
+    # setup_logging() is called; the CLI logs at LOG_LEVEL ("WARNING" only
+    # reports problems, "INFO" adds per-page progress, "DEBUG" every crop)
+    LOG_LEVEL = "WARNING"
+    # Chrome trace of the stage timings, written to the output root with --trace
+    # and viewable in chrome://tracing or Perfetto
+    TRACE_FILE = "trace.json"
+    
+    # Per-job workspaces, removed after WORKSPACE_TTL_SECONDS without use
+    WORKSPACE_ROOT = "jobs"
+    WORKSPACE_TTL_SECONDS = 24 * 60 * 60
+    
+    # Extraction service settings (python serve.py)
+    # SERVICE_WORKERS jobs run at once on warm models, up to SERVICE_QUEUE_SIZE
+    # more wait in the queue before submissions are refused with 503
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8765
+    SERVICE_WORKERS = 2
+    SERVICE_QUEUE_SIZE = 16
+    SERVICE_MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+    # Longest a result request may block waiting for its job
+    SERVICE_MAX_WAIT_SECONDS = 300
+    # Upper bounds of the per-job batch_size and queue_depth options, which
+    # decide how many page rasters a job holds at once
+    SERVICE_MAX_BATCH_SIZE = 16
+    SERVICE_MAX_QUEUE_DEPTH = 32
+    # Directory whose PDFs clients may submit by path; None only accepts uploads
+    SERVICE_INPUT_ROOT = None
+    
+    # Multi-document batch settings
+    BATCH_WORKERS = 2
+    BATCH_OUTPUT_DIR = "batch_output"
     
     # Poppler path - handle different environments
     @classmethod
@@ -65,8 +233,15 @@ class Config:
         return None
     
     @classmethod
-    def setup_directories(cls):
+    def output_dirs(cls, root=None):
+        """Get the page, entity and detection directories, optionally under a root"""
+        dirs = (cls.DEFAULT_OUTPUT_DIR, cls.DEFAULT_ENTITIES_DIR, cls.DEFAULT_DETECTIONS_DIR)
+        if root:
+            dirs = tuple(os.path.join(root, d) for d in dirs)
+        return dirs
+    
+    @classmethod
+    def setup_directories(cls, root=None):
         """Create necessary directories if they don't exist"""
-        os.makedirs(cls.DEFAULT_OUTPUT_DIR, exist_ok=True)
-        os.makedirs(cls.DEFAULT_ENTITIES_DIR, exist_ok=True)
-        os.makedirs(cls.DEFAULT_DETECTIONS_DIR, exist_ok=True)
\ No newline at end of file
+        for directory in cls.output_dirs(root):
+            os.makedirs(directory, exist_ok=True)
\ No newline at end of file
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from .config import Config
+from .pdf_processor import PDFProcessor
+
+SOURCE_FILE = "lazy_source.json"
+
+def _file_stamp(path):
+    """(mtime_ns, size) of a file, None when it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class CropCache:
+    """Thread-safe LRU of PIL images bounded by their decoded size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(image):
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        size = self._size(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.current_bytes -= self._size(self._items.pop(key))
+            self._items[key] = image
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= self._size(evicted)
+
+class LazyCropSource:
+    """
+    Produces crops on first access by re-rendering their clip region from the PDF
+
+    Used with the "lazy" output format, where extraction only records box
+    metadata. Crops are rendered at the recorded DPI the first time someone
+    asks for them and kept in a CropCache of max_bytes. The process-wide
+    source of a directory is replaced once its source record or the PDF
+    itself changes on disk, e.g. when a workspace's source.pdf is overwritten.
+    """
+
+    _sources = {}
+    _sources_lock = threading.Lock()
+
+    def __init__(self, entities_dir, max_bytes=Config.CROP_CACHE_MB * 1024 * 1024):
+        source_path = os.path.join(entities_dir, SOURCE_FILE)
+        self.source_stamp = _file_stamp(source_path)
+        with open(source_path, encoding="utf-8") as f:
+            source = json.load(f)
+        self.pdf_path = source["pdf_path"]
+        self.pdf_stamp = _file_stamp(self.pdf_path)
+        self.dpi = source["dpi"]
+        self.cache = CropCache(max_bytes)
+        self._processor = PDFProcessor(backend=source.get("render_backend", Config.RENDER_BACKEND))
+        # One document handle shared by callers, fitz is not thread-safe
+        self._render_lock = threading.Lock()
+
+    @staticmethod
+    def write_source(entities_dir, pdf_path, dpi=Config.RENDER_DPI, render_backend=Config.RENDER_BACKEND):
+        """Record where lazy crops of an extraction run are rendered from"""
+        os.makedirs(entities_dir, exist_ok=True)
+        LazyCropSource.invalidate(entities_dir)
+        with open(os.path.join(entities_dir, SOURCE_FILE), "w", encoding="utf-8") as f:
+            json.dump({"pdf_path": os.path.abspath(pdf_path), "dpi": dpi,
+                       "render_backend": render_backend}, f)
+
+    @staticmethod
+    def exists(entities_dir):
+        return os.path.exists(os.path.join(entities_dir, SOURCE_FILE))
+
+    def is_current(self, entities_dir):
+        """Whether the source record and the PDF are unchanged since this source was opened"""
+        return (_file_stamp(os.path.join(entities_dir, SOURCE_FILE)) == self.source_stamp
+                and _file_stamp(self.pdf_path) == self.pdf_stamp)
+
+    def close(self):
+        """Close the document handle, waiting for a render in progress"""
+        with self._render_lock:
+            self._processor.close()
+
+    @classmethod
+    def for_dir(cls, entities_dir):
+        """Return the process-wide source for an entities directory"""
+        key = os.path.abspath(entities_dir)
+        with cls._sources_lock:
+            source = cls._sources.get(key)
+            if source is not None and not source.is_current(entities_dir):
+                source.close()
+                source = None
+            if source is None:
+                source = cls(entities_dir)
+                cls._sources[key] = source
+            return source
+
+    @classmethod
+    def invalidate(cls, entities_dir):
+        """Drop the cached source of a directory whose source or manifest is rewritten"""
+        with cls._sources_lock:
+            source = cls._sources.pop(os.path.abspath(entities_dir), None)
+        if source is not None:
+            source.close()
+
+    def crop(self, record):
+        """
+        Return the crop for a manifest record, rendering it on a cache miss
+
+        Args:
+            record (dict): Manifest row with "id", "page", "bbox" and "image_size"
+
+        Returns:
+            PIL.Image.Image: The crop
+        """
+        image = self.cache.get(record["id"])
+        if image is None:
+            with self._render_lock:
+                image = self._processor.render_region(self.pdf_path, record["page"], record["bbox"],
+                                                      record["image_size"], dpi=self.dpi)
+            self.cache.put(record["id"], image)
+        return image
@@ -0,0 +1,139 @@
+import numpy as np
+from .config import Config
+
+class PageDetections:
+    """
+    Detections for one page as plain NumPy arrays
+
+    Decouples the rest of the pipeline from the ultralytics Results object so
+    detections can be cached, serialized and reused without the model.
+    """
+
+    def __init__(self, boxes, classes, scores, names, image_size, texts=None):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)  # [x1, y1, x2, y2]
+        self.classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.names = {int(k): v for k, v in dict(names).items()}
+        self.image_size = tuple(int(v) for v in image_size)  # (width, height)
+        # Text-layer contents of each box, when attached
+        self.texts = list(texts) if texts is not None else None
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Build detections from YOLO results for a single page
+
+        Args:
+            results: Detection results from YOLO (an iterable of Results)
+
+        Returns:
+            PageDetections: Detections of every result concatenated
+        """
+        boxes, classes, scores = [], [], []
+        names, image_size = {}, (0, 0)
+        for r in results:
+            names = r.names
+            height, width = r.orig_shape[:2]
+            image_size = (width, height)
+            if not hasattr(r, 'boxes') or r.boxes is None:
+                continue
+            boxes.append(r.boxes.xyxy.cpu().numpy())
+            classes.append(r.boxes.cls.cpu().numpy())
+            scores.append(r.boxes.conf.cpu().numpy())
+        if not boxes:
+            return cls(np.zeros((0, 4)), [], [], names, image_size)
+        return cls(np.concatenate(boxes), np.concatenate(classes), np.concatenate(scores),
+                   names, image_size)
+
+    def class_name(self, cls_id):
+        return self.names.get(int(cls_id), str(int(cls_id)))
+
+    def to_dict(self):
+        """Return a JSON-serializable representation"""
+        return {
+            'boxes': self.boxes.round(2).tolist(),
+            'classes': self.classes.tolist(),
+            'scores': self.scores.round(4).tolist(),
+            'names': {str(k): v for k, v in self.names.items()},
+            'image_size': list(self.image_size),
+            'texts': self.texts,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild detections from to_dict output"""
+        return cls(data['boxes'], data['classes'], data['scores'],
+                   {int(k): v for k, v in data['names'].items()}, data['image_size'], data.get('texts'))
+
+class DetectionFilter:
+    """
+    Vectorized class, confidence and size filter applied before cropping
+
+    Class names are matched case-insensitively. Minimum areas are fractions
+    of the page area so they do not depend on the render DPI.
+    """
+
+    def __init__(self, include_classes=None, exclude_classes=None, min_confidence=None,
+                 min_area=None, default_min_area=0.0):
+        self.include_classes = {c.lower() for c in include_classes} if include_classes else None
+        self.exclude_classes = {c.lower() for c in exclude_classes or ()}
+        self.min_confidence = {k.lower(): float(v) for k, v in (min_confidence or {}).items()}
+        self.min_area = {k.lower(): float(v) for k, v in (min_area or {}).items()}
+        self.default_min_area = float(default_min_area)
+
+    @classmethod
+    def from_config(cls):
+        return cls(Config.INCLUDE_CLASSES, Config.EXCLUDE_CLASSES, Config.CLASS_MIN_CONFIDENCE,
+                   Config.CLASS_MIN_AREA, Config.MIN_AREA_FRACTION)
+
+    def settings(self):
+        """Return the filter as a JSON-serializable dict, for fingerprints"""
+        return {
+            "include": sorted(self.include_classes) if self.include_classes is not None else None,
+            "exclude": sorted(self.exclude_classes),
+            "min_confidence": self.min_confidence,
+            "min_area": self.min_area,
+            "default_min_area": self.default_min_area,
+        }
+
+    @property
+    def active(self):
+        return bool(self.include_classes is not None or self.exclude_classes or self.min_confidence
+                    or self.min_area or self.default_min_area > 0)
+
+    def mask(self, detections):
+        """
+        Compute which detections pass the filter
+
+        Args:
+            detections (PageDetections): Detections for one page
+
+        Returns:
+            numpy.ndarray: Boolean mask over detections
+        """
+        boxes = detections.boxes
+        keep = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        if not self.active or not len(detections):
+            return keep
+
+        # Per-detection thresholds via a lookup table indexed by class ID
+        size = max(max(detections.names, default=-1), int(detections.classes.max())) + 1
+        allowed = np.ones(size, dtype=bool)
+        min_conf = np.zeros(size, dtype=np.float32)
+        min_area = np.full(size, self.default_min_area, dtype=np.float32)
+        for cls_id in range(size):
+            name = detections.class_name(cls_id).lower()
+            if self.include_classes is not None and name not in self.include_classes:
+                allowed[cls_id] = False
+            if name in self.exclude_classes:
+                allowed[cls_id] = False
+            min_conf[cls_id] = self.min_confidence.get(name, 0.0)
+            min_area[cls_id] = self.min_area.get(name, self.default_min_area)
+
+        width, height = detections.image_size
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) / max(width * height, 1)
+        classes = detections.classes
+        return keep & allowed[classes] & (detections.scores >= min_conf[classes]) & (areas >= min_area[classes])
@@ -1,85 +1,342 @@
 from PIL import Image
+import functools
+import io
+import json
+import numpy as np
 import os
 import re
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from .config import Config
+from .detections import DetectionFilter, PageDetections
+from .crop_cache import LazyCropSource
+from .log import get_logger
+from .manifest import MANIFEST_FILE, ManifestReader, ManifestWriter
+from .metrics import timed
+
+logger = get_logger(__name__)
+
+OUTPUT_FORMATS = ("files", "manifest", "lazy")
+# Text-layer contents of loose crop files, one JSON row per entity
+TEXT_FILE = "entity_text.jsonl"
+# Crop codec -> (PIL format, file extension); npy crops are raw RGB arrays
+CROP_FORMATS = {"jpeg": ("JPEG", "jpg"), "png": ("PNG", "png"), "webp": ("WEBP", "webp"), "npy": (None, "npy")}
+# Extensions of crop files written in any codec, plus .jpeg from older runs
+CROP_EXTENSIONS = tuple(f".{ext}" for _, ext in CROP_FORMATS.values()) + (".jpeg",)
+
+def encode_crop(image, crop_format=Config.CROP_FORMAT, quality=Config.CROP_QUALITY,
+                optimize=Config.CROP_OPTIMIZE):
+    """
+    Encode a crop into bytes
+    
+    Args:
+        image (PIL.Image.Image): The crop
+        crop_format (str): One of CROP_FORMATS
+        quality (int): Quality for jpeg and webp
+        optimize (bool): Extra encoder pass for jpeg and png
+        
+    Returns:
+        bytes: The encoded crop
+    """
+    pil_format = CROP_FORMATS[crop_format][0]
+    buffer = io.BytesIO()
+    if pil_format is None:
+        np.save(buffer, np.asarray(image))
+    elif pil_format == "PNG":
+        image.save(buffer, pil_format, optimize=optimize)
+    elif pil_format == "JPEG":
+        image.save(buffer, pil_format, quality=quality, optimize=optimize)
+    else:
+        image.save(buffer, pil_format, quality=quality)
+    return buffer.getvalue()
+
+@functools.lru_cache(maxsize=8)
+def _manifest_reader(entities_dir, mtime, size):
+    return ManifestReader(entities_dir)
+
+def _load_manifest(entities_dir):
+    """Return a reader for the manifest, re-read only when the file changes"""
+    stat = os.stat(os.path.join(entities_dir, MANIFEST_FILE))
+    return _manifest_reader(os.path.abspath(entities_dir), stat.st_mtime, stat.st_size)
+
+def open_entity(ref, entities_dir=Config.DEFAULT_ENTITIES_DIR):
+    """
+    Open an extracted entity as a PIL image
+    
+    Args:
+        ref (str): A crop file path, or an entity ID from a manifest
+        entities_dir (str): Directory holding the manifest
+        
+    Returns:
+        PIL.Image.Image: The crop, rendered on first access for lazy entities
+    """
+    if os.path.isfile(ref):
+        if ref.endswith(".npy"):
+            return Image.fromarray(np.load(ref))
+        return Image.open(ref)
+    manifest = _load_manifest(entities_dir)
+    record = manifest.get(ref)
+    if "shard" in record:
+        return manifest.open_crop(ref)
+    return LazyCropSource.for_dir(entities_dir).crop(record)
 
 class EntityCropper:
-    def __init__(self, entities_dir=Config.DEFAULT_ENTITIES_DIR):
+    def __init__(self, entities_dir=Config.DEFAULT_ENTITIES_DIR, output_format=Config.OUTPUT_FORMAT,
+                 detection_filter=None, crop_format=Config.CROP_FORMAT, quality=Config.CROP_QUALITY,
+                 optimize=Config.CROP_OPTIMIZE, encode_workers=Config.ENCODE_WORKERS, metrics=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        if crop_format not in CROP_FORMATS:
+            raise ValueError(f"Unknown crop format '{crop_format}', expected one of {tuple(CROP_FORMATS)}")
         self.entities_dir = entities_dir
+        self.output_format = output_format
+        self.detection_filter = detection_filter or DetectionFilter.from_config()
+        self.crop_format = crop_format
+        self.crop_extension = CROP_FORMATS[crop_format][1]
+        self.quality = quality
+        self.optimize = optimize
+        # Optional PipelineMetrics timing crop, encode and save and counting bytes
+        self.metrics = metrics
         self.page_entities = defaultdict(lambda: defaultdict(list))
+        # Pipelined crop threads register pages while the caller releases them
+        self._entities_lock = threading.Lock()
         os.makedirs(entities_dir, exist_ok=True)
+        self._manifest = ManifestWriter(entities_dir) if output_format != "files" else None
+        self._encoder = ThreadPoolExecutor(max(1, encode_workers), thread_name_prefix="encode")
+        self._text_lock = threading.Lock()
+    
+    def close(self):
+        """Wait for pending crop writes, then flush and close the manifest"""
+        self._encoder.shutdown(wait=True)
+        if self._manifest is not None:
+            self._manifest.close()
+    
+    def _encode(self, cropped, out_file=None, page_no=None):
+        """Encode a crop and write it to out_file, or return the bytes when out_file is None"""
+        with timed(self.metrics, "encode", page_no):
+            data = encode_crop(cropped, self.crop_format, self.quality, self.optimize)
+        if out_file is None:
+            return data
+        with timed(self.metrics, "save", page_no):
+            with open(out_file, "wb") as f:
+                f.write(data)
+        if self.metrics is not None:
+            self.metrics.add_bytes(len(data), page_no)
+        return out_file
     
     def _get_page_number(self, filename):
         """Extract page number from filename"""
         match = re.search(r'page(\d+)_', filename)
         return int(match.group(1)) if match else 0
     
-    def crop_entities_from_results(self, image_path, results, page_no):
+    def _as_pil_image(self, image):
+        """Return a PIL image for a path, PIL image or RGB array"""
+        if isinstance(image, Image.Image):
+            return image
+        if isinstance(image, (str, os.PathLike)):
+            return Image.open(image)
+        return Image.fromarray(image)
+    
+    def crop_entities_from_results(self, image, results, page_no, region_renderer=None):
         """
         Crop detected entities from an image based on detection results
         
         Args:
-            image_path (str): Path to the original image
-            results: Detection results from YOLO
+            image (str | PIL.Image.Image | numpy.ndarray): Path to the original image
+                or the in-memory page (RGB) it was detected on
+            results: Detection results from YOLO, or a PageDetections
             page_no (int): Page number for naming
+            region_renderer (callable): Optional function taking an (x1, y1, x2, y2)
+                box in image pixels and returning a higher quality crop; when
+                omitted the crop is cut from image
             
         Returns:
             dict: Dictionary of cropped entities by category for the current page
+                (file paths, or entity IDs in manifest mode)
         """
-        img = Image.open(image_path)
+        # Lazy mode never touches the raster, so a cache hit may pass image=None
+        img = self._as_pil_image(image) if image is not None else None
         cropped_entities = defaultdict(list)
-        
-        for r in results:
-            if not hasattr(r, 'boxes') or r.boxes is None:
-                continue
-                
-            boxes = r.boxes.xyxy.cpu().numpy()   # [x1, y1, x2, y2]
-            classes = r.boxes.cls.cpu().numpy()  # class IDs
-            scores = r.boxes.conf.cpu().numpy()  # confidence scores
+        detections = results if isinstance(results, PageDetections) else PageDetections.from_results(results)
+        # (entity_id, cls_name, score, box, future) in detection order
+        pending = []
+        class_dirs = set()
+
+        # Drop unwanted classes, low scores, tiny and invalid boxes in one pass;
+        # idx keeps the original detection order so entity IDs stay stable
+        for idx in np.flatnonzero(self.detection_filter.mask(detections)) + 1:
+            box, cls, score = detections.boxes[idx - 1], detections.classes[idx - 1], detections.scores[idx - 1]
+            cls_name = detections.class_name(cls)  # e.g., 'table', 'text', 'formula'
+            x1, y1, x2, y2 = map(int, box)
 
-            for idx, (box, cls, score) in enumerate(zip(boxes, classes, scores), start=1):
-                cls_name = r.names[int(cls)]  # e.g., 'table', 'text', 'formula'
-                x1, y1, x2, y2 = map(int, box)
+            # Skip if the bounding box is invalid
+            if x1 >= x2 or y1 >= y2:
+                continue
 
-                # Skip if the bounding box is invalid
-                if x1 >= x2 or y1 >= y2:
+            try:
+                entity_id = f"page{page_no:03d}_{cls_name}_{idx:03d}"
+                text = detections.texts[idx - 1] if detections.texts is not None else None
+                if self.output_format == "lazy" or (self._manifest is not None and not Config.MANIFEST_PACK_CROPS):
+                    # Metadata only, the crop is rendered on first access if ever
+                    out_file = self._manifest.add(entity_id, page_no, cls_name, score, box,
+                                                  image_size=detections.image_size, text=text)
+                    cropped_entities[cls_name].append(out_file)
                     continue
 
-                try:
-                    # Crop region
-                    cropped = img.crop((x1, y1, x2, y2))
+                # Crop region
+                with timed(self.metrics, "crop", page_no):
+                    if region_renderer is not None:
+                        cropped = region_renderer((x1, y1, x2, y2))
+                    else:
+                        cropped = img.crop((x1, y1, x2, y2))
 
-                    # Make folder for class
+                # Encoding and writing run on the encoder threads
+                if self._manifest is not None:
+                    future = self._encoder.submit(self._encode, cropped, None, page_no)
+                else:
                     class_dir = os.path.join(self.entities_dir, cls_name)
-                    os.makedirs(class_dir, exist_ok=True)
+                    if class_dir not in class_dirs:
+                        os.makedirs(class_dir, exist_ok=True)
+                        class_dirs.add(class_dir)
+                    out_file = os.path.join(class_dir, f"{entity_id}.{self.crop_extension}")
+                    future = self._encoder.submit(self._encode, cropped, out_file, page_no)
+                pending.append((entity_id, cls_name, score, box, text, future))
+                
+            except Exception as e:
+                logger.error("Error cropping %s on page %d: %s", cls_name, page_no, e)
 
-                    # Save cropped entity
-                    out_file = os.path.join(class_dir, f"page{page_no:03d}_{cls_name}_{idx:03d}.jpg")
-                    cropped.save(out_file)
-                    
-                    # Add to results dictionaries
-                    cropped_entities[cls_name].append(out_file)
-                    self.page_entities[page_no][cls_name].append(out_file)
-                    
-                    print(f"[PAGE {page_no}] Saved {cls_name} → {out_file}")
-                    
-                except Exception as e:
-                    print(f"Error cropping {cls_name} on page {page_no}: {e}")
-        
+        # Page barrier: only crops that are fully written are registered
+        text_rows = []
+        for entity_id, cls_name, score, box, text, future in pending:
+            try:
+                out_file = future.result()
+                if self._manifest is not None:
+                    # Pack the crop into the manifest's shard, in detection order
+                    data = out_file
+                    with timed(self.metrics, "save", page_no):
+                        out_file = self._manifest.add(entity_id, page_no, cls_name, score, box,
+                                                      data, self.crop_extension, text=text)
+                    if self.metrics is not None:
+                        self.metrics.add_bytes(len(data), page_no)
+                elif text is not None:
+                    text_rows.append({"id": entity_id, "file": out_file, "page": int(page_no),
+                                      "class": cls_name, "text": text})
+                cropped_entities[cls_name].append(out_file)
+                logger.debug("[PAGE %d] Saved %s → %s", page_no, cls_name, out_file)
+            except Exception as e:
+                logger.error("Error saving %s on page %d: %s", cls_name, page_no, e)
+
+        self._write_text_rows(text_rows)
+
+        with self._entities_lock:
+            for cls_name, refs in cropped_entities.items():
+                self.page_entities[page_no][cls_name].extend(refs)
         return dict(cropped_entities)
     
-    def get_entities_by_page(self, page_no):
+    def trim_pages(self, keep_pages):
+        """
+        Remove the outputs of every page not in keep_pages before a resumed run
+
+        Manifest rows and packed crops, loose crop files and text sidecar rows
+        of the other pages are dropped, so pages written partly by an
+        interrupted run are not duplicated when they are processed again.
+        
+        Args:
+            keep_pages (iterable): Page numbers whose outputs stay
+            
+        Returns:
+            int: Number of entities removed
+        """
+        keep_pages = set(keep_pages)
+        removed = 0
+        if self._manifest is not None:
+            removed += self._manifest.trim(keep_pages)
+        elif os.path.exists(self.entities_dir):
+            for entity_type in os.listdir(self.entities_dir):
+                entity_dir = os.path.join(self.entities_dir, entity_type)
+                if not os.path.isdir(entity_dir):
+                    continue
+                for filename in os.listdir(entity_dir):
+                    if self._get_page_number(filename) not in keep_pages:
+                        os.remove(os.path.join(entity_dir, filename))
+                        removed += 1
+        
+        text_path = os.path.join(self.entities_dir, TEXT_FILE)
+        if os.path.exists(text_path):
+            with self._text_lock:
+                with open(text_path, encoding="utf-8") as f:
+                    rows = [line for line in f if line.strip()]
+                kept = []
+                for line in rows:
+                    try:
+                        if json.loads(line)["page"] in keep_pages:
+                            kept.append(line)
+                    except json.JSONDecodeError:
+                        # Cut short by the crash
+                        continue
+                with open(text_path, "w", encoding="utf-8") as f:
+                    f.writelines(line if line.endswith("\n") else line + "\n" for line in kept)
+        return removed
+    
+    def _write_text_rows(self, text_rows):
+        if text_rows:
+            # Loose crop files have no manifest, keep their text in a sidecar JSONL
+            with self._text_lock, open(os.path.join(self.entities_dir, TEXT_FILE), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(row) + "\n" for row in text_rows)
+    
+    def add_entities(self, page_no, entities, detections=None):
+        """
+        Register crops that already exist on disk, e.g. restored from the result cache
+        
+        Args:
+            page_no (int): Page number the crops belong to
+            entities (dict): Entity types mapped to lists of file paths
+            detections (PageDetections): Detections the crops were cut from; when they
+                carry text, the crops' rows are added to the text sidecar
+        """
+        text_rows = []
+        for cls_name, files in entities.items():
+            with self._entities_lock:
+                self.page_entities[page_no][cls_name].extend(files)
+            if detections is None or detections.texts is None:
+                continue
+            for out_file in files:
+                # Crop files are named <entity_id>.<ext>, the ID ends in the 1-based detection index
+                entity_id = os.path.splitext(os.path.basename(out_file))[0]
+                text = detections.texts[int(entity_id.rsplit("_", 1)[1]) - 1]
+                if text is not None:
+                    text_rows.append({"id": entity_id, "file": out_file, "page": int(page_no),
+                                      "class": cls_name, "text": text})
+        self._write_text_rows(text_rows)
+    
+    def open_entity(self, ref):
+        """Open one of this cropper's entities (file path or manifest ID) as a PIL image"""
+        return open_entity(ref, self.entities_dir)
+    
+    def release_page(self, page_no):
+        """Forget a page's entities once the caller has consumed them"""
+        with self._entities_lock:
+            self.page_entities.pop(page_no, None)
+    
+    def get_entities_by_page(self, page_no, load=False):
         """
         Get all entities for a specific page
         
         Args:
             page_no (int): Page number to get entities for
+            load (bool): Return the crops as PIL images (rendered on demand in lazy
+                mode) instead of their references
             
         Returns:
             dict: Dictionary of entity types and their file paths for the specified page
         """
-        return dict(self.page_entities.get(page_no, {}))
+        with self._entities_lock:
+            entities = {cls_name: list(refs)
+                        for cls_name, refs in self.page_entities.get(page_no, {}).items()}
+        if load:
+            return {cls_name: [self.open_entity(ref) for ref in refs] for cls_name, refs in entities.items()}
+        return entities
     
     def get_all_entities(self):
         """
@@ -91,11 +348,14 @@ class EntityCropper:
         all_entities = defaultdict(list)
         
         # First check our in-memory tracking
-        for page_ents in self.page_entities.values():
-            for entity_type, files in page_ents.items():
-                all_entities[entity_type].extend(files)
+        with self._entities_lock:
+            for page_ents in self.page_entities.values():
+                for entity_type, files in page_ents.items():
+                    all_entities[entity_type].extend(files)
         
-        # Fallback to filesystem if needed
+        # Fallback to the manifest or the filesystem if needed
+        if not all_entities and ManifestReader.exists(self.entities_dir):
+            return ManifestReader(self.entities_dir).entities_by_class()
         if not all_entities and os.path.exists(self.entities_dir):
             for entity_type in os.listdir(self.entities_dir):
                 entity_dir = os.path.join(self.entities_dir, entity_type)
@@ -103,7 +363,7 @@ class EntityCropper:
                     files = [
                         os.path.join(entity_dir, f) 
                         for f in os.listdir(entity_dir) 
-                        if f.endswith(('.jpg', '.jpeg', '.png'))
+                        if f.endswith(CROP_EXTENSIONS)
                     ]
                     if files:
                         all_entities[entity_type] = files
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import tempfile
+import threading
+from collections.abc import Mapping
+from .config import Config
+
+_SCHEMA = """
+CREATE TABLE entities (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    cls TEXT NOT NULL,
+    ref TEXT NOT NULL
+)
+"""
+
+class EntityStore(Mapping):
+    """
+    Entity references of a whole run by class, in page order
+
+    A read-only mapping of class name to the list of crop paths or entity IDs,
+    like the dict process_pdf used to return. References are buffered in
+    memory; once more than max_in_memory are held they move to an SQLite
+    file, so the aggregate of a very long document does not grow the process.
+    Looking up a class loads only that class's references.
+
+    Args:
+        directory (str): Directory of the spill file, a new uniquely named SQLite
+            file per store so concurrent runs never share one; None uses the
+            system temp directory
+        max_in_memory (int): References buffered before spilling, None never spills
+    """
+
+    def __init__(self, directory=None, max_in_memory=Config.ENTITY_STORE_MAX_IN_MEMORY):
+        self.directory = directory
+        # Set on first spill
+        self.path = None
+        self.max_in_memory = max_in_memory
+        self._buffer = {}
+        self._buffered = 0
+        # Class -> total references, in the order classes were first seen
+        self._counts = {}
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def add(self, page_entities):
+        """
+        Append one page's entities
+
+        Args:
+            page_entities (dict): Entity types mapped to crop file paths or entity IDs
+        """
+        with self._lock:
+            for cls_name, refs in page_entities.items():
+                self._buffer.setdefault(cls_name, []).extend(refs)
+                self._counts[cls_name] = self._counts.get(cls_name, 0) + len(refs)
+                self._buffered += len(refs)
+            if self.max_in_memory is not None and self._buffered > self.max_in_memory:
+                self._spill()
+
+    def _spill(self):
+        if self._conn is None:
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+            fd, self.path = tempfile.mkstemp(prefix=Config.ENTITY_STORE_PREFIX, suffix=".sqlite",
+                                             dir=self.directory or None)
+            # SQLite initialises the empty file as a new database
+            os.close(fd)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(_SCHEMA)
+                self._conn.execute("CREATE INDEX entities_cls ON entities (cls, seq)")
+        with self._conn:
+            self._conn.executemany("INSERT INTO entities (cls, ref) VALUES (?, ?)",
+                                   ((cls_name, ref) for cls_name, refs in self._buffer.items() for ref in refs))
+        self._buffer = {}
+        self._buffered = 0
+
+    @property
+    def spilled(self):
+        """Whether references were moved to disk"""
+        return self._conn is not None
+
+    def counts(self):
+        """Return the number of references per class without loading them"""
+        with self._lock:
+            return dict(self._counts)
+
+    def __getitem__(self, cls_name):
+        with self._lock:
+            if cls_name not in self._counts:
+                raise KeyError(cls_name)
+            refs = []
+            if self._conn is not None:
+                # Spilled references are older than anything still buffered
+                refs = [row[0] for row in self._conn.execute(
+                    "SELECT ref FROM entities WHERE cls = ? ORDER BY seq", (cls_name,))]
+            return refs + self._buffer.get(cls_name, [])
+
+    def __iter__(self):
+        return iter(self.counts())
+
+    def __len__(self):
+        return len(self._counts)
+
+    def close(self):
+        """Close and delete the spill file; the store is empty afterwards"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                # Workspace cleanup may have removed the directory already
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                self.path = None
+            self._buffer = {}
+            self._buffered = 0
+            self._counts = {}
+
+    def __repr__(self):
+        return f"EntityStore({self.counts()})"
@@ -1,34 +1,180 @@
-from huggingface_hub import hf_hub_download
-from ultralytics import YOLO
+import time
+import numpy as np
 from .config import Config
+from .detections import PageDetections
+from .log import get_logger
+from .model_registry import get_model, warm_up
+from .tiling import class_aware_nms, make_tiles, needs_tiling
+
+logger = get_logger(__name__)
+# Per-image timings ultralytics attaches to each result -> stage names
+_SPEED_STAGES = (("preprocess", "inference.preprocess"), ("inference", "inference.forward"),
+                 ("postprocess", "inference.postprocess"))
 
 class LayoutDetector:
-    def __init__(self):
+    def __init__(self, device=Config.MODEL_DEVICE, weights_path=Config.MODEL_WEIGHTS_PATH,
+                 backend=Config.INFERENCE_BACKEND, int8=Config.QUANTIZE_INT8,
+                 detections_dir=Config.DEFAULT_DETECTIONS_DIR):
+        self.device = device
+        self.detections_dir = detections_dir
+        self.weights_path = weights_path
+        self.backend = backend
+        self.int8 = int8
         self.model = None
+        self._lock = None
     
     def load_model(self):
-        """Load the YOLO model for document layout detection"""
+        """Load the YOLO model for document layout detection from the shared registry"""
         if self.model is None:
-            weight_path = hf_hub_download(
-                repo_id=Config.MODEL_REPO_ID,
-                filename=Config.MODEL_FILENAME
-            )
-            self.model = YOLO(weight_path)
+            self.model, self._lock = get_model(device=self.device, weights_path=self.weights_path,
+                                               backend=self.backend, int8=self.int8)
         return self.model
     
-    def detect_layout(self, image_path, save=True, conf=Config.CONFIDENCE_THRESHOLD):
+    def settings(self):
+        """Settings that determine the detections this detector produces"""
+        return {
+            "repo_id": Config.MODEL_REPO_ID,
+            "filename": Config.MODEL_FILENAME,
+            "weights_path": self.weights_path,
+            "backend": self.backend,
+            "int8": self.int8,
+            "conf": Config.CONFIDENCE_THRESHOLD,
+            "image_size": Config.IMAGE_SIZE,
+        }
+    
+    def warm_up(self):
+        """Load the model and run one dummy inference ahead of the first real page"""
+        model = self.load_model()
+        with self._lock:
+            warm_up(model, device=self.device)
+        return model
+    
+    def _predict(self, source, **kwargs):
+        model = self.load_model()
+        if self.device:
+            kwargs["device"] = self.device
+        # Stage timings come from PipelineMetrics, not ultralytics' per-image log lines
+        kwargs.setdefault("verbose", False)
+        # The shared model is not safe to call from several threads at once
+        with self._lock:
+            return model.predict(source, **kwargs)
+    
+    def detect_layout(self, image, save=False, conf=Config.CONFIDENCE_THRESHOLD):
         """
         Detect layout elements in an image
         
         Args:
-            image_path (str): Path to the image
-            save (bool): Whether to save detection results
+            image (str | PIL.Image.Image): Path to the image or an in-memory page image
+            save (bool): Let ultralytics save an annotated copy under a new predict*
+                directory; overlays are normally drawn on demand by OverlayRenderer
             conf (float): Confidence threshold
             
         Returns:
             list: Detection results
         """
-        model = self.load_model()
-        results = model.predict(image_path, save=save, conf=conf, 
-                               project=Config.DEFAULT_DETECTIONS_DIR)
-        return results
\ No newline at end of file
+        results = self._predict(image, save=save, conf=conf, 
+                                project=self.detections_dir)
+        return results
+    
+    def detect_layout_batch(self, images, batch_size=Config.BATCH_SIZE, save=False,
+                            conf=Config.CONFIDENCE_THRESHOLD, pages=None, metrics=None):
+        """
+        Detect layout elements in several page images with batched inference
+        
+        Args:
+            images (list): Paths or in-memory page images
+            batch_size (int): Number of images per model.predict call
+            save (bool): Whether to save detection results
+            conf (float): Confidence threshold
+            pages (list): Page number of every image, used to attribute timings
+            metrics (PipelineMetrics): Optional metrics recording the inference stages
+            
+        Returns:
+            list: One detection result list per input image, in input order,
+                in the same shape detect_layout returns for a single image
+        """
+        batch_size = max(1, int(batch_size))
+        page_results = []
+        for start in range(0, len(images), batch_size):
+            chunk = list(images[start:start + batch_size])
+            chunk_pages = list(pages[start:start + batch_size]) if pages is not None else [None] * len(chunk)
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            results = self._predict(chunk, save=save, conf=conf,
+                                    project=self.detections_dir)
+            if metrics is not None:
+                self._record_inference(metrics, results, chunk_pages, started,
+                                       time.perf_counter() - started, time.thread_time() - cpu_started)
+            page_results.extend([r] for r in results)
+        return page_results
+    
+    def _record_inference(self, metrics, results, pages, started, wall, cpu):
+        """Record one predict call, split into the parts ultralytics measured"""
+        metrics.record("inference", wall, cpu, page=pages, start=started)
+        offset = started
+        for speed_key, stage in _SPEED_STAGES:
+            # Each result carries its share of the batch's time in milliseconds
+            seconds = [(getattr(r, "speed", None) or {}).get(speed_key) or 0.0 for r in results]
+            for page_num, ms in zip(pages, seconds):
+                metrics.record(stage, ms / 1000.0, page=page_num)
+            # One trace event per part, laid out in order inside the predict call
+            total = sum(seconds) / 1000.0
+            metrics.trace_event(stage, offset, total, page=pages)
+            offset += total
+    
+    def detect_pages(self, images, batch_size=Config.BATCH_SIZE, save=False,
+                     conf=Config.CONFIDENCE_THRESHOLD, tiling=Config.TILING_ENABLED, pages=None,
+                     metrics=None):
+        """
+        Detect layout elements in page images, tiling oversized pages
+        
+        Normal pages take the single-pass batched path. With tiling on, pages
+        that are very wide or very large are split into overlapping tiles; the
+        tiles and the whole page go through the model as one batch and the
+        boxes are merged back into page coordinates with class-aware NMS.
+        
+        Args:
+            images (list): In-memory page images
+            batch_size (int): Number of images per model.predict call
+            save (bool): Whether to save detection results of single-pass pages
+            conf (float): Confidence threshold
+            tiling (bool): Tile pages selected by needs_tiling
+            pages (list): Page number of every image, used to attribute timings
+            metrics (PipelineMetrics): Optional metrics recording the inference stages
+            
+        Returns:
+            list: One PageDetections per input image, in input order
+        """
+        pages = list(pages) if pages is not None else [None] * len(images)
+        detections = [None] * len(images)
+        single = [i for i, image in enumerate(images) if not (tiling and needs_tiling(image.size))]
+        if single:
+            results = self.detect_layout_batch([images[i] for i in single], batch_size=batch_size,
+                                               save=save, conf=conf, pages=[pages[i] for i in single],
+                                               metrics=metrics)
+            for i, page_results in zip(single, results):
+                detections[i] = PageDetections.from_results(page_results)
+        
+        for i, image in enumerate(images):
+            if detections[i] is None:
+                detections[i] = self._detect_tiled(image, conf, pages[i], metrics)
+        return detections
+    
+    def _detect_tiled(self, image, conf, page_num=None, metrics=None):
+        tiles = make_tiles(image.size)
+        # The whole page catches objects larger than a tile
+        sources = [image] + [image.crop(tile) for tile in tiles]
+        offsets = [(0, 0)] + [tile[:2] for tile in tiles]
+        results = self.detect_layout_batch(sources, batch_size=len(sources), conf=conf,
+                                           pages=[page_num] * len(sources), metrics=metrics)
+        
+        boxes, classes, scores, names = [], [], [], {}
+        for (x0, y0), page_results in zip(offsets, results):
+            part = PageDetections.from_results(page_results)
+            names = part.names or names
+            boxes.append(part.boxes + np.array([x0, y0, x0, y0], dtype=np.float32))
+            classes.append(part.classes)
+            scores.append(part.scores)
+        boxes, classes, scores = np.concatenate(boxes), np.concatenate(classes), np.concatenate(scores)
+        keep = class_aware_nms(boxes, scores, classes)
+        logger.debug("Tiled %dx%d page into %d tiles, kept %d boxes", image.size[0], image.size[1], len(tiles), len(keep))
+        return PageDetections(boxes[keep], classes[keep], scores[keep], names, image.size)
@@ -0,0 +1,31 @@
+import logging
+from .config import Config
+
+LOGGER_NAME = "layout"
+
+# Library use stays silent until the application configures logging
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+def get_logger(module_name):
+    """Return the logger of a module, e.g. get_logger(__name__) -> "layout.pipeline" """
+    return logging.getLogger(f"{LOGGER_NAME}.{module_name.rsplit('.', 1)[-1]}")
+
+def setup_logging(level=None):
+    """
+    Send this package's log records to stderr
+
+    Args:
+        level (str | int): Log level such as "INFO" or logging.DEBUG, defaults to Config.LOG_LEVEL
+
+    Returns:
+        logging.Logger: The package logger
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    level = level or Config.LOG_LEVEL
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not any(getattr(handler, "_layout_handler", False) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+        handler._layout_handler = True
+        logger.addHandler(handler)
+    return logger
@@ -0,0 +1,235 @@
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+import numpy as np
+from PIL import Image
+from .config import Config
+from .crop_cache import LazyCropSource
+
+MANIFEST_FILE = "manifest.jsonl"
+BOXES_FILE = "boxes.npy"
+
+class ManifestWriter:
+    """
+    Writes detections to one JSONL manifest and packs crops into tar shards
+
+    Every detection becomes one manifest row holding its page, class, score
+    and bbox; on close the boxes of every row are also saved as a single
+    (N, 4) NumPy array in row order. Crop bytes go into tar shards of roughly
+    shard_bytes each, and the row records the shard name and data offset so
+    one crop can be read back with a single seek instead of a directory scan.
+    """
+
+    def __init__(self, root, shard_bytes=Config.MANIFEST_SHARD_BYTES):
+        self.root = root
+        self.shard_bytes = shard_bytes
+        os.makedirs(root, exist_ok=True)
+        # Crops cached for an earlier manifest in this directory are stale
+        LazyCropSource.invalidate(root)
+        self._lock = threading.Lock()
+        self._manifest = open(os.path.join(root, MANIFEST_FILE), "a", encoding="utf-8")
+        self._shard_index = self._next_shard_index()
+        self._shard = None
+        self._shard_name = None
+
+    def _shard_names(self):
+        return sorted(f for f in os.listdir(self.root) if f.startswith("crops-") and f.endswith(".tar"))
+
+    def _next_shard_index(self):
+        # One past the highest existing shard, trimming may have removed some
+        indices = [int(name[len("crops-"):-len(".tar")]) for name in self._shard_names()]
+        return max(indices, default=-1) + 1
+
+    def _current_shard(self):
+        if self._shard is not None and self._shard.fileobj.tell() >= self.shard_bytes:
+            self._shard.close()
+            self._shard = None
+        if self._shard is None:
+            self._shard_name = f"crops-{self._shard_index:05d}.tar"
+            self._shard_index += 1
+            self._shard = tarfile.open(os.path.join(self.root, self._shard_name), "w")
+        return self._shard
+
+    def add(self, entity_id, page_no, cls_name, score, box, crop_bytes=None, crop_format=None,
+            image_size=None, text=None):
+        """
+        Append one detection, and optionally its encoded crop
+
+        Args:
+            entity_id (str): Unique ID of the detection
+            page_no (int): Page number the detection belongs to
+            cls_name (str): Class name
+            score (float): Confidence score
+            box (tuple): (x1, y1, x2, y2) in page image pixels
+            crop_bytes (bytes): Encoded crop to pack into the current shard
+            crop_format (str): File extension of crop_bytes, e.g. "jpg"
+            image_size (tuple): (width, height) of the page image box refers to
+            text (str): Text inside the box, read from the PDF's text layer
+
+        Returns:
+            str: entity_id
+        """
+        record = {
+            "id": entity_id,
+            "page": int(page_no),
+            "class": cls_name,
+            "score": round(float(score), 4),
+            "bbox": [round(float(v), 2) for v in box],
+        }
+        if image_size is not None:
+            record["image_size"] = [int(v) for v in image_size]
+        if text is not None:
+            record["text"] = text
+        with self._lock:
+            if crop_bytes is not None:
+                shard = self._current_shard()
+                info = tarfile.TarInfo(f"{entity_id}.{crop_format}")
+                info.size = len(crop_bytes)
+                info.mtime = int(time.time())
+                # Data starts right after this member's header block(s)
+                offset = shard.offset + len(info.tobuf(shard.format, shard.encoding, shard.errors))
+                shard.addfile(info, io.BytesIO(crop_bytes))
+                # The row is flushed below, its crop must not be left in a buffer
+                shard.fileobj.flush()
+                record.update({"shard": self._shard_name, "offset": offset,
+                               "size": info.size, "format": crop_format})
+            self._manifest.write(json.dumps(record) + "\n")
+            self._manifest.flush()
+        return entity_id
+
+    def trim(self, keep_pages):
+        """
+        Drop the rows and packed crops of every page not in keep_pages
+
+        Used when resuming an interrupted run: pages the checkpoint journal
+        did not record as done may have been written partly, and are
+        written again by the resumed run. Shards are truncated after their
+        last kept crop, shards without one are removed.
+
+        Args:
+            keep_pages (iterable): Page numbers whose rows stay
+
+        Returns:
+            int: Number of rows dropped
+        """
+        keep_pages = set(keep_pages)
+        manifest_path = os.path.join(self.root, MANIFEST_FILE)
+        with self._lock:
+            if self._shard is not None:
+                self._shard.close()
+                self._shard = None
+            self._manifest.close()
+            records = _read_records(manifest_path)
+            kept = [r for r in records if r["page"] in keep_pages]
+            tmp_path = f"{manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record) + "\n" for record in kept)
+            os.replace(tmp_path, manifest_path)
+
+            # A member ends after its data, padded to the next 512-byte block
+            shard_ends = {}
+            for record in kept:
+                if "shard" in record:
+                    end = record["offset"] + -(-record["size"] // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                    shard_ends[record["shard"]] = max(shard_ends.get(record["shard"], 0), end)
+            for name in self._shard_names():
+                path = os.path.join(self.root, name)
+                if name not in shard_ends:
+                    os.remove(path)
+                    continue
+                with open(path, "r+b") as f:
+                    f.truncate(shard_ends[name])
+                    f.seek(shard_ends[name])
+                    # End-of-archive marker, so the shard stays a valid tar
+                    f.write(b"\0" * 2 * tarfile.BLOCKSIZE)
+
+            boxes_path = os.path.join(self.root, BOXES_FILE)
+            if os.path.exists(boxes_path):
+                os.remove(boxes_path)
+            self._manifest = open(manifest_path, "a", encoding="utf-8")
+            self._shard_index = self._next_shard_index()
+        LazyCropSource.invalidate(self.root)
+        return len(records) - len(kept)
+
+    def close(self):
+        """Finish the current shard and write the box array of every row"""
+        with self._lock:
+            if self._shard is not None:
+                self._shard.close()
+                self._shard = None
+            if not self._manifest.closed:
+                self._manifest.close()
+                # Rebuilt from the rows, so it stays aligned with them across resumed runs
+                records = _read_records(os.path.join(self.root, MANIFEST_FILE))
+                boxes = np.asarray([r["bbox"] for r in records], dtype=np.float32).reshape(-1, 4)
+                np.save(os.path.join(self.root, BOXES_FILE), boxes)
+
+def _read_records(manifest_path):
+    """Read the rows of a manifest, ignoring a line cut short by a crash"""
+    records = []
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    return records
+
+class ManifestReader:
+    """Reads a manifest written by ManifestWriter and serves crops by ID"""
+
+    def __init__(self, root):
+        self.root = root
+        self.records = _read_records(os.path.join(root, MANIFEST_FILE))
+        self._by_id = {record["id"]: record for record in self.records}
+
+    @staticmethod
+    def exists(root):
+        return os.path.exists(os.path.join(root, MANIFEST_FILE))
+
+    def __contains__(self, entity_id):
+        return entity_id in self._by_id
+
+    def get(self, entity_id):
+        """Return the manifest record for an entity"""
+        return self._by_id[entity_id]
+
+    def boxes(self):
+        """Return every bbox as an (N, 4) array in manifest order"""
+        path = os.path.join(self.root, BOXES_FILE)
+        if os.path.exists(path):
+            boxes = np.load(path)
+            # A run still writing, or killed before close, has rows without boxes yet
+            if len(boxes) == len(self.records):
+                return boxes
+        return np.asarray([r["bbox"] for r in self.records], dtype=np.float32).reshape(-1, 4)
+
+    def entities_by_class(self, page_no=None):
+        """Group entity IDs by class, optionally for one page only"""
+        grouped = {}
+        for record in self.records:
+            if page_no is None or record["page"] == page_no:
+                grouped.setdefault(record["class"], []).append(record["id"])
+        return grouped
+
+    def read_crop_bytes(self, entity_id):
+        """Read one encoded crop with a single seek into its shard"""
+        record = self._by_id[entity_id]
+        if "shard" not in record:
+            raise KeyError(f"No crop stored for entity '{entity_id}'")
+        with open(os.path.join(self.root, record["shard"]), "rb") as f:
+            f.seek(record["offset"])
+            return f.read(record["size"])
+
+    def open_crop(self, entity_id):
+        """Return one crop as a PIL image"""
+        data = self.read_crop_bytes(entity_id)
+        if self._by_id[entity_id].get("format") == "npy":
+            return Image.fromarray(np.load(io.BytesIO(data)))
+        return Image.open(io.BytesIO(data))
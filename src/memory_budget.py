@@ -0,0 +1,125 @@
+import math
+import re
+import threading
+from .config import Config
+from .log import get_logger
+from .metrics import current_rss_bytes
+
+logger = get_logger(__name__)
+
+_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "KIB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "MIB": 1024 ** 2,
+          "G": 1024 ** 3, "GB": 1024 ** 3, "GIB": 1024 ** 3, "T": 1024 ** 4, "TB": 1024 ** 4, "TIB": 1024 ** 4}
+
+def parse_size(value):
+    """
+    Parse a memory size such as "2GB", "512M" or a plain byte count
+
+    Args:
+        value (str | int): The size; units are binary, so 1GB is 1024**3 bytes
+
+    Returns:
+        int: Size in bytes
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", value)
+    if not match or match.group(2).upper() not in _UNITS:
+        raise ValueError(f"Invalid memory size '{value}', expected e.g. 2GB or 512MB")
+    return int(float(match.group(1)) * _UNITS[match.group(2).upper()])
+
+class MemoryBudget:
+    """
+    Keeps the page rasters of a run within a memory budget
+
+    The budget left after what the process already uses (the loaded model,
+    mostly) is measured once; raster_fraction of it goes to page rasters in
+    flight. Every page of an inference batch gets an equal share, and a page
+    whose raster would not fit its share is rendered at a lower DPI. Prefetch
+    beyond one batch waits until enough of the raster budget is free.
+
+    Args:
+        max_bytes (int): Memory the whole process may use
+        pages_per_batch (int): Pages that are always allowed in flight together
+        raster_fraction (float): Share of the free budget for page rasters
+        bytes_per_pixel (int): Bytes a page raster costs per pixel, all copies included
+        min_dpi (float): Pages are never rendered below this resolution
+    """
+
+    def __init__(self, max_bytes, pages_per_batch=Config.BATCH_SIZE,
+                 raster_fraction=Config.MEMORY_RASTER_FRACTION,
+                 bytes_per_pixel=Config.RASTER_BYTES_PER_PIXEL, min_dpi=Config.MIN_RENDER_DPI):
+        self.max_bytes = max_bytes
+        self.pages_per_batch = max(1, pages_per_batch)
+        self.bytes_per_pixel = bytes_per_pixel
+        self.min_dpi = min_dpi
+        used = current_rss_bytes() or 0
+        self.raster_bytes = max(0, max_bytes - used) * raster_fraction
+        self.page_bytes = self.raster_bytes / self.pages_per_batch
+        if self.raster_bytes == 0:
+            logger.warning("The process already uses %d MB of the %d MB memory budget, rendering at %g DPI",
+                           used // 2 ** 20, max_bytes // 2 ** 20, min_dpi)
+        self._in_use = 0
+        self._pages = 0
+        self._cond = threading.Condition()
+
+    def raster_size(self, rect, dpi):
+        """
+        Estimate the memory a page raster takes
+
+        Args:
+            rect (fitz.Rect): The page rectangle in points
+            dpi (float): Render resolution
+
+        Returns:
+            int: Bytes
+        """
+        zoom = dpi / 72.0
+        return math.ceil(rect.width * zoom) * math.ceil(rect.height * zoom) * self.bytes_per_pixel
+
+    def page_dpi(self, rect, dpi):
+        """
+        Highest resolution, up to dpi, at which a page's raster fits its share
+
+        Args:
+            rect (fitz.Rect): The page rectangle in points
+            dpi (float): Requested render resolution
+
+        Returns:
+            float: The resolution to render at
+        """
+        area = max(rect.width * rect.height, 1.0)
+        fit = 72.0 * math.sqrt(self.page_bytes / (self.bytes_per_pixel * area))
+        if fit < self.min_dpi:
+            logger.debug("Page of %.0fx%.0f pt exceeds its memory share even at %g DPI",
+                         rect.width, rect.height, self.min_dpi)
+        return max(self.min_dpi, min(dpi, fit))
+
+    def acquire(self, nbytes, stop=None):
+        """
+        Reserve raster memory for a page, waiting while the budget is used up
+
+        A full inference batch is always let through so the pipeline can make
+        progress, whatever its pages cost.
+
+        Args:
+            nbytes (int): Estimated raster size of the page
+            stop (threading.Event): Give up waiting once set
+
+        Returns:
+            int: nbytes, to pass to release()
+        """
+        with self._cond:
+            while self._pages >= self.pages_per_batch and self._in_use + nbytes > self.raster_bytes:
+                if stop is not None and stop.is_set():
+                    break
+                self._cond.wait(0.1)
+            self._in_use += nbytes
+            self._pages += 1
+        return nbytes
+
+    def release(self, nbytes):
+        """Return a page's reservation once its raster is gone"""
+        with self._cond:
+            self._in_use -= nbytes
+            self._pages -= 1
+            self._cond.notify_all()
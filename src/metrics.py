@@ -0,0 +1,344 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process in bytes, or None if unknown"""
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module; psutil comes with ultralytics
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        except Exception:
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def current_rss_bytes():
+    """Return the resident set size of this process in bytes, or None if unknown"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+def timed(metrics, name, page=None):
+    """Return metrics.stage(name, page), or a no-op context when metrics is None"""
+    return metrics.stage(name, page) if metrics is not None else contextlib.nullcontext()
+
+def format_summary(summary):
+    """
+    Describe a PipelineMetrics summary in one line
+
+    Args:
+        summary (dict): PipelineMetrics.summary() or the metrics of one page
+
+    Returns:
+        str: e.g. "render 1.20s (cpu 1.10s), inference 4.00s (cpu 3.90s), 2.1 MB written"
+    """
+    # Sub-stages are already part of their parent stage
+    parts = [f"{name} {stage['wall_seconds']:.2f}s"
+             + (f" (cpu {stage['cpu_seconds']:.2f}s)" if stage["cpu_seconds"] is not None else "")
+             for name, stage in summary["stages"].items() if "." not in name]
+    parts.append(f"{summary['bytes_written'] / 1e6:.1f} MB written")
+    if summary.get("rss_bytes"):
+        parts.append(f"RSS {summary['rss_bytes'] / 1e6:.0f} MB")
+    if summary.get("peak_rss_bytes"):
+        # ru_maxrss: the highest RSS of the whole process so far, not of this document
+        parts.append(f"process peak RSS {summary['peak_rss_bytes'] / 1e6:.0f} MB")
+    return ", ".join(parts)
+
+def _add(stages, name, wall, cpu):
+    # CPU time stays None for stages only known by their wall time
+    totals = stages.setdefault(name, [0.0, None, 0])
+    totals[0] += wall
+    if cpu is not None:
+        totals[1] = (totals[1] or 0.0) + cpu
+    totals[2] += 1
+
+def _stage_dict(stages):
+    return {name: {"wall_seconds": round(wall, 6), "cpu_seconds": round(cpu, 6) if cpu is not None else None,
+                   "calls": calls}
+            for name, (wall, cpu, calls) in sorted(stages.items())}
+
+class PipelineMetrics:
+    """
+    Wall and CPU time per stage, bytes written and memory use of one document
+
+    Stages are render, render_region, triage, text_layer, inference (with its
+    inference.preprocess, inference.forward and inference.postprocess parts as
+    reported by ultralytics), crop, encode and save. Every stage is totalled
+    per page and per document. CPU time is the CPU time of the thread running
+    the stage, so concurrent stages do not count each other's work.
+
+    Args:
+        trace (bool): Also keep every stage as an event for write_trace
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._pages = {}
+        self._events = []
+        self._threads = {}
+        self.bytes_written = 0
+        self.pages_done = 0
+        self.pages_failed = 0
+        self._finished = None
+
+    def _page(self, page):
+        return self._pages.setdefault(page, {"stages": {}, "bytes_written": 0})
+
+    @contextlib.contextmanager
+    def stage(self, name, page=None):
+        """
+        Time a block of code as one stage
+
+        Args:
+            name (str): Stage name
+            page (int | list): Page the work belongs to; the time of work done for
+                several pages at once is split evenly between them
+        """
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, time.thread_time() - cpu_start,
+                        page=page, start=start)
+
+    def record(self, name, wall, cpu=None, page=None, start=None):
+        """
+        Add a stage measured elsewhere
+
+        Args:
+            name (str): Stage name
+            wall (float): Wall time in seconds
+            cpu (float): CPU time in seconds, if known
+            page (int | list): Page or pages the work belongs to
+            start (float): time.perf_counter() at the start, needed for trace events
+        """
+        pages = page if isinstance(page, (list, tuple)) else [page]
+        share = 1.0 / len(pages) if pages else 1.0
+        with self._lock:
+            _add(self._stages, name, wall, cpu)
+            for page_num in pages:
+                if page_num is not None:
+                    _add(self._page(page_num)["stages"], name, wall * share,
+                         cpu * share if cpu is not None else None)
+        if start is not None:
+            self.trace_event(name, start, wall, page)
+
+    def trace_event(self, name, start, wall, page=None):
+        """Add a trace event without counting it in the totals"""
+        if not self.trace:
+            return
+        thread = threading.current_thread()
+        pages = page if isinstance(page, (list, tuple)) else [page]
+        args = {"pages": list(pages)} if len(pages) > 1 else {"page": pages[0]}
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append({"name": name, "cat": "pipeline", "ph": "X",
+                                 "ts": round((start - self._origin) * 1e6, 1), "dur": round(wall * 1e6, 1),
+                                 "pid": os.getpid(), "tid": thread.ident, "args": args})
+
+    def add_bytes(self, count, page=None):
+        """Count bytes written to disk for a page"""
+        with self._lock:
+            self.bytes_written += count
+            if page is not None:
+                self._page(page)["bytes_written"] += count
+
+    def page_done(self, page):
+        """
+        Close a finished page's record
+
+        Args:
+            page (int): Page number
+
+        Returns:
+            dict: The page's stages, bytes written and the process RSS sampled when
+                the page finished (pages in flight at the same time share it)
+        """
+        rss = current_rss_bytes()
+        with self._lock:
+            record = self._pages.pop(page, None) or {"stages": {}, "bytes_written": 0}
+            self.pages_done += 1
+        return {"stages": _stage_dict(record["stages"]), "bytes_written": record["bytes_written"],
+                "rss_bytes": rss}
+
+    def page_failed(self, page):
+        """Drop a failed page's record"""
+        with self._lock:
+            self._pages.pop(page, None)
+            self.pages_failed += 1
+
+    def summary(self):
+        """
+        Document totals
+
+        Returns:
+            dict: Wall time, page counts, bytes written, the process peak RSS (of the
+                whole process since it started) and per-stage totals
+        """
+        peak = peak_rss_bytes()
+        with self._lock:
+            end = self._finished or time.time()
+            return {
+                "wall_seconds": round(end - self.started, 6),
+                "pages": self.pages_done,
+                "pages_failed": self.pages_failed,
+                "bytes_written": self.bytes_written,
+                "peak_rss_bytes": peak,
+                "stages": _stage_dict(self._stages),
+            }
+
+    def finish(self, registry=None):
+        """
+        Stop the document clock and add the totals to a registry
+
+        Args:
+            registry (MetricsRegistry): Registry to update, defaults to REGISTRY
+
+        Returns:
+            dict: The summary
+        """
+        if self._finished is None:
+            self._finished = time.time()
+            (registry or REGISTRY).add(self.summary())
+        return self.summary()
+
+    def write_trace(self, path):
+        """
+        Write the recorded stages as a Chrome trace (chrome://tracing, Perfetto)
+
+        Args:
+            path (str): Output JSON file
+
+        Returns:
+            str: path
+        """
+        with self._lock:
+            events = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                      for tid, name in self._threads.items()]
+            events.extend(self._events)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+class MetricsRegistry:
+    """Cumulative totals of every document processed, for long-running services"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.pages = 0
+        self.pages_failed = 0
+        self.bytes_written = 0
+        self.peak_rss = 0
+        self._stages = {}
+
+    def add(self, summary):
+        """Add the summary of one document, e.g. PipelineMetrics.summary()"""
+        with self._lock:
+            self.documents += 1
+            self.pages += summary["pages"]
+            self.pages_failed += summary["pages_failed"]
+            self.bytes_written += summary["bytes_written"]
+            self.peak_rss = max(self.peak_rss, summary["peak_rss_bytes"] or 0)
+            for name, stage in summary["stages"].items():
+                totals = self._stages.setdefault(name, [0.0, None, 0])
+                totals[0] += stage["wall_seconds"]
+                if stage["cpu_seconds"] is not None:
+                    totals[1] = (totals[1] or 0.0) + stage["cpu_seconds"]
+                totals[2] += stage["calls"]
+
+    def to_prometheus(self):
+        """
+        Render the totals in the Prometheus text exposition format
+
+        Returns:
+            str: Metrics text
+        """
+        with self._lock:
+            peak = max(self.peak_rss, peak_rss_bytes() or 0)
+            lines = [
+                "# HELP layout_documents_total Documents processed.",
+                "# TYPE layout_documents_total counter",
+                f"layout_documents_total {self.documents}",
+                "# HELP layout_pages_total Pages processed.",
+                "# TYPE layout_pages_total counter",
+                f"layout_pages_total {self.pages}",
+                "# HELP layout_pages_failed_total Pages that failed.",
+                "# TYPE layout_pages_failed_total counter",
+                f"layout_pages_failed_total {self.pages_failed}",
+                "# HELP layout_bytes_written_total Bytes of crops and page images written.",
+                "# TYPE layout_bytes_written_total counter",
+                f"layout_bytes_written_total {self.bytes_written}",
+                "# HELP layout_peak_rss_bytes Highest peak resident set size seen.",
+                "# TYPE layout_peak_rss_bytes gauge",
+                f"layout_peak_rss_bytes {peak}",
+            ]
+            for metric, index, help_text in (
+                    ("layout_stage_seconds_total", 0, "Wall time spent in each stage."),
+                    ("layout_stage_cpu_seconds_total", 1, "CPU time spent in each stage."),
+                    ("layout_stage_calls_total", 2, "Times each stage ran.")):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for name, totals in sorted(self._stages.items()):
+                    value = totals[index]
+                    if value is not None:
+                        lines.append(f'{metric}{{stage="{name}"}} {round(value, 6) if index < 2 else value}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry fed by every PipelineMetrics.finish()
+REGISTRY = MetricsRegistry()
+
+def start_metrics_server(port, host="127.0.0.1", registry=None):
+    """
+    Serve the registry at http://host:port/metrics from a daemon thread
+
+    Args:
+        port (int): Port to listen on, 0 picks a free one
+        host (str): Interface to bind
+        registry (MetricsRegistry): Registry to expose, defaults to REGISTRY
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it
+    """
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
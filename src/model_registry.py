@@ -0,0 +1,164 @@
+import os
+import shutil
+import threading
+import numpy as np
+from huggingface_hub import hf_hub_download
+from ultralytics import YOLO
+from .config import Config
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+INFERENCE_BACKENDS = ("torch", "onnx", "openvino")
+
+# Process-wide cache of loaded models, shared by the CLI, process_pdf and the
+# Streamlit app so a checkpoint is only read from disk once per process
+_models = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+def resolve_weights(repo_id=Config.MODEL_REPO_ID, filename=Config.MODEL_FILENAME,
+                    weights_path=Config.MODEL_WEIGHTS_PATH):
+    """
+    Find the model weights on disk, downloading them only as a last resort
+
+    Args:
+        repo_id (str): Hugging Face repository holding the weights
+        filename (str): Weights file name inside the repository
+        weights_path (str): Optional local weights file that bypasses the hub entirely
+
+    Returns:
+        str: Path to the weights file
+    """
+    if weights_path:
+        if not os.path.exists(weights_path):
+            raise FileNotFoundError(f"Model weights not found: {weights_path}")
+        return weights_path
+
+    # Prefer the local hub cache so startup does not wait on the network
+    try:
+        return hf_hub_download(repo_id=repo_id, filename=filename, local_files_only=True)
+    except Exception:
+        return hf_hub_download(repo_id=repo_id, filename=filename)
+
+def export_weights(weights, backend=Config.INFERENCE_BACKEND, int8=Config.QUANTIZE_INT8,
+                   export_dir=Config.EXPORT_DIR, image_size=Config.IMAGE_SIZE,
+                   calibration_data=Config.INT8_CALIBRATION_DATA):
+    """
+    Export PyTorch weights to a CPU-optimized backend, reusing a cached export
+
+    ONNX INT8 is quantized dynamically and needs nothing else. OpenVINO INT8
+    is calibrated on calibration_data, an ultralytics dataset yaml of
+    document pages; without one ultralytics would download COCO, which
+    fails offline and calibrates on photos, so it is required.
+
+    Args:
+        weights (str): Path to the PyTorch weights
+        backend (str): One of INFERENCE_BACKENDS
+        int8 (bool): Produce an INT8 quantized variant
+        export_dir (str): Directory holding exported artifacts
+        image_size (int): Input size the export is traced at, part of the cached name
+        calibration_data (str): Dataset yaml calibrating an OpenVINO INT8 export
+
+    Returns:
+        str: Path to the model file or directory to load with YOLO
+
+    Raises:
+        ValueError: For an unknown backend, or OpenVINO INT8 without calibration_data
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {INFERENCE_BACKENDS}")
+    if backend == "torch":
+        return weights
+    if backend == "openvino" and int8 and not calibration_data:
+        raise ValueError("OpenVINO INT8 export needs a calibration dataset of document pages, "
+                         "set Config.INT8_CALIBRATION_DATA to an ultralytics dataset yaml")
+
+    # An export is traced at one input size, a changed IMAGE_SIZE needs a new one
+    stem = f"{os.path.splitext(os.path.basename(weights))[0]}-{image_size}"
+    suffix = "-int8" if int8 else ""
+    if backend == "onnx":
+        target = os.path.join(export_dir, f"{stem}{suffix}.onnx")
+    else:
+        target = os.path.join(export_dir, f"{stem}{suffix}_openvino_model")
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(export_dir, exist_ok=True)
+    logger.info("Exporting %s to %s%s (one-off)...", os.path.basename(weights), backend, " INT8" if int8 else "")
+    if backend == "onnx":
+        fp32 = os.path.join(export_dir, f"{stem}.onnx")
+        if not os.path.exists(fp32):
+            # Dynamic axes keep multi-page batches working with ONNX Runtime
+            exported = YOLO(weights).export(format="onnx", imgsz=image_size, dynamic=True)
+            shutil.move(exported, fp32)
+        if int8:
+            # Dynamic quantization needs no calibration data
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(fp32, target, weight_type=QuantType.QUInt8)
+    else:
+        kwargs = {"int8": int8}
+        if int8:
+            kwargs["data"] = calibration_data
+        exported = YOLO(weights).export(format="openvino", imgsz=image_size, dynamic=True, **kwargs)
+        shutil.move(exported, target)
+    return target
+
+def _model_key(repo_id, filename, device, weights_path, backend, int8):
+    return (weights_path or f"{repo_id}/{filename}", device or "auto", backend, bool(int8))
+
+def get_model(repo_id=Config.MODEL_REPO_ID, filename=Config.MODEL_FILENAME, device=Config.MODEL_DEVICE,
+              weights_path=Config.MODEL_WEIGHTS_PATH, warmup=Config.WARMUP_ON_LOAD,
+              backend=Config.INFERENCE_BACKEND, int8=Config.QUANTIZE_INT8):
+    """
+    Return the shared model for the given weights and device, loading it on first use
+
+    Args:
+        repo_id (str): Hugging Face repository holding the weights
+        filename (str): Weights file name inside the repository
+        device (str): Torch device such as "cpu" or "cuda:0", None lets ultralytics choose
+        weights_path (str): Optional local weights file that bypasses the hub entirely
+        warmup (bool): Run one dummy inference right after loading
+        backend (str): Inference backend, one of INFERENCE_BACKENDS
+        int8 (bool): Use the INT8 quantized export of a non-torch backend
+
+    Returns:
+        tuple: (model, lock) where lock must be held while calling model.predict
+    """
+    key = _model_key(repo_id, filename, device, weights_path, backend, int8)
+    with _registry_lock:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        lock = _locks[key]
+
+    # Load under the per-model lock so concurrent callers wait for one load
+    with lock:
+        model = _models.get(key)
+        if model is None:
+            weights = export_weights(resolve_weights(repo_id, filename, weights_path),
+                                     backend=backend, int8=int8)
+            # Exported models return the same Results (boxes.xyxy/cls/conf, names)
+            model = YOLO(weights, task="detect")
+            if warmup:
+                warm_up(model, device=device)
+            _models[key] = model
+    return model, lock
+
+def warm_up(model, image_size=Config.IMAGE_SIZE, device=Config.MODEL_DEVICE):
+    """
+    Run a dummy inference so the first real page does not pay for lazy initialisation
+
+    Args:
+        model: Loaded YOLO model
+        image_size (int): Side length of the blank warm-up image
+        device (str): Torch device to warm up on
+    """
+    dummy = np.full((image_size, image_size, 3), 255, dtype=np.uint8)
+    kwargs = {"device": device} if device else {}
+    model.predict(dummy, save=False, verbose=False, **kwargs)
+
+def clear_models():
+    """Drop every cached model, e.g. after changing Config.MODEL_FILENAME"""
+    with _registry_lock:
+        _models.clear()
+        _locks.clear()
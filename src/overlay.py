@@ -0,0 +1,92 @@
+import os
+from PIL import ImageDraw
+from .checkpoint import CheckpointJournal
+from .config import Config
+from .pdf_processor import PDFProcessor
+
+# Distinct box colours, picked by class ID
+_PALETTE = [(230, 25, 75), (60, 180, 75), (0, 130, 200), (245, 130, 48), (145, 30, 180), (70, 240, 240),
+            (240, 50, 230), (210, 245, 60), (0, 128, 128), (170, 110, 40), (128, 0, 0), (0, 0, 128)]
+
+def draw_detections(image, detections):
+    """
+    Draw detection boxes and labels onto a copy of a page image
+
+    Args:
+        image (PIL.Image.Image): Page rendered at detections.image_size
+        detections (PageDetections): Detections of the page
+
+    Returns:
+        PIL.Image.Image: The annotated page
+    """
+    annotated = image.convert("RGB")
+    draw = ImageDraw.Draw(annotated)
+    width = max(2, round(max(annotated.size) / 500))
+    for box, cls, score in zip(detections.boxes, detections.classes, detections.scores):
+        color = _PALETTE[int(cls) % len(_PALETTE)]
+        x1, y1, x2, y2 = (float(v) for v in box)
+        draw.rectangle((x1, y1, x2, y2), outline=color, width=width)
+        label = f"{detections.class_name(cls)} {score:.2f}"
+        left, top, right, bottom = draw.textbbox((x1, y1), label)
+        draw.rectangle((left, top - (bottom - top) - 2, right + 4, y1), fill=color)
+        draw.text((x1 + 2, top - (bottom - top) - 1), label, fill=(255, 255, 255))
+    return annotated
+
+class OverlayRenderer:
+    """
+    Produces annotated detection images on demand from a run's stored detections
+
+    Overlays are drawn only for the pages someone asks for, from the
+    detections in the run's checkpoint journal, and written once to
+    <detections_dir>/page_<n>.jpg; later requests reuse the file until the
+    page is processed again.
+    """
+
+    def __init__(self, output_root=None, pdf_path=None):
+        self.journal = CheckpointJournal.load(CheckpointJournal.path_for(output_root))
+        self.pdf_path = pdf_path or self.journal.pdf_path
+        self.detections_dir = Config.output_dirs(output_root)[2]
+        self._processor = PDFProcessor()
+
+    def close(self):
+        self._processor.close()
+
+    def pages(self):
+        """Return the page numbers that have stored detections"""
+        return [p for p in self.journal.completed_pages() if self.journal.has_detections(p)]
+
+    def overlay_path(self, page_num):
+        return os.path.join(self.detections_dir, f"page_{page_num:05d}.jpg")
+
+    def render(self, page_num):
+        """
+        Return the overlay image file of one page, drawing it if needed
+
+        Args:
+            page_num (int): Page number (1-based index)
+
+        Returns:
+            str: Path to the overlay JPEG
+        """
+        path = self.overlay_path(page_num)
+        record_path = self.journal.record_path(page_num)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(record_path):
+            return path
+
+        detections = self.journal.detections(page_num)
+        if detections is None:
+            raise KeyError(f"No detections stored for page {page_num}")
+        if self.pdf_path is None or not os.path.exists(self.pdf_path):
+            raise FileNotFoundError(f"Source PDF of this run is not available: {self.pdf_path}")
+        # Render at the size the boxes refer to; skipped blank pages have no size
+        dpi = None
+        if detections.image_size[0] > 0:
+            rect = self._processor.open_document(self.pdf_path)[page_num - 1].rect
+            dpi = detections.image_size[0] * 72.0 / rect.width
+        page_image = self._processor.render_page(self.pdf_path, page_num, dpi=dpi)
+        if dpi is not None and page_image.size != detections.image_size:
+            page_image = page_image.resize(detections.image_size)
+
+        os.makedirs(self.detections_dir, exist_ok=True)
+        draw_detections(page_image, detections).save(path, "JPEG", quality=85)
+        return path
@@ -0,0 +1,105 @@
+import time
+
+def parse_page_ranges(spec, total_pages):
+    """
+    Parse a page specification such as "1-5,40,90-95"
+
+    Open ranges are allowed: "90-" runs to the last page and "-5" starts at
+    the first. Pages outside the document are dropped; a reversed range such
+    as "5-3" is an error rather than an empty selection.
+
+    Args:
+        spec (str | list): Page specification, or an iterable of page numbers
+        total_pages (int): Number of pages in the document
+
+    Returns:
+        list: Sorted unique 1-based page numbers
+    """
+    if not isinstance(spec, str):
+        return sorted({int(p) for p in spec if 1 <= int(p) <= total_pages})
+
+    pages = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        try:
+            first, _, last = part.partition("-")
+            start = int(first) if first else 1
+            end = int(last) if last else total_pages
+            if "-" not in part:
+                end = start
+        except ValueError:
+            raise ValueError(f"Invalid page range '{part}' in '{spec}'")
+        # Open ranges may point past the document, but both ends given must be in order
+        if first and last and start > end:
+            raise ValueError(f"Reversed page range '{part}' in '{spec}'")
+        pages.update(range(max(start, 1), min(end, total_pages) + 1))
+    return sorted(pages)
+
+def select_pages(total_pages, pages=None, first_pages=None, every=None):
+    """
+    Choose the pages to process
+
+    Args:
+        total_pages (int): Number of pages in the document
+        pages (str | list): Page specification for parse_page_ranges, defaults to every page
+        first_pages (int): Keep only the first N selected pages
+        every (int): Keep every k-th selected page, starting with the first
+
+    Returns:
+        list: 1-based page numbers in ascending order
+    """
+    selected = parse_page_ranges(pages, total_pages) if pages else list(range(1, total_pages + 1))
+    if every and every > 1:
+        selected = selected[::every]
+    if first_pages is not None:
+        selected = selected[:max(first_pages, 0)]
+    return selected
+
+class StopCondition:
+    """
+    Decides when to stop processing a document early
+
+    Args:
+        max_entities (int | dict): Stop once any class reaches this many entities,
+            or once a listed class reaches its own count, e.g. {"Table": 10}
+        time_budget (float): Stop once this many seconds have passed
+    """
+
+    def __init__(self, max_entities=None, time_budget=None):
+        self.max_entities = max_entities
+        self.time_budget = time_budget
+        self.started = time.time()
+        self.counts = {}
+
+    @property
+    def active(self):
+        return bool(self.max_entities) or self.time_budget is not None
+
+    def update(self, page_entities):
+        """
+        Count a finished page's entities and check the condition
+
+        Args:
+            page_entities (dict): Entity types mapped to lists of entities
+
+        Returns:
+            str: Why processing should stop, or None to continue
+        """
+        for cls_name, refs in page_entities.items():
+            self.counts[cls_name] = self.counts.get(cls_name, 0) + len(refs)
+
+        if isinstance(self.max_entities, dict):
+            limits = {k.lower(): v for k, v in self.max_entities.items()}
+            for cls_name, count in self.counts.items():
+                limit = limits.get(cls_name.lower())
+                if limit is not None and count >= limit:
+                    return f"reached {count} {cls_name} entities (limit {limit})"
+        elif self.max_entities:
+            for cls_name, count in self.counts.items():
+                if count >= self.max_entities:
+                    return f"reached {count} {cls_name} entities (limit {self.max_entities})"
+
+        if self.time_budget is not None and time.time() - self.started >= self.time_budget:
+            return f"time budget of {self.time_budget:g}s used up"
+        return None
@@ -0,0 +1,130 @@
+import threading
+import numpy as np
+from PIL import Image
+from .config import Config
+
+HASH_SIZE = 16
+
+def page_hash(thumbnail):
+    """
+    Difference hash of a page thumbnail
+
+    Args:
+        thumbnail (PIL.Image.Image): Low resolution rendering of the page
+
+    Returns:
+        int: HASH_SIZE * HASH_SIZE bit hash
+    """
+    gray = np.asarray(thumbnail.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR),
+                      dtype=np.int16)
+    bits = (gray[:, 1:] > gray[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def page_signature(image, size=Config.DUPLICATE_CHECK_SIZE):
+    """
+    Grayscale copy of a page, box-filtered down to size pixels on its long side
+
+    Downscaling averages scanner noise and JPEG artifacts away while glyphs
+    of different words still change many pixels.
+
+    Args:
+        image (PIL.Image.Image): The page as rendered for detection
+        size (int): Long side of the signature in pixels
+
+    Returns:
+        np.ndarray: uint8 array of shape (height, width)
+    """
+    gray = image.convert("L")
+    scale = size / max(gray.size)
+    target = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+    return np.asarray(gray.resize(target, Image.BOX), dtype=np.uint8)
+
+def changed_fraction(signature, other, pixel_delta=Config.DUPLICATE_PIXEL_DELTA):
+    """Fraction of pixels whose gray level differs by more than pixel_delta"""
+    if signature.shape != other.shape:
+        return 1.0
+    return float((np.abs(signature.astype(np.int16) - other) > pixel_delta).mean())
+
+class PageTriage:
+    """
+    Cheap checks that let pages skip inference
+
+    Blank pages are recognised from PyMuPDF's content check or the pixel
+    variance of a thumbnail and are not processed at all. Duplicate pages
+    (cover sheets, repeated disclaimers) reuse the detections of the first
+    page that looked the same, so only their crops are cut. The perceptual
+    hash only picks candidates: it sees the layout, not the words, so a
+    candidate is confirmed by comparing page_signatures, which tolerates
+    noise from re-scans but not different text.
+    """
+
+    def __init__(self, skip_blank=Config.SKIP_BLANK_PAGES, dedup=Config.DEDUP_PAGES,
+                 blank_std=Config.BLANK_PAGE_STD, max_distance=Config.DUPLICATE_HASH_DISTANCE,
+                 thumb_size=Config.TRIAGE_THUMB_SIZE, max_changed=Config.DUPLICATE_MAX_CHANGED):
+        self.skip_blank = skip_blank
+        self.dedup = dedup
+        self.blank_std = blank_std
+        self.max_distance = max_distance
+        self.thumb_size = thumb_size
+        self.max_changed = max_changed
+        # (hash, signature, page_num, image_size) of pages whose detections can be shared
+        self._originals = []
+        self._detections = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.skip_blank or self.dedup
+
+    def inspect(self, processor, pdf_path, page_num):
+        """
+        Look at a page before it is rendered at full resolution
+
+        Args:
+            processor (PDFProcessor): Processor to render the thumbnail with
+            pdf_path (str): Path to the PDF file
+            page_num (int): Page number (1-based index)
+
+        Returns:
+            tuple: (is_blank, hash), hash is None when deduplication is off
+        """
+        if self.skip_blank and not processor.has_content(pdf_path, page_num):
+            return True, None
+        thumbnail = processor.render_page(pdf_path, page_num,
+                                          dpi=processor.fit_dpi(pdf_path, page_num, self.thumb_size))
+        if self.skip_blank and float(np.asarray(thumbnail.convert("L")).std()) < self.blank_std:
+            return True, None
+        return False, page_hash(thumbnail) if self.dedup else None
+
+    def find_original(self, page_num, page_hash, image):
+        """
+        Return the earlier page this one duplicates, registering it as an original otherwise
+
+        Must be called in page order for the choice of originals to be deterministic.
+
+        Args:
+            page_num (int): Page number (1-based index)
+            page_hash (int): Perceptual hash from inspect
+            image (PIL.Image.Image): The page as rendered for detection
+
+        Returns:
+            int: Page number of the original, or None
+        """
+        signature = page_signature(image)
+        with self._lock:
+            for other_hash, other_signature, other_page, other_size in self._originals:
+                # Same layout is not enough, the page must also look the same up close
+                if other_size == image.size and (other_hash ^ page_hash).bit_count() <= self.max_distance \
+                        and changed_fraction(signature, other_signature) <= self.max_changed:
+                    return other_page
+            self._originals.append((page_hash, signature, page_num, image.size))
+        return None
+
+    def remember(self, page_num, detections):
+        """Keep an original page's detections for its duplicates"""
+        with self._lock:
+            self._detections[page_num] = detections
+
+    def detections_of(self, page_num):
+        with self._lock:
+            return self._detections.get(page_num)
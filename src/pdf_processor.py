@@ -29,12 +29,56 @@
 #             page.save(out_file, "JPEG")
 import os
 import fitz  # PyMuPDF
+from PIL import Image
 from pdf2image import convert_from_path
 from .config import Config
+from .log import get_logger
+from .metrics import timed
+
+logger = get_logger(__name__)
+
+RENDER_BACKENDS = ("pymupdf", "pdf2image")
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, backend=Config.RENDER_BACKEND, dpi=Config.RENDER_DPI, metrics=None):
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend '{backend}', expected one of {RENDER_BACKENDS}")
         self.poppler_path = Config.get_poppler_path()
+        self.backend = backend
+        self.dpi = dpi
+        # Optional PipelineMetrics timing renders and counting saved bytes
+        self.metrics = metrics
+        self._doc = None
+        self._doc_path = None
+    
+    def open_document(self, pdf_path):
+        """
+        Open a PDF once and keep the handle for subsequent page renders
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            
+        Returns:
+            fitz.Document: The open document
+        """
+        if self._doc is None or self._doc_path != pdf_path:
+            self.close()
+            self._doc = fitz.open(pdf_path)
+            self._doc_path = pdf_path
+        return self._doc
+    
+    def close(self):
+        """Close the cached document handle, if any"""
+        if self._doc is not None:
+            self._doc.close()
+        self._doc = None
+        self._doc_path = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
     
     def get_page_count(self, pdf_path):
         """
@@ -47,11 +91,121 @@ class PDFProcessor:
             int: Total number of pages in the PDF
         """
         try:
-            with fitz.open(pdf_path) as doc:
-                return len(doc)
+            return len(self.open_document(pdf_path))
         except Exception as e:
             raise Exception(f"Failed to get page count: {e}")
     
+    def _render_page_pymupdf(self, pdf_path, page_num, dpi):
+        page = self.open_document(pdf_path)[page_num - 1]
+        # A zoom matrix accepts the fractional DPIs fit_dpi produces
+        zoom = dpi / 72.0
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    
+    def _render_page_pdf2image(self, pdf_path, page_num, dpi):
+        kwargs = {"first_page": page_num, "last_page": page_num, "dpi": round(dpi)}
+        if self.poppler_path:
+            kwargs["poppler_path"] = self.poppler_path
+        pages = convert_from_path(pdf_path, **kwargs)
+        return pages[0] if pages else None
+    
+    def render_page(self, pdf_path, page_num, dpi=None):
+        """
+        Render a single PDF page to a PIL image
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_num (int): Page number to render (1-based index)
+            dpi (int): Render resolution, defaults to the processor's dpi
+            
+        Returns:
+            PIL.Image.Image: The rendered page, or None if rendering failed
+        """
+        dpi = dpi or self.dpi
+        with timed(self.metrics, "render", page_num):
+            if self.backend == "pymupdf":
+                try:
+                    return self._render_page_pymupdf(pdf_path, page_num, dpi)
+                except Exception as e:
+                    logger.warning("PyMuPDF failed to render page %d (%s), falling back to pdf2image", page_num, e)
+            return self._render_page_pdf2image(pdf_path, page_num, dpi)
+    
+    def fit_dpi(self, pdf_path, page_num, long_side=Config.IMAGE_SIZE):
+        """
+        Compute the DPI at which a page's long side renders to long_side pixels
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_num (int): Page number (1-based index)
+            long_side (int): Target size of the longer page edge in pixels
+            
+        Returns:
+            float: Render resolution in dots per inch
+        """
+        rect = self.open_document(pdf_path)[page_num - 1].rect
+        return long_side * 72.0 / max(rect.width, rect.height)
+    
+    def has_content(self, pdf_path, page_num):
+        """
+        Check whether a page draws anything at all
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_num (int): Page number (1-based index)
+            
+        Returns:
+            bool: False if the page has no text, images or vector drawings
+        """
+        page = self.open_document(pdf_path)[page_num - 1]
+        return bool(page.get_text("text").strip() or page.get_images() or page.get_drawings())
+    
+    def render_region(self, pdf_path, page_num, box, image_size, dpi=None):
+        """
+        Render one region of a page at high resolution using a clip rectangle
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_num (int): Page number (1-based index)
+            box (tuple): (x1, y1, x2, y2) in pixels of a rendering of the page
+            image_size (tuple): (width, height) of the rendering box refers to
+            dpi (int): Resolution of the region render, defaults to the processor's dpi
+            
+        Returns:
+            PIL.Image.Image: The rendered region
+        """
+        dpi = dpi or self.dpi
+        with timed(self.metrics, "render_region", page_num):
+            page = self.open_document(pdf_path)[page_num - 1]
+            sx = page.rect.width / image_size[0]
+            sy = page.rect.height / image_size[1]
+            x1, y1, x2, y2 = box
+            x0, y0 = page.rect.x0, page.rect.y0
+            clip = fitz.Rect(x0 + x1 * sx, y0 + y1 * sy, x0 + x2 * sx, y0 + y2 * sy)
+            zoom = dpi / 72.0
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip & page.rect, alpha=False)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    
+    def save_page_image(self, image, page_num, output_dir=Config.DEFAULT_OUTPUT_DIR):
+        """
+        Save a rendered page image to disk
+        
+        Args:
+            image (PIL.Image.Image): The rendered page
+            page_num (int): Page number used for naming (1-based index)
+            output_dir (str): Directory to save the image
+            
+        Returns:
+            str: Path to the saved image
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, f"page_{page_num}.jpg")
+        with timed(self.metrics, "save", page_num):
+            image.save(output_file, "JPEG")
+        if self.metrics is not None:
+            self.metrics.add_bytes(os.path.getsize(output_file), page_num)
+        logger.debug("Saved %s", output_file)
+        return output_file
+    
     def convert_pdf_page_to_image(self, pdf_path, page_num, output_dir=Config.DEFAULT_OUTPUT_DIR):
         """
         Convert a single PDF page to an image
@@ -64,33 +218,15 @@ class PDFProcessor:
         Returns:
             str: Path to the generated image
         """
-        os.makedirs(output_dir, exist_ok=True)
-        output_file = os.path.join(output_dir, f"page_{page_num}.jpg")
-        
         try:
-            # Convert single page to image
-            if self.poppler_path:
-                pages = convert_from_path(
-                    pdf_path,
-                    first_page=page_num,
-                    last_page=page_num,
-                    poppler_path=self.poppler_path
-                )
-            else:
-                pages = convert_from_path(
-                    pdf_path,
-                    first_page=page_num,
-                    last_page=page_num
-                )
+            page = self.render_page(pdf_path, page_num)
             
-            if pages:
-                pages[0].save(output_file, "JPEG")
-                print(f"Saved {output_file}")
-                return output_file
+            if page is not None:
+                return self.save_page_image(page, page_num, output_dir)
             return None
             
         except Exception as e:
-            print(f"Error converting page {page_num}: {e}")
+            logger.error("Error converting page %d: %s", page_num, e)
             return None
     
     def convert_pdf_to_images(self, pdf_path, output_dir=Config.DEFAULT_OUTPUT_DIR):
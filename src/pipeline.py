@@ -0,0 +1,485 @@
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .config import Config
+from .detections import PageDetections
+from .log import get_logger
+from .metrics import timed
+from .pdf_processor import PDFProcessor
+from .result_cache import ResultCache, hash_file, settings_fingerprint
+from .text_layer import box_texts, classify_page
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+class PageWork:
+    """State of one page as it moves through the render -> detect -> crop stages"""
+
+    __slots__ = ("page_num", "started", "image", "detections", "page_entities", "page_hash", "triage",
+                 "dpi", "raster_bytes")
+
+    def __init__(self, page_num):
+        self.page_num = page_num
+        self.started = time.time()
+        self.image = None
+        self.detections = None
+        self.page_entities = None
+        self.page_hash = None
+        self.triage = None
+        # Render DPI chosen when the page was admitted, None for the default
+        self.dpi = None
+        # Raster memory reserved from the MemoryBudget until the raster is released
+        self.raster_bytes = 0
+
+class PageResult:
+    """
+    Entities extracted from one page, produced as soon as the page is done
+
+    Attributes:
+        page_num (int): Page number (1-based index)
+        total_pages (int): Number of pages in the document
+        entities (dict): Entity types mapped to crop file paths or entity IDs
+        detections (PageDetections): The page's detections before class filtering
+        seconds (float): Time spent on the page
+        triage (str): "blank" if the page was skipped, "duplicate" if it reused the
+            detections of an earlier page, "text_layer" if its detections came from
+            the PDF text layer instead of the model, otherwise None
+        metrics (dict): Wall/CPU time per stage, bytes written and RSS after the page
+            (see PipelineMetrics.page_done), None for pages replayed from a checkpoint
+    """
+
+    __slots__ = ("page_num", "total_pages", "entities", "detections", "seconds", "triage", "metrics")
+
+    def __init__(self, page_num, total_pages, entities, detections, seconds, triage=None, metrics=None):
+        self.page_num = page_num
+        self.total_pages = total_pages
+        self.entities = entities
+        self.detections = detections
+        self.seconds = seconds
+        self.triage = triage
+        self.metrics = metrics
+
+    @property
+    def items_count(self):
+        return sum(len(refs) for refs in self.entities.values())
+
+    def __repr__(self):
+        counts = {cls_name: len(refs) for cls_name, refs in self.entities.items()}
+        return f"PageResult(page={self.page_num}/{self.total_pages}, entities={counts}, seconds={self.seconds:.2f})"
+
+class PageExtractor:
+    """
+    Runs the render -> detect -> crop stages over the pages of one PDF
+
+    Pages can be processed serially or through a staged pipeline where
+    rendering runs in a worker pool, inference runs on a single thread that
+    owns the model, and crop encoding runs in a second pool. Both modes yield
+    pages in ascending page order.
+    """
+
+    def __init__(self, pdf_path, layout_detector, entity_cropper,
+                 render_backend=Config.RENDER_BACKEND, batch_size=Config.BATCH_SIZE,
+                 two_pass=False, save_page_images=False, pages_dir=Config.DEFAULT_OUTPUT_DIR,
+                 render_workers=Config.RENDER_WORKERS, crop_workers=Config.CROP_WORKERS,
+                 queue_depth=Config.QUEUE_DEPTH, use_cache=False, journal=None, triage=None,
+                 text_fast_path=False, attach_text=False, tiling=False, metrics=None,
+                 memory_budget=None, doc_hash=None):
+        self.pdf_path = pdf_path
+        self.layout_detector = layout_detector
+        self.entity_cropper = entity_cropper
+        self.render_backend = render_backend
+        self.batch_size = max(1, batch_size)
+        self.two_pass = two_pass
+        self.save_page_images = save_page_images
+        self.pages_dir = pages_dir
+        self.render_workers = max(1, render_workers)
+        self.crop_workers = max(1, crop_workers)
+        # A full inference batch must fit in flight or the pipeline stalls
+        self.queue_depth = max(queue_depth, self.batch_size)
+        self._local = threading.local()
+        self._processors = []
+        self._lock = threading.Lock()
+        self._page_count = None
+        # Optional CheckpointJournal recording finished and failed pages
+        self.journal = journal
+        # Optional PageTriage skipping blank and duplicate pages
+        self.triage = triage if triage is not None and triage.active else None
+        # Build detections from the text layer of trivial born-digital pages
+        self.text_fast_path = text_fast_path
+        # Attach the text inside every box from the text layer
+        self.attach_text = attach_text
+        # Split oversized pages into overlapping tiles for inference
+        self.tiling = tiling
+        # Optional PipelineMetrics shared by every stage
+        self.metrics = metrics
+        # Optional MemoryBudget capping render DPI and pages in flight
+        self.memory_budget = memory_budget
+
+        self.cache = None
+        self.doc_hash = None
+        if use_cache:
+            # Text-layer and tiled detections differ from the model's, keep them apart;
+            # detections cached with attach_text carry the box texts
+            extra = {"text_fast_path": True} if text_fast_path else {}
+            if attach_text:
+                extra["attach_text"] = True
+            if tiling:
+                extra.update(tiling=True, tile_size=Config.TILE_SIZE, tile_overlap=Config.TILE_OVERLAP,
+                             tile_max_aspect=Config.TILE_MAX_ASPECT, tile_max_pixels=Config.TILE_MAX_PIXELS)
+            if memory_budget is not None:
+                # Capped pages are rendered, and cropped, at a lower resolution
+                extra["max_memory"] = memory_budget.max_bytes
+            # Cached crops are restored as they were encoded
+            extra.update(crop_format=entity_cropper.crop_format, crop_quality=entity_cropper.quality,
+                         crop_optimize=entity_cropper.optimize)
+            settings = settings_fingerprint(render_backend=render_backend, render_dpi=Config.RENDER_DPI,
+                                            two_pass=two_pass, **layout_detector.settings(), **extra)
+            self.cache = ResultCache(settings)
+            # Callers that hashed the PDF already (for the checkpoint journal) pass it in
+            self.doc_hash = doc_hash or hash_file(pdf_path)
+
+    def _processor(self):
+        """Return this thread's PDFProcessor; fitz documents are not thread-safe"""
+        processor = getattr(self._local, "processor", None)
+        if processor is None:
+            processor = PDFProcessor(backend=self.render_backend, metrics=self.metrics)
+            self._local.processor = processor
+            with self._lock:
+                self._processors.append(processor)
+        return processor
+
+    def close(self):
+        """Close every document handle opened by the stages"""
+        with self._lock:
+            for processor in self._processors:
+                processor.close()
+            self._processors = []
+        self._local = threading.local()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def get_page_count(self):
+        """Return the number of pages in the PDF"""
+        if self._page_count is None:
+            self._page_count = self._processor().get_page_count(self.pdf_path)
+        return self._page_count
+
+    def _result(self, work, seconds):
+        if self.journal is not None:
+            self.journal.page_done(work.page_num, work.detections, work.page_entities, seconds)
+        page_metrics = self.metrics.page_done(work.page_num) if self.metrics is not None else None
+        return PageResult(work.page_num, self.get_page_count(), work.page_entities, work.detections,
+                          seconds, work.triage, page_metrics)
+
+    def _fail(self, page_num, error):
+        logger.error("Error processing page %d: %s", page_num, error)
+        if self.metrics is not None:
+            self.metrics.page_failed(page_num)
+        if self.journal is not None:
+            self.journal.page_failed(page_num, error)
+
+    def _page_dpi(self, page_num):
+        """Render DPI of a page, None for the processor's default"""
+        processor = self._processor()
+        # In two-pass mode only render as many pixels as the detector uses
+        dpi = processor.fit_dpi(self.pdf_path, page_num) if self.two_pass else None
+        if self.memory_budget is not None:
+            rect = processor.open_document(self.pdf_path)[page_num - 1].rect
+            dpi = self.memory_budget.page_dpi(rect, dpi or processor.dpi)
+        return dpi
+
+    def _admit(self, work, stop):
+        """Reserve the page's raster memory, waiting while the budget is used up"""
+        processor = self._processor()
+        try:
+            dpi = self._page_dpi(work.page_num)
+            rect = processor.open_document(self.pdf_path)[work.page_num - 1].rect
+        except Exception:
+            # Leave the page unreserved, its render stage reports the error
+            return
+        work.dpi = dpi
+        work.raster_bytes = self.memory_budget.acquire(self.memory_budget.raster_size(rect, dpi), stop)
+
+    def _release_raster(self, work):
+        """Drop the page raster and hand its reservation back to the budget"""
+        work.image = None
+        if work.raster_bytes:
+            self.memory_budget.release(work.raster_bytes)
+            work.raster_bytes = 0
+
+    def _render(self, page_num, dpi=None):
+        processor = self._processor()
+        page_image = processor.render_page(self.pdf_path, page_num, dpi=dpi)
+        if page_image is None:
+            raise RuntimeError(f"Failed to convert page {page_num} to image")
+        if self.save_page_images:
+            processor.save_page_image(page_image, page_num, self.pages_dir)
+        return page_image
+
+    def _render_region(self, page_num, image_size, box):
+        return self._processor().render_region(self.pdf_path, page_num, box, image_size)
+
+    def _prepare(self, work):
+        """Stage 1: serve the page from the cache or render it"""
+        if self.cache is not None:
+            cached = self.cache.get(self.doc_hash, work.page_num)
+            if cached is not None:
+                detections, crops = cached
+                # Cached crops were cut without a class filter, so only reuse them
+                # unfiltered; the codec settings are part of the cache key
+                if crops is not None and self.entity_cropper.output_format == "files" \
+                        and not self.entity_cropper.detection_filter.active:
+                    restored = self.cache.restore_crops(crops, self.entity_cropper.entities_dir)
+                    self.entity_cropper.add_entities(work.page_num, restored, detections)
+                    work.page_entities = self.entity_cropper.get_entities_by_page(work.page_num)
+                    return work
+                work.detections = detections
+                if self.entity_cropper.output_format == "lazy":
+                    # Lazy crops only need the boxes, skip rendering entirely
+                    return work
+        if self.triage is not None and work.detections is None:
+            with timed(self.metrics, "triage", work.page_num):
+                is_blank, work.page_hash = self.triage.inspect(self._processor(), self.pdf_path, work.page_num)
+            if is_blank:
+                work.triage = "blank"
+                work.detections = PageDetections(np.zeros((0, 4)), [], [], {}, (0, 0))
+                return work
+        # Pages admitted by the pipelined feeder already know their DPI
+        dpi = work.dpi if work.raster_bytes else self._page_dpi(work.page_num)
+        work.image = self._render(work.page_num, dpi)
+        if self.text_fast_path and work.detections is None:
+            page = self._processor().open_document(self.pdf_path)[work.page_num - 1]
+            with timed(self.metrics, "text_layer", work.page_num):
+                detections = classify_page(page, work.image.size, Config.TEXT_FAST_PATH_MAX_DRAWINGS)
+            if detections is not None:
+                work.detections = detections
+                work.triage = "text_layer"
+        return work
+
+    def _detect(self, works):
+        """Stage 2: run batched inference on the pages that still need detections"""
+        pending = [work for work in works if work.page_entities is None and work.detections is None]
+        if not pending:
+            return
+
+        # Runs in page order on one thread, so the first of a set of look-alike pages is the original
+        duplicates = []
+        if self.triage is not None and self.triage.dedup:
+            originals = []
+            for work in pending:
+                original = self.triage.find_original(work.page_num, work.page_hash, work.image)
+                (originals if original is None else duplicates).append((work, original))
+            pending = [work for work, _ in originals]
+
+        if pending:
+            batch_detections = self.layout_detector.detect_pages(
+                [work.image for work in pending], batch_size=self.batch_size, tiling=self.tiling,
+                pages=[work.page_num for work in pending], metrics=self.metrics
+            )
+            for work, detections in zip(pending, batch_detections):
+                work.detections = detections
+                if self.triage is not None and self.triage.dedup:
+                    self.triage.remember(work.page_num, work.detections)
+
+        missing = []
+        for work, original in duplicates:
+            work.detections = self.triage.detections_of(original)
+            if work.detections is None:
+                # The original failed, detect this page itself
+                missing.append(work)
+            else:
+                work.triage = "duplicate"
+        if missing:
+            batch_detections = self.layout_detector.detect_pages(
+                [work.image for work in missing], batch_size=self.batch_size, tiling=self.tiling,
+                pages=[work.page_num for work in missing], metrics=self.metrics
+            )
+            for work, detections in zip(missing, batch_detections):
+                work.detections = detections
+
+    def _crop(self, work):
+        """Stage 3: crop and save the detected entities, then release the page raster"""
+        if work.page_entities is not None:
+            return work.page_entities
+        region_renderer = None
+        if self.two_pass:
+            region_renderer = functools.partial(self._render_region, work.page_num,
+                                                work.detections.image_size)
+        detections = work.detections
+        if self.attach_text and detections.texts is None and len(detections):
+            # A new object: duplicate pages share their original's detections
+            page = self._processor().open_document(self.pdf_path)[work.page_num - 1]
+            with timed(self.metrics, "text_layer", work.page_num):
+                texts = box_texts(page, detections.boxes, detections.image_size)
+            work.detections = PageDetections(detections.boxes, detections.classes, detections.scores,
+                                             detections.names, detections.image_size, texts)
+        self.entity_cropper.crop_entities_from_results(work.image, work.detections, work.page_num,
+                                                       region_renderer=region_renderer)
+        self._release_raster(work)
+        work.page_entities = self.entity_cropper.get_entities_by_page(work.page_num)
+        if self.cache is not None:
+            filtered = self.entity_cropper.detection_filter.active
+            self.cache.put(self.doc_hash, work.page_num, work.detections,
+                           None if filtered else work.page_entities)
+        return work.page_entities
+
+    def iter_serial(self, page_numbers):
+        """
+        Process pages one batch at a time on the calling thread
+
+        Args:
+            page_numbers (list): 1-based page numbers to process
+
+        Yields:
+            PageResult: One result for every page that succeeded
+        """
+        page_numbers = list(page_numbers)
+        for batch_start in range(0, len(page_numbers), self.batch_size):
+            batch_pages = page_numbers[batch_start:batch_start + self.batch_size]
+            start_time = time.time()
+            logger.debug("Processing pages %d-%d", batch_pages[0], batch_pages[-1])
+
+            works = []
+            for page_num in batch_pages:
+                try:
+                    works.append(self._prepare(PageWork(page_num)))
+                except Exception as e:
+                    self._fail(page_num, e)
+
+            if not works:
+                continue
+
+            try:
+                self._detect(works)
+            except Exception as e:
+                logger.error("Error detecting layout on pages %d-%d: %s", batch_pages[0], batch_pages[-1], e)
+                for work in works:
+                    self._fail(work.page_num, e)
+                continue
+
+            batch_time_per_page = (time.time() - start_time) / len(works)
+
+            for work in works:
+                page_start = time.time()
+                try:
+                    self._crop(work)
+                except Exception as e:
+                    self._fail(work.page_num, e)
+                    continue
+                yield self._result(work, batch_time_per_page + (time.time() - page_start))
+
+    def iter_pipelined(self, page_numbers):
+        """
+        Process pages through concurrent render, inference and crop stages
+
+        At most queue_depth pages are in flight (rendered but not yet yielded),
+        which bounds memory on very large documents; with a memory budget,
+        rendering a page beyond the first batch also waits until its raster
+        fits the budget. Results are yielded in
+        page order regardless of which stage finishes first.
+
+        Args:
+            page_numbers (list): 1-based page numbers to process
+
+        Yields:
+            PageResult: One result for every page that succeeded
+        """
+        page_numbers = list(page_numbers)
+        slots = threading.Semaphore(self.queue_depth)
+        stop = threading.Event()
+        prepared_queue = queue.Queue()
+        cropped_queue = queue.Queue()
+        render_pool = ThreadPoolExecutor(self.render_workers, thread_name_prefix="render")
+        crop_pool = ThreadPoolExecutor(self.crop_workers, thread_name_prefix="crop")
+
+        def feed():
+            try:
+                for page_num in page_numbers:
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    work = PageWork(page_num)
+                    if self.memory_budget is not None:
+                        self._admit(work, stop)
+                        if stop.is_set():
+                            self._release_raster(work)
+                            break
+                    prepared_queue.put((work, render_pool.submit(self._prepare, work)))
+            finally:
+                prepared_queue.put(_DONE)
+
+        def infer():
+            try:
+                finished = False
+                while not finished and not stop.is_set():
+                    batch = []
+                    while len(batch) < self.batch_size:
+                        item = prepared_queue.get()
+                        if item is _DONE:
+                            finished = True
+                            break
+                        batch.append(item)
+                    if not batch:
+                        break
+
+                    works = []
+                    for work, future in batch:
+                        try:
+                            works.append(future.result())
+                        except Exception as e:
+                            cropped_queue.put((work, None, e))
+
+                    try:
+                        self._detect(works)
+                    except Exception as e:
+                        for work in works:
+                            cropped_queue.put((work, None, e))
+                        continue
+
+                    for work in works:
+                        cropped_queue.put((work, crop_pool.submit(self._crop, work), None))
+            except Exception as e:
+                cropped_queue.put((None, None, e))
+            finally:
+                cropped_queue.put(_DONE)
+
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        inferer = threading.Thread(target=infer, name="pipeline-infer", daemon=True)
+        feeder.start()
+        inferer.start()
+
+        try:
+            while True:
+                item = cropped_queue.get()
+                if item is _DONE:
+                    break
+                work, future, error = item
+                try:
+                    if error is None:
+                        future.result()
+                except Exception as e:
+                    error = e
+                if work is None:
+                    logger.error("Error in inference stage: %s", error)
+                    continue
+                # Failed pages still hold their raster and reservation
+                self._release_raster(work)
+                slots.release()
+                if error is not None:
+                    self._fail(work.page_num, error)
+                    continue
+                yield self._result(work, time.time() - work.started)
+        finally:
+            stop.set()
+            # Unblock the feeder if it is waiting for a free slot
+            for _ in range(self.queue_depth):
+                slots.release()
+            feeder.join()
+            inferer.join()
+            render_pool.shutdown(wait=True, cancel_futures=True)
+            crop_pool.shutdown(wait=True)
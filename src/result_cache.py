@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from .config import Config
+from .detections import PageDetections
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    doc_hash TEXT NOT NULL,
+    page_num INTEGER NOT NULL,
+    settings TEXT NOT NULL,
+    detections TEXT NOT NULL,
+    crops TEXT,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (doc_hash, page_num, settings)
+)
+"""
+
+def hash_file(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def settings_fingerprint(**settings):
+    """
+    Hash the settings that influence detections into a short cache key
+
+    Any change to the model, confidence threshold or image size produces a
+    new fingerprint, so entries computed with old settings are never served.
+    """
+    payload = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class ResultCache:
+    """
+    Persistent per-page detection cache keyed by document hash and page index
+
+    Detections live in a SQLite index; crops are optionally copied into a blob
+    directory so a fully cached page needs neither rendering nor inference.
+    Entries of every settings fingerprint share the cache and are evicted
+    least recently used once it exceeds max_bytes, so switching settings back
+    and forth keeps both sets warm.
+    """
+
+    def __init__(self, settings, cache_dir=Config.CACHE_DIR, max_bytes=Config.CACHE_MAX_BYTES,
+                 store_crops=Config.CACHE_CROPS):
+        self.settings = settings
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.max_bytes = max_bytes
+        self.store_crops = store_crops
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"),
+                                     timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, doc_hash, page_num):
+        """
+        Look up cached detections for a page
+
+        Args:
+            doc_hash (str): Document content hash
+            page_num (int): Page number (1-based index)
+
+        Returns:
+            tuple: (PageDetections, crops) or None on a miss; crops is a list of
+                {"class", "name", "blob"} records, or None when crops were not cached
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT detections, crops FROM pages WHERE doc_hash=? AND page_num=? AND settings=?",
+                (doc_hash, page_num, self.settings)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE pages SET last_access=? WHERE doc_hash=? AND page_num=? AND settings=?",
+                    (time.time(), doc_hash, page_num, self.settings)
+                )
+        detections = PageDetections.from_dict(json.loads(row[0]))
+        crops = json.loads(row[1]) if row[1] is not None else None
+        # A crop blob may have been removed from disk behind our back
+        if crops is not None and not all(os.path.exists(os.path.join(self.blob_dir, c["blob"])) for c in crops):
+            crops = None
+        return detections, crops
+
+    def put(self, doc_hash, page_num, detections, page_entities=None):
+        """
+        Store detections (and optionally the crop files) for a page
+
+        Args:
+            doc_hash (str): Document content hash
+            page_num (int): Page number (1-based index)
+            detections (PageDetections): Detections for the page
+            page_entities (dict): Entity types mapped to crop file paths to copy into the cache
+        """
+        payload = json.dumps(detections.to_dict())
+        size = len(payload)
+        crops = None
+        # Only loose crop files can be cached; manifest entities live in shards
+        crop_files = [path for paths in (page_entities or {}).values() for path in paths]
+        if self.store_crops and page_entities is not None and all(os.path.isfile(p) for p in crop_files):
+            crops = []
+            for cls_name, files in page_entities.items():
+                for path in files:
+                    name = os.path.basename(path)
+                    blob = f"{doc_hash[:16]}-{self.settings}-{page_num}-{cls_name}-{name}"
+                    shutil.copyfile(path, os.path.join(self.blob_dir, blob))
+                    size += os.path.getsize(path)
+                    crops.append({"class": cls_name, "name": name, "blob": blob})
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc_hash, page_num, self.settings, payload,
+                     json.dumps(crops) if crops is not None else None, size, time.time())
+                )
+            self._evict()
+
+    def restore_crops(self, crops, entities_dir):
+        """
+        Copy cached crops back into an entities directory
+
+        Args:
+            crops (list): Crop records returned by get
+            entities_dir (str): Destination root, one sub-directory per class
+
+        Returns:
+            dict: Entity types mapped to the restored file paths
+        """
+        restored = {}
+        for crop in crops:
+            class_dir = os.path.join(entities_dir, crop["class"])
+            os.makedirs(class_dir, exist_ok=True)
+            out_file = os.path.join(class_dir, crop["name"])
+            shutil.copyfile(os.path.join(self.blob_dir, crop["blob"]), out_file)
+            restored.setdefault(crop["class"], []).append(out_file)
+        return restored
+
+    def _delete_rows(self, rows):
+        for doc_hash, page_num, settings, crops in rows:
+            for crop in json.loads(crops) if crops else []:
+                try:
+                    os.unlink(os.path.join(self.blob_dir, crop["blob"]))
+                except FileNotFoundError:
+                    pass
+            self._conn.execute(
+                "DELETE FROM pages WHERE doc_hash=? AND page_num=? AND settings=?",
+                (doc_hash, page_num, settings)
+            )
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for doc_hash, page_num, settings, crops, size in self._conn.execute(
+                "SELECT doc_hash, page_num, settings, crops, size FROM pages ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((doc_hash, page_num, settings, crops))
+            total -= size
+        with self._conn:
+            self._delete_rows(victims)
+
+    def clear(self):
+        """Remove every entry and blob"""
+        with self._lock:
+            rows = self._conn.execute("SELECT doc_hash, page_num, settings, crops FROM pages").fetchall()
+            with self._conn:
+                self._delete_rows(rows)
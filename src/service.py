@@ -0,0 +1,761 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import Config
+from .entity_cropper import CROP_FORMATS, OUTPUT_FORMATS
+from .layout_detector import LayoutDetector
+from .log import get_logger
+from .memory_budget import parse_size
+from .metrics import REGISTRY, PipelineMetrics
+from .page_selection import parse_page_ranges
+from .pdf_processor import RENDER_BACKENDS
+from .workspace import JobWorkspace
+
+logger = get_logger(__name__)
+
+# iter_process_pdf arguments a client may set; paths, models and resume stay with the service
+JOB_OPTIONS = frozenset((
+    "render_backend", "batch_size", "two_pass", "pipelined", "queue_depth", "output_format",
+    "include_classes", "exclude_classes", "min_confidence", "min_area", "min_area_fraction",
+    "crop_format", "crop_quality", "pages", "first_pages", "every", "max_entities", "time_budget",
+    "skip_blank", "dedup_pages", "text_fast_path", "attach_text", "tiling", "max_memory",
+))
+_INPUT_FILE = "input.pdf"
+# Page records of a job, one JSON row per page, in its workspace
+_PAGES_FILE = "pages.jsonl"
+_FINISHED = ("done", "failed", "cancelled")
+
+def _choice(choices):
+    def check(value):
+        if value not in choices:
+            raise ValueError(f"expected one of {', '.join(choices)}")
+        return value
+    return check
+
+def _integer(low, high=None):
+    def check(value):
+        # bool is an int subclass, but true is not a page count
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError("expected an integer")
+        if value < low or (high is not None and value > high):
+            raise ValueError(f"expected {low} to {high}" if high is not None else f"expected at least {low}")
+        return value
+    return check
+
+def _number(low, high=None):
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("expected a number")
+        if value < low or (high is not None and value > high):
+            raise ValueError(f"expected {low} to {high}" if high is not None else f"expected at least {low}")
+        return value
+    return check
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise ValueError("expected true or false")
+    return value
+
+def _class_names(value):
+    # A query string carries a list as "Table,Picture"
+    if isinstance(value, str):
+        value = [name for name in value.split(",") if name]
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError("expected a list of class names")
+    return value
+
+def _per_class(check):
+    def check_all(value):
+        if not isinstance(value, dict) or not all(isinstance(name, str) for name in value):
+            raise ValueError("expected an object of class name to value")
+        return {name: check(number) for name, number in value.items()}
+    return check_all
+
+def _page_spec(value):
+    # ?pages=5 arrives as a JSON number
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, list):
+        return [_integer(1)(page) for page in value]
+    if not isinstance(value, str):
+        raise ValueError("expected a page specification such as \"1-5,9\"")
+    # Parsed against an unbounded document to catch malformed specs now, not in the worker
+    parse_page_ranges(value, 0)
+    return value
+
+def _max_entities(value):
+    if isinstance(value, dict):
+        return _per_class(_integer(1))(value)
+    return _integer(1)(value)
+
+def _memory_size(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or parse_size(value) <= 0:
+        raise ValueError("expected a positive size such as \"2GB\"")
+    return value
+
+# Type and range checks of every JOB_OPTIONS value, each returns the value to pass on
+_OPTION_CHECKS = {
+    "render_backend": _choice(RENDER_BACKENDS),
+    "batch_size": _integer(1, Config.SERVICE_MAX_BATCH_SIZE),
+    "two_pass": _flag,
+    "pipelined": _flag,
+    "queue_depth": _integer(1, Config.SERVICE_MAX_QUEUE_DEPTH),
+    "output_format": _choice(OUTPUT_FORMATS),
+    "include_classes": _class_names,
+    "exclude_classes": _class_names,
+    "min_confidence": _per_class(_number(0, 1)),
+    "min_area": _per_class(_number(0, 1)),
+    "min_area_fraction": _number(0, 1),
+    "crop_format": _choice(tuple(CROP_FORMATS)),
+    "crop_quality": _integer(1, 100),
+    "pages": _page_spec,
+    "first_pages": _integer(1),
+    "every": _integer(1),
+    "max_entities": _max_entities,
+    "time_budget": _number(0),
+    "skip_blank": _flag,
+    "dedup_pages": _flag,
+    "text_fast_path": _flag,
+    "attach_text": _flag,
+    "tiling": _flag,
+    "max_memory": _memory_size,
+}
+
+def validate_options(options):
+    """
+    Check the job options a client sent
+
+    Args:
+        options (dict): iter_process_pdf arguments from a request
+
+    Returns:
+        dict: The options, normalised where the request format allows several spellings
+
+    Raises:
+        ValueError: For an unknown option or a value of the wrong type or out of range
+    """
+    unknown = set(options) - JOB_OPTIONS
+    if unknown:
+        raise ValueError(f"Unsupported options: {', '.join(sorted(unknown))}")
+    checked = {}
+    for name, value in options.items():
+        try:
+            checked[name] = _OPTION_CHECKS[name](value)
+        except ValueError as e:
+            raise ValueError(f"Invalid value {value!r} for option '{name}': {e}") from None
+    return checked
+
+class ServiceBusy(Exception):
+    """The job queue is full"""
+
+class ExtractionJob:
+    """
+    One submitted document and the pages extracted from it so far
+
+    Page records are appended to pages.jsonl in the job workspace as they
+    are produced. A running job also keeps them in memory for the clients
+    streaming it; a finished job only keeps its status and counts, and
+    reads its records back from the file when asked.
+
+    Attributes:
+        job_id (str): ID of the job and of its workspace
+        status (str): "queued", "running", "done", "failed" or "cancelled"
+        pages_done (int): Number of page records produced
+        entity_counts (dict): Entities per class over all pages
+        total_pages (int): Pages in the document, known once the first page is done
+        error (str): Why the job failed
+        metrics (dict): PipelineMetrics summary of the finished job
+    """
+
+    def __init__(self, workspace, pdf_path, options):
+        self.workspace = workspace
+        self.job_id = workspace.job_id
+        self.pdf_path = pdf_path
+        self.options = options
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.pages_done = 0
+        self.entity_counts = {}
+        self.total_pages = None
+        # In-memory page records while the job runs, None once it is finished
+        self._pages = []
+        self.error = None
+        self.metrics = None
+        self.cancelled = threading.Event()
+        self.changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in _FINISHED
+
+    def update(self, **fields):
+        """Change the job's state and wake up everyone waiting on it"""
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.changed.notify_all()
+
+    def add_page(self, record):
+        """Store a page record and wake up everyone streaming the job"""
+        with open(self.workspace.path(_PAGES_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        with self.changed:
+            self._pages.append(record)
+            self.pages_done += 1
+            self.total_pages = record["total_pages"]
+            for cls_name, refs in record["entities"].items():
+                self.entity_counts[cls_name] = self.entity_counts.get(cls_name, 0) + len(refs)
+            self.changed.notify_all()
+
+    def finish(self, **fields):
+        """Mark the job finished and drop its in-memory page records"""
+        with self.changed:
+            self._pages = None
+        self.update(**fields)
+
+    def records(self, since=0):
+        """Return the page records from index since on"""
+        with self.changed:
+            if self._pages is not None:
+                return self._pages[since:]
+        path = self.workspace.path(_PAGES_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()][since:]
+
+    def wait(self, timeout):
+        """Block until the job is finished or timeout seconds passed; returns whether it is finished"""
+        with self.changed:
+            return self.changed.wait_for(lambda: self.done, timeout)
+
+    def iter_pages(self, since=0, timeout=None):
+        """
+        Yield page records as they are produced, until the job is finished
+
+        Args:
+            since (int): Number of records the caller already has
+            timeout (float): Stop after waiting this long for a new page
+
+        Yields:
+            dict: Page records, see page_record()
+        """
+        index = since
+        while True:
+            with self.changed:
+                if not self.changed.wait_for(lambda: index < self.pages_done or self.done, timeout):
+                    return
+                finished = self.done
+            records = self.records(index)
+            index += len(records)
+            yield from records
+            if finished:
+                return
+
+    def entities(self):
+        """Return every page's entity references by class, in page order"""
+        entities = {}
+        for record in self.records():
+            for cls_name, refs in record["entities"].items():
+                entities.setdefault(cls_name, []).extend(refs)
+        return entities
+
+    def to_dict(self):
+        """Job status as returned by the status endpoint"""
+        with self.changed:
+            return {"type": "job", "job_id": self.job_id, "status": self.status, "created": self.created,
+                    "started": self.started, "finished": self.finished, "pages_done": self.pages_done,
+                    "total_pages": self.total_pages, "entity_counts": dict(self.entity_counts),
+                    "error": self.error}
+
+def page_record(result, root):
+    """
+    Turn a PageResult into the JSON record streamed to clients
+
+    Crop paths are made relative to the job workspace, the form the files
+    endpoint serves them under; entity IDs of manifest output pass unchanged.
+    """
+    prefix = root.rstrip(os.sep) + os.sep
+
+    def relative(ref):
+        return ref[len(prefix):].replace(os.sep, "/") if isinstance(ref, str) and ref.startswith(prefix) else ref
+
+    return {
+        "type": "page",
+        "page": result.page_num,
+        "total_pages": result.total_pages,
+        "seconds": round(result.seconds, 4),
+        "triage": result.triage,
+        "entities": {cls_name: [relative(ref) for ref in refs] for cls_name, refs in result.entities.items()},
+        "detections": result.detections.to_dict() if result.detections is not None else None,
+    }
+
+class ExtractionService:
+    """
+    Runs extraction jobs from a bounded queue on long-lived worker threads
+
+    Every worker keeps its model warm in the shared model registry, so a job
+    pays neither interpreter startup nor model loading. Workers on the same
+    device share one model and take turns on inference while the other
+    stages of their jobs overlap; give each worker its own device to run
+    inference in parallel. Each job writes to its own JobWorkspace.
+
+    Args:
+        process_fn (callable): Page generator with iter_process_pdf's signature
+        workers (int): Jobs processed at once
+        queue_size (int): Jobs waiting beyond the running ones before submit() refuses
+        model_kwargs (dict): LayoutDetector/iter_process_pdf model arguments (weights_path,
+            backend, int8); "devices" may list one torch device per worker
+        workspace_root (str): Directory holding the job workspaces
+        ttl_seconds (float): Finished jobs and idle workspaces are removed after this long
+        input_root (str): Directory whose PDFs may be submitted by path; None accepts
+            uploads only
+    """
+
+    def __init__(self, process_fn, workers=Config.SERVICE_WORKERS, queue_size=Config.SERVICE_QUEUE_SIZE,
+                 model_kwargs=None, workspace_root=Config.WORKSPACE_ROOT,
+                 ttl_seconds=Config.WORKSPACE_TTL_SECONDS, input_root=Config.SERVICE_INPUT_ROOT):
+        self.process_fn = process_fn
+        self.workers = max(1, workers)
+        self.model_kwargs = dict(model_kwargs or {})
+        devices = self.model_kwargs.pop("devices", None)
+        device = self.model_kwargs.pop("device", None)
+        self.devices = list(devices or [device])
+        self.workspace_root = workspace_root
+        self.ttl_seconds = ttl_seconds
+        self.input_root = os.path.realpath(input_root) if input_root else None
+        self.jobs = {}
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """Load and warm up every worker's model, then start the workers"""
+        for device in dict.fromkeys(self.devices):
+            LayoutDetector(device=device, **self.model_kwargs).warm_up()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(self.devices[index % len(self.devices)],),
+                                      name=f"service-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Extraction service started with %d workers on %s", self.workers,
+                    ", ".join(str(device or "default device") for device in dict.fromkeys(self.devices)))
+
+    def stop(self, timeout=None):
+        """Cancel queued and running jobs and wait for the workers to exit"""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancelled.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, pdf_path=None, data=None, options=None):
+        """
+        Queue a document for extraction
+
+        Args:
+            pdf_path (str): PDF under input_root, relative to it or absolute, used in place
+            data (bytes): PDF contents, written into the job workspace
+            options (dict): iter_process_pdf arguments, limited to JOB_OPTIONS
+
+        Returns:
+            ExtractionJob: The queued job
+
+        Raises:
+            ValueError: For unknown or invalid options, or an invalid document
+            PermissionError: For a pdf_path outside input_root, or any pdf_path without one
+            ServiceBusy: When the queue is full
+        """
+        if options is not None and not isinstance(options, dict):
+            raise ValueError("Options must be an object")
+        options = validate_options(options or {})
+        if (pdf_path is None) == (data is None):
+            raise ValueError("Submit either a PDF path or the PDF contents")
+        if pdf_path is not None:
+            if not isinstance(pdf_path, str):
+                raise ValueError("PDF path must be a string")
+            if self.input_root is None:
+                raise PermissionError("This service only accepts uploaded PDFs")
+            # realpath resolves symlinks and .., so nothing outside the root gets through
+            pdf_path = os.path.realpath(os.path.join(self.input_root, pdf_path))
+            if not pdf_path.startswith(self.input_root + os.sep):
+                raise PermissionError("PDF path is outside the service's input directory")
+            if not os.path.isfile(pdf_path):
+                raise ValueError(f"PDF file '{pdf_path}' not found")
+        if data is not None and not data.startswith(b"%PDF-"):
+            raise ValueError("Request body is not a PDF")
+        self._expire()
+
+        workspace = JobWorkspace(root=self.workspace_root)
+        if data is not None:
+            pdf_path = workspace.path(_INPUT_FILE)
+            with open(pdf_path, "wb") as f:
+                f.write(data)
+        job = ExtractionJob(workspace, pdf_path, options)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            workspace.cleanup()
+            raise ServiceBusy(f"{self._queue.maxsize} jobs are already queued")
+        with self._lock:
+            self.jobs[job.job_id] = job
+        logger.info("Queued job %s", job.job_id)
+        return job
+
+    def get(self, job_id):
+        """Return a job by ID, or None"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def remove(self, job_id):
+        """
+        Cancel a job and delete its workspace once it stops
+
+        Returns:
+            ExtractionJob: The removed job, or None if there is no such job
+        """
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None:
+            return None
+        job.cancelled.set()
+        if job.done:
+            job.workspace.cleanup()
+        # A queued or running job deletes its workspace when its worker sees the cancel
+        return job
+
+    def stats(self):
+        """Worker and queue counts for the health endpoint"""
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {"workers": self.workers, "queued": statuses.count("queued"),
+                "running": statuses.count("running"), "queue_size": self._queue.maxsize}
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [job for job in self.jobs.values() if job.done and job.finished < cutoff]
+            for job in expired:
+                del self.jobs[job.job_id]
+        for job in expired:
+            job.workspace.cleanup()
+        # Also catches workspaces left behind by an earlier run of the service
+        JobWorkspace.cleanup_expired(self.workspace_root, self.ttl_seconds)
+
+    def _work(self, device):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job, device)
+            except Exception:
+                logger.exception("Worker failed on job %s", job.job_id)
+
+    def _run(self, job, device):
+        if job.cancelled.is_set():
+            job.finish(status="cancelled", finished=time.time())
+            self._discard(job)
+            return
+        job.update(status="running", started=time.time())
+        metrics = PipelineMetrics()
+        pages = self.process_fn(job.pdf_path, workspace=job.workspace, device=device, metrics=metrics,
+                                **self.model_kwargs, **job.options)
+        status, error = "done", None
+        try:
+            for result in pages:
+                job.add_page(page_record(result, job.workspace.root))
+                job.workspace.touch()
+                if job.cancelled.is_set():
+                    status = "cancelled"
+                    break
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.job_id, e)
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            pages.close()
+        job.finish(status=status, error=error, metrics=metrics.summary(), finished=time.time())
+        logger.info("Job %s %s after %d pages", job.job_id, status, job.pages_done)
+        self._discard(job)
+
+    def _discard(self, job):
+        # Jobs removed while queued or running clean up after themselves
+        if self.get(job.job_id) is not job:
+            job.workspace.cleanup()
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """
+    HTTP front end of an ExtractionService
+
+        POST   /jobs                 submit a PDF (application/pdf body, options as query
+                                     parameters) or {"pdf_path": ..., "options": {...}} as JSON
+        GET    /jobs/<id>            job status
+        GET    /jobs/<id>/pages      page records as NDJSON while they are produced, ?since=N
+        GET    /jobs/<id>/result     all entities of a finished job, ?wait=SECONDS
+        GET    /jobs/<id>/files/...  a file from the job workspace, e.g. a crop
+        DELETE /jobs/<id>            cancel the job and delete its workspace
+        GET    /health, /metrics
+    """
+
+    server_version = "LayoutService/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, headers=None):
+        self._send_json(status, {"error": message}, headers)
+
+    def _route(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [urllib.parse.unquote(part) for part in url.path.strip("/").split("/") if part]
+        query = dict(urllib.parse.parse_qsl(url.query))
+        return parts, query
+
+    def _job(self, job_id):
+        job = self.service.get(job_id)
+        if job is None:
+            self._error(404, f"No job '{job_id}'")
+        return job
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ["jobs"]:
+            self._error(404, "Not found")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > Config.SERVICE_MAX_UPLOAD_BYTES:
+            self._error(413, f"Upload exceeds {Config.SERVICE_MAX_UPLOAD_BYTES} bytes")
+            return
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get_content_type() == "application/json":
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("Request body must be a JSON object")
+                job = self.service.submit(pdf_path=request.get("pdf_path"), options=request.get("options"))
+            else:
+                job = self.service.submit(data=body, options={k: _query_value(v) for k, v in query.items()})
+        except ServiceBusy as e:
+            self._error(503, str(e), {"Retry-After": "5"})
+            return
+        except PermissionError as e:
+            self._error(403, str(e))
+            return
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+        self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.job_id}"})
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts == ["health"]:
+            self._send_json(200, dict(status="ok", **self.service.stats()))
+            return
+        if parts == ["metrics"]:
+            body = REGISTRY.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if len(parts) < 2 or parts[0] != "jobs":
+            self._error(404, "Not found")
+            return
+        job = self._job(parts[1])
+        if job is None:
+            return
+        try:
+            since = _query_number(query, "since", int)
+            wait = _query_number(query, "wait", float)
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+        if len(parts) == 2:
+            self._send_json(200, job.to_dict())
+        elif parts[2:] == ["pages"]:
+            self._stream_pages(job, since)
+        elif parts[2:] == ["result"]:
+            self._send_result(job, wait)
+        elif parts[2] == "files" and len(parts) > 3:
+            self._send_file(job, parts[3:])
+        else:
+            self._error(404, "Not found")
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._error(404, "Not found")
+            return
+        job = self.service.remove(parts[1])
+        if job is None:
+            self._error(404, f"No job '{parts[1]}'")
+            return
+        self._send_json(200, job.to_dict())
+
+    def _stream_pages(self, job, since):
+        # No Content-Length: the client reads records until the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for record in job.iter_pages(since):
+                self.wfile.write(json.dumps(record).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            self.wfile.write(json.dumps(job.to_dict()).encode("utf-8") + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, the job carries on
+            pass
+        self.close_connection = True
+
+    def _send_result(self, job, wait):
+        if wait > 0:
+            job.wait(min(wait, Config.SERVICE_MAX_WAIT_SECONDS))
+        if not job.done:
+            self._error(409, f"Job {job.job_id} is {job.status}")
+            return
+        result = job.to_dict()
+        result.update(entities=job.entities(), metrics=job.metrics)
+        self._send_json(200, result)
+
+    def _send_file(self, job, parts):
+        root = os.path.realpath(job.workspace.root)
+        path = os.path.realpath(os.path.join(root, *parts))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            self._error(404, "No such file in the job workspace")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+def _query_number(query, name, cast):
+    """Read a non-negative number from the query string, 0 when absent"""
+    try:
+        value = cast(query.get(name, 0))
+    except ValueError:
+        raise ValueError(f"Query parameter '{name}' must be a number") from None
+    # float() also accepts nan and inf
+    if not 0 <= value < float("inf"):
+        raise ValueError(f"Query parameter '{name}' must be a non-negative number")
+    return value
+
+def _query_value(value):
+    """Read a query parameter as JSON where it parses (numbers, booleans, lists), else as text"""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def start_service(service, port=Config.SERVICE_PORT, host=Config.SERVICE_HOST):
+    """
+    Serve an ExtractionService over HTTP from a daemon thread
+
+    Args:
+        service (ExtractionService): A started service
+        port (int): Port to listen on, 0 picks a free one
+        host (str): Interface to bind; the API has no authentication, keep it local
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    threading.Thread(target=server.serve_forever, name="service-http", daemon=True).start()
+    logger.info("Serving extraction jobs at http://%s:%d", host, server.server_address[1])
+    return server
+
+class ServiceClient:
+    """
+    Minimal client for the extraction service, standard library only
+
+    Args:
+        url (str): Base URL of the service, e.g. http://127.0.0.1:8765
+        timeout (float): Socket timeout of every request
+    """
+
+    def __init__(self, url=f"http://{Config.SERVICE_HOST}:{Config.SERVICE_PORT}", timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, content_type=None):
+        request = urllib.request.Request(self.url + path, data=body, method=method)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _json(self, method, path, body=None, content_type=None):
+        with self._request(method, path, body, content_type) as response:
+            return json.loads(response.read())
+
+    def submit(self, pdf_path, upload=True, **options):
+        """
+        Submit a PDF and return its job status
+
+        Args:
+            pdf_path (str): The PDF to process
+            upload (bool): Send the file contents; otherwise the service reads pdf_path
+                itself, which needs a shared file system and pdf_path under the
+                service's input root
+            **options: iter_process_pdf arguments from JOB_OPTIONS
+        """
+        if not upload:
+            body = json.dumps({"pdf_path": os.path.abspath(pdf_path), "options": options}).encode("utf-8")
+            return self._json("POST", "/jobs", body, "application/json")
+        with open(pdf_path, "rb") as f:
+            data = f.read()
+        query = urllib.parse.urlencode({k: json.dumps(v) for k, v in options.items()})
+        return self._json("POST", "/jobs" + (f"?{query}" if query else ""), data, "application/pdf")
+
+    def status(self, job_id):
+        return self._json("GET", f"/jobs/{job_id}")
+
+    def result(self, job_id, wait=Config.SERVICE_MAX_WAIT_SECONDS):
+        """Wait for a job to finish and return its entities, raises HTTPError (409) if still running"""
+        return self._json("GET", f"/jobs/{job_id}/result?wait={wait}")
+
+    def iter_pages(self, job_id, since=0):
+        """Yield the job's page records as they are produced, then its final status"""
+        with self._request("GET", f"/jobs/{job_id}/pages?since={since}") as response:
+            for line in response:
+                yield json.loads(line)
+
+    def download(self, job_id, ref, out_path):
+        """Copy a file of the job workspace, e.g. a crop reference, to out_path"""
+        with self._request("GET", f"/jobs/{job_id}/files/{urllib.parse.quote(ref)}") as response, \
+                open(out_path, "wb") as f:
+            shutil.copyfileobj(response, f)
+        return out_path
+
+    def delete(self, job_id):
+        return self._json("DELETE", f"/jobs/{job_id}")
@@ -0,0 +1,100 @@
+import statistics
+import fitz
+import numpy as np
+from .detections import PageDetections
+
+# Class names of the DocLayNet model, used for boxes taken from the text layer
+DOCLAYNET_NAMES = {0: "Caption", 1: "Footnote", 2: "Formula", 3: "List-item", 4: "Page-footer",
+                   5: "Page-header", 6: "Picture", 7: "Section-header", 8: "Table", 9: "Text", 10: "Title"}
+_CLASS_IDS = {name: cls_id for cls_id, name in DOCLAYNET_NAMES.items()}
+# Blocks entirely inside this top/bottom fraction of the page are headers/footers
+_MARGIN_FRACTION = 0.06
+# Lines this much larger than the body font are section headers
+_HEADER_FONT_RATIO = 1.3
+
+def _to_pixels(bbox, rect, image_size):
+    sx = image_size[0] / rect.width
+    sy = image_size[1] / rect.height
+    x0, y0, x1, y1 = bbox
+    return [(x0 - rect.x0) * sx, (y0 - rect.y0) * sy, (x1 - rect.x0) * sx, (y1 - rect.y0) * sy]
+
+def _side_by_side(a, b):
+    """True if two bboxes share vertical extent but not horizontal extent"""
+    overlaps_vertically = min(a[3], b[3]) - max(a[1], b[1]) > 0
+    overlaps_horizontally = min(a[2], b[2]) - max(a[0], b[0]) > 0
+    return overlaps_vertically and not overlaps_horizontally
+
+def classify_page(page, image_size, max_drawings=5):
+    """
+    Build detections straight from the text layer of a trivial page
+
+    A page is trivial when it holds text only (no images, at most
+    max_drawings vector paths) laid out in a single column. Its text blocks
+    become Text, Section-header, Page-header and Page-footer boxes.
+
+    Args:
+        page (fitz.Page): The page
+        image_size (tuple): (width, height) of the rendering the boxes refer to
+        max_drawings (int): Vector paths tolerated on a trivial page (rules, underlines)
+
+    Returns:
+        PageDetections: Detections for the page, or None if it needs the model
+    """
+    if page.get_images() or len(page.get_drawings()) > max_drawings:
+        return None
+    all_blocks = page.get_text("dict")["blocks"]
+    # Type 1 blocks are inline images
+    if any(b["type"] != 0 for b in all_blocks):
+        return None
+    blocks = [b for b in all_blocks if b.get("lines")]
+    if not blocks:
+        return None
+    for i, a in enumerate(blocks):
+        for b in blocks[i + 1:]:
+            if _side_by_side(a["bbox"], b["bbox"]):
+                return None
+
+    sizes = [span["size"] for b in blocks for line in b["lines"] for span in line["spans"] if span["text"].strip()]
+    if not sizes:
+        return None
+    body_size = statistics.median(sizes)
+
+    rect = page.rect
+    top = rect.y0 + rect.height * _MARGIN_FRACTION
+    bottom = rect.y1 - rect.height * _MARGIN_FRACTION
+    boxes, classes = [], []
+    for block in blocks:
+        x0, y0, x1, y1 = block["bbox"]
+        block_size = max(span["size"] for line in block["lines"] for span in line["spans"])
+        if y1 <= top:
+            cls_name = "Page-header"
+        elif y0 >= bottom:
+            cls_name = "Page-footer"
+        elif block_size >= body_size * _HEADER_FONT_RATIO:
+            cls_name = "Section-header"
+        else:
+            cls_name = "Text"
+        boxes.append(_to_pixels(block["bbox"], rect, image_size))
+        classes.append(_CLASS_IDS[cls_name])
+    return PageDetections(boxes, classes, np.ones(len(boxes)), DOCLAYNET_NAMES, image_size)
+
+def box_texts(page, boxes, image_size):
+    """
+    Read the text inside each box from the text layer, no OCR involved
+
+    Args:
+        page (fitz.Page): The page
+        boxes (numpy.ndarray): (N, 4) boxes in pixels of a rendering of the page
+        image_size (tuple): (width, height) of that rendering
+
+    Returns:
+        list: One string per box, empty where the page has no text
+    """
+    rect = page.rect
+    sx = rect.width / image_size[0]
+    sy = rect.height / image_size[1]
+    texts = []
+    for x0, y0, x1, y1 in boxes:
+        clip = fitz.Rect(rect.x0 + x0 * sx, rect.y0 + y0 * sy, rect.x0 + x1 * sx, rect.y0 + y1 * sy)
+        texts.append(page.get_text("text", clip=clip).strip())
+    return texts
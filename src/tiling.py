@@ -0,0 +1,80 @@
+import math
+import numpy as np
+from .config import Config
+
+def needs_tiling(image_size, max_aspect=Config.TILE_MAX_ASPECT, max_pixels=Config.TILE_MAX_PIXELS):
+    """
+    Decide whether a page is too wide or too large for a single 640px pass
+
+    Args:
+        image_size (tuple): (width, height) of the page image
+        max_aspect (float): Long side / short side above which a page is tiled
+        max_pixels (int): Pixel count above which a page is tiled
+
+    Returns:
+        bool: True if the page should be tiled
+    """
+    width, height = image_size
+    return max(width, height) / max(min(width, height), 1) > max_aspect or width * height > max_pixels
+
+def _axis_starts(length, tile, step):
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - tile) / step) + 1
+    # Spread the tiles evenly so the last one ends exactly at the page edge
+    return [round(i * (length - tile) / (count - 1)) for i in range(count)]
+
+def make_tiles(image_size, tile_size=Config.TILE_SIZE, overlap=Config.TILE_OVERLAP):
+    """
+    Split a page into overlapping tiles
+
+    Args:
+        image_size (tuple): (width, height) of the page image
+        tile_size (int): Side of a square tile in pixels
+        overlap (float): Fraction of a tile shared with its neighbour
+
+    Returns:
+        list: (x0, y0, x1, y1) tile rectangles covering the page
+    """
+    width, height = image_size
+    step = max(1, int(tile_size * (1 - overlap)))
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in _axis_starts(height, tile_size, step)
+            for x in _axis_starts(width, tile_size, step)]
+
+def class_aware_nms(boxes, scores, classes, iou_threshold=Config.TILE_NMS_IOU,
+                    containment_threshold=0.85):
+    """
+    Non-maximum suppression that only compares boxes of the same class
+
+    Besides the usual IoU test, a box is dropped when most of it lies inside
+    a higher scoring box of its class, which removes the partial copies of an
+    object cut by a tile edge.
+
+    Args:
+        boxes (numpy.ndarray): (N, 4) boxes
+        scores (numpy.ndarray): (N,) confidence scores
+        classes (numpy.ndarray): (N,) class IDs
+        iou_threshold (float): IoU above which the lower scoring box is dropped
+        containment_threshold (float): Share of a box's area inside a kept box
+            above which it is dropped
+
+    Returns:
+        numpy.ndarray: Indices of the kept boxes, highest score first
+    """
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        contained = inter / np.maximum(areas[rest], 1e-6)
+        same_class = classes[rest] == classes[i]
+        order = rest[~(same_class & ((iou > iou_threshold) | (contained > containment_threshold)))]
+    return np.asarray(keep, dtype=np.int64)
@@ -1,6 +1,9 @@
 import glob
 import os
 from .config import Config
+from .log import get_logger
+
+logger = get_logger(__name__)
 
 def get_image_files(directory=Config.DEFAULT_OUTPUT_DIR):
     """Get all image files from a directory"""
@@ -18,8 +21,8 @@ def clear_directory(directory):
                     import shutil
                     shutil.rmtree(file_path)
             except Exception as e:
-                print(f"Error deleting {file_path}: {e}")
+                logger.warning("Error deleting %s: %s", file_path, e)
 
-def setup_environment():
+def setup_environment(output_root=None):
     """Set up the environment by creating necessary directories"""
-    Config.setup_directories()
\ No newline at end of file
+    Config.setup_directories(output_root)
\ No newline at end of file
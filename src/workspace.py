@@ -0,0 +1,71 @@
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from .config import Config
+
+_MARKER = ".job.json"
+_JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+class JobWorkspace:
+    """
+    Isolated output directory tree for one extraction job
+
+    Every job gets its own output_pages/, cropped_entities/ and detections/
+    under WORKSPACE_ROOT/<job_id>, so concurrent runs in one process or
+    across processes never clear or overwrite each other's files.
+    """
+
+    def __init__(self, job_id=None, root=Config.WORKSPACE_ROOT):
+        self.job_id = job_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        if not _JOB_ID_PATTERN.match(self.job_id):
+            raise ValueError(f"Invalid job id '{self.job_id}'")
+        self.root = os.path.join(root, self.job_id)
+        self.pages_dir, self.entities_dir, self.detections_dir = Config.output_dirs(self.root)
+        Config.setup_directories(self.root)
+        marker = os.path.join(self.root, _MARKER)
+        if not os.path.exists(marker):
+            with open(marker, "w", encoding="utf-8") as f:
+                json.dump({"job_id": self.job_id, "created": time.time()}, f)
+        self.touch()
+
+    def touch(self):
+        """Mark the workspace as recently used so TTL cleanup keeps it"""
+        os.utime(os.path.join(self.root, _MARKER), None)
+
+    def path(self, *parts):
+        """Return a path inside the workspace"""
+        return os.path.join(self.root, *parts)
+
+    def cleanup(self):
+        """Delete the workspace and everything in it"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @staticmethod
+    def cleanup_expired(root=Config.WORKSPACE_ROOT, ttl_seconds=Config.WORKSPACE_TTL_SECONDS):
+        """
+        Delete workspaces that have not been used for longer than ttl_seconds
+
+        Args:
+            root (str): Directory holding the job workspaces
+            ttl_seconds (float): Maximum idle time before a workspace is removed
+
+        Returns:
+            list: Job IDs that were removed
+        """
+        removed = []
+        if not os.path.isdir(root):
+            return removed
+        cutoff = time.time() - ttl_seconds
+        for job_id in os.listdir(root):
+            marker = os.path.join(root, job_id, _MARKER)
+            try:
+                if os.path.getmtime(marker) < cutoff:
+                    shutil.rmtree(os.path.join(root, job_id), ignore_errors=True)
+                    removed.append(job_id)
+            except OSError:
+                # Not a workspace, or removed concurrently
+                continue
+        return removed
@@ -113,10 +113,15 @@
 import streamlit as st
 import time
 import os
-import tempfile
+import hashlib
 from PIL import Image
 from main import process_pdf
 from src.config import Config
+from src.entity_cropper import open_entity
+from src.layout_detector import LayoutDetector
+from src.manifest import ManifestReader
+from src.overlay import OverlayRenderer
+from src.workspace import JobWorkspace
 
 # Page configuration - MUST be the first Streamlit command
 st.set_page_config(
@@ -125,6 +130,16 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource(show_spinner="Loading layout model...")
+def warm_up_model():
+    """Load and warm the shared model once per server process, not per click"""
+    return LayoutDetector().warm_up()
+
+try:
+    warm_up_model()
+except Exception as _e:
+    st.sidebar.warning(f"Model warm-up failed, it will be retried on first use: {_e}")
+
 # Initialize session state
 # Version info for diagnostics
 try:
@@ -191,11 +206,28 @@ st.markdown("""
 # App title
 st.markdown('<h1 class="main-header">Document Layout Analyzer</h1>', unsafe_allow_html=True)
 
+def get_workspace():
+    """Return this browser session's job workspace, creating it on first use"""
+    if 'workspace' not in st.session_state:
+        # Sweep workspaces of sessions that went idle long ago
+        JobWorkspace.cleanup_expired()
+        st.session_state.workspace = JobWorkspace()
+    return st.session_state.workspace
+
+def release_entities():
+    """Drop the entities of the previous run, closing their store and its spill file"""
+    entities = st.session_state.pop("entities", None)
+    if entities is not None:
+        entities.close()
+
 def process_pdf_file(pdf_path):
     """Process the PDF file and return entities"""
     try:
-        # Process the PDF
-        entities = process_pdf(pdf_path)
+        # Process the PDF, re-uploads of the same document are served from the cache
+        # Crops are rendered lazily when the gallery shows them
+        # The checkpoint journal keeps the detections the overlays are drawn from
+        entities = process_pdf(pdf_path, use_cache=True, workspace=get_workspace(),
+                               output_format="lazy", checkpoint=True)
         return entities
     except Exception as e:
         import traceback, sys
@@ -208,10 +240,17 @@ def process_pdf_file(pdf_path):
 uploaded_file = st.file_uploader("Upload a PDF document", type="pdf")
 
 if uploaded_file is not None:
-    # Save uploaded file to temporary location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        pdf_path = tmp_file.name
+    # Keep the upload in the session workspace, lazy crops are rendered from it
+    # and workspace TTL cleanup removes it
+    pdf_path = get_workspace().path("source.pdf")
+    pdf_bytes = uploaded_file.getvalue()
+    upload_digest = hashlib.sha256(pdf_bytes).hexdigest()
+    # Every widget click reruns the script; rewriting the same bytes would
+    # change the file's mtime and drop the lazy crop cache
+    if st.session_state.get("upload_digest") != upload_digest or not os.path.exists(pdf_path):
+        with open(pdf_path, "wb") as pdf_file:
+            pdf_file.write(pdf_bytes)
+        st.session_state.upload_digest = upload_digest
     
     # Process button
     if st.button("Analyze Document Layout", type="primary"):
@@ -219,17 +258,11 @@ if uploaded_file is not None:
             # Process the PDF
             entities = process_pdf_file(pdf_path)
             if entities is not None:
-                # Store in session state
+                # Store in session state, replacing the previous run's store
+                release_entities()
                 st.session_state.entities = entities
                 st.session_state.processed = True
     
-    # Clean up temporary file
-    if os.path.exists(pdf_path):
-        try:
-            os.unlink(pdf_path)
-        except Exception as e:
-            print(f"Warning: Could not delete temporary file: {e}")
-    
     # Display results if processing is complete
     if hasattr(st.session_state, 'processed') and st.session_state.processed:
         st.success("Document processing complete!")
@@ -273,43 +306,46 @@ if uploaded_file is not None:
         if hasattr(st.session_state, 'selected_entity'):
             if st.session_state.selected_entity == "detections":
                 st.subheader("Detection Results")
-                detection_dir = os.path.join(os.getcwd(), "detections")
+                try:
+                    renderer = OverlayRenderer(get_workspace().root)
+                except FileNotFoundError:
+                    renderer = None
                 
-                if os.path.exists(detection_dir):
-                    # Find all predict* folders and sort them
-                    predict_folders = sorted([f for f in os.listdir(detection_dir) 
-                                           if os.path.isdir(os.path.join(detection_dir, f)) 
-                                           and f.startswith('predict')])
-                    
-                    if predict_folders:
-                        st.markdown('<div class="image-grid">', unsafe_allow_html=True)
-                        
-                        for folder in predict_folders:
-                            folder_path = os.path.join(detection_dir, folder)
-                            # Look for image files in the folder
-                            image_files = [f for f in os.listdir(folder_path) 
-                                         if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-                            
-                            if image_files:
-                                # Take the first image in each predict folder
-                                img_path = os.path.join(folder_path, image_files[0])
-                                try:
-                                    img = Image.open(img_path)
-                                    st.image(img, caption=f"{folder} - {os.path.basename(img_path)}", use_column_width=True)
-                                except Exception as e:
-                                    st.error(f"Error loading image {img_path}: {e}")
-                        
-                        st.markdown('</div>', unsafe_allow_html=True)
-                    else:
-                        st.warning("No prediction folders found in the detections directory.")
+                if renderer is not None and renderer.pages():
+                    # Overlays are drawn from the stored detections, only for the pages shown
+                    pages = renderer.pages()
+                    page_num = st.selectbox("Page", pages, format_func=lambda p: f"Page {p}")
+                    try:
+                        img_path = renderer.render(page_num)
+                        st.image(Image.open(img_path), caption=f"Page {page_num}", use_column_width=True)
+                    except Exception as e:
+                        st.error(f"Error drawing detections for page {page_num}: {e}")
+                    finally:
+                        renderer.close()
                 else:
-                    st.warning("Detections directory not found.")
+                    st.warning("No stored detections found for this document.")
             
             elif st.session_state.selected_entity == "cropped_entities":
                 st.subheader("Cropped Entities")
-                cropped_entities_dir = os.path.join(os.getcwd(), "cropped_entities")
+                cropped_entities_dir = get_workspace().entities_dir
+                
+                if ManifestReader.exists(cropped_entities_dir):
+                    # Manifest output: one tab per class, crops read back (or rendered) by ID
+                    manifest = ManifestReader(cropped_entities_dir)
+                    by_class = manifest.entities_by_class()
+                    tabs = st.tabs([c.capitalize() for c in by_class])
+                    for tab, (cls_name, entity_ids) in zip(tabs, by_class.items()):
+                        with tab:
+                            st.markdown(f'<h3>{cls_name.capitalize()} Entities</h3>', unsafe_allow_html=True)
+                            st.markdown('<div class="image-grid">', unsafe_allow_html=True)
+                            for entity_id in entity_ids:
+                                try:
+                                    st.image(open_entity(entity_id, cropped_entities_dir), caption=entity_id, use_column_width=True)
+                                except Exception as e:
+                                    st.error(f"Error loading image {entity_id}: {e}")
+                            st.markdown('</div>', unsafe_allow_html=True)
                 
-                if os.path.exists(cropped_entities_dir):
+                elif os.path.exists(cropped_entities_dir):
                     # Get all entity type folders
                     entity_folders = [f for f in os.listdir(cropped_entities_dir) 
                                    if os.path.isdir(os.path.join(cropped_entities_dir, f))]
@@ -352,7 +388,7 @@ if uploaded_file is not None:
                 entity_files = st.session_state.entities[st.session_state.selected_entity]
                 for img_path in entity_files:
                     try:
-                        img = Image.open(img_path)
+                        img = open_entity(img_path, get_workspace().entities_dir)
                         st.image(img, caption=os.path.basename(img_path), use_column_width=True)
                     except Exception as e:
                         st.error(f"Error loading image {img_path}: {e}")
@@ -364,8 +400,7 @@ else:
     # Reset processing state if no file is uploaded
     if 'processed' in st.session_state:
         del st.session_state.processed
-    if 'entities' in st.session_state:
-        del st.session_state.entities
+    release_entities()
 
 # Footer
 st.markdown("---")
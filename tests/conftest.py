@@ -0,0 +1,66 @@
+import fitz
+import numpy as np
+import pytest
+from src.detections import PageDetections
+
+NAMES = {0: "Caption", 1: "Picture", 2: "Table", 3: "Text"}
+
+class StubDetector:
+    """
+    Stands in for LayoutDetector without loading a model
+
+    Every page gets the same three boxes at fixed fractions of its size,
+    so results only depend on the page image size.
+    """
+
+    def __init__(self, **kwargs):
+        self.calls = []
+
+    def settings(self):
+        return {"model": "stub"}
+
+    def warm_up(self):
+        return None
+
+    def detect_pages(self, images, batch_size=None, save=False, conf=None, tiling=False, pages=None,
+                     metrics=None):
+        self.calls.append(list(pages) if pages is not None else [None] * len(images))
+        detections = []
+        for image in images:
+            width, height = image.size
+            boxes = np.array([[0.1, 0.05, 0.9, 0.2], [0.1, 0.3, 0.5, 0.6], [0.55, 0.3, 0.9, 0.9]])
+            detections.append(PageDetections(boxes * [width, height, width, height], [3, 1, 2],
+                                             [0.9, 0.8, 0.7], NAMES, image.size))
+        return detections
+
+@pytest.fixture
+def class_names():
+    """Class names of the stub model, as ultralytics reports them in results.names"""
+    return dict(NAMES)
+
+@pytest.fixture
+def stub_detector(monkeypatch):
+    """Make main.iter_process_pdf use StubDetector instead of the YOLO model"""
+    import main
+    monkeypatch.setattr(main, "LayoutDetector", StubDetector)
+    return StubDetector
+
+def build_pdf(path, pages=4, words=("alpha", "beta", "gamma", "delta")):
+    """Write a small PDF whose pages differ in their text"""
+    doc = fitz.open()
+    for index in range(pages):
+        page = doc.new_page(width=200, height=260)
+        page.insert_text((20, 30), f"Page {index + 1} {words[index % len(words)]}", fontsize=12)
+        page.draw_rect(fitz.Rect(20, 80, 100, 150), color=(0, 0, 1), fill=(0.8, 0.8, 1))
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+@pytest.fixture
+def make_pdf():
+    """build_pdf for tests that need several PDFs"""
+    return build_pdf
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    return build_pdf(tmp_path / "sample.pdf")
@@ -0,0 +1,99 @@
+import json
+import os
+import pytest
+import main
+from src.checkpoint import CheckpointJournal
+from src.config import Config
+from src.entity_cropper import TEXT_FILE
+from src.manifest import ManifestReader
+
+class Killed(BaseException):
+    """Stops a run the way a kill would, past every except Exception"""
+
+def _run(pdf_path, output_root, **options):
+    return [result.page_num for result in main.iter_process_pdf(pdf_path, output_root=output_root, **options)]
+
+def _outputs(output_root, output_format):
+    entities_dir = Config.output_dirs(output_root)[1]
+    if output_format == "files":
+        return sorted(os.path.relpath(os.path.join(d, f), entities_dir)
+                      for d, _, files in os.walk(entities_dir) for f in files if f != TEXT_FILE)
+    return [record["id"] for record in ManifestReader(entities_dir).records]
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path, monkeypatch, stub_detector):
+    monkeypatch.chdir(tmp_path)
+
+def _crash_after_crop(monkeypatch, page):
+    page_done = CheckpointJournal.page_done
+
+    def crashing(self, page_num, *args):
+        # The page's crops are written, its journal record is not
+        if page_num == page:
+            raise Killed()
+        return page_done(self, page_num, *args)
+
+    monkeypatch.setattr(CheckpointJournal, "page_done", crashing)
+
+@pytest.mark.parametrize("output_format", ["files", "manifest"])
+def test_resume_after_a_crash_matches_a_clean_run(tmp_path, monkeypatch, sample_pdf, output_format):
+    _run(sample_pdf, str(tmp_path / "clean"), output_format=output_format, attach_text=True)
+    expected = _outputs(str(tmp_path / "clean"), output_format)
+
+    output_root = str(tmp_path / "resumed")
+    with monkeypatch.context() as patch:
+        _crash_after_crop(patch, 3)
+        with pytest.raises(Killed):
+            _run(sample_pdf, output_root, output_format=output_format, attach_text=True, resume=True)
+
+    detected = []
+    detect_pages = main.LayoutDetector.detect_pages
+    monkeypatch.setattr(main.LayoutDetector, "detect_pages",
+                        lambda self, images, **kwargs: detected.extend(kwargs["pages"]) or
+                        detect_pages(self, images, **kwargs))
+    assert _run(sample_pdf, output_root, output_format=output_format, attach_text=True, resume=True) == [1, 2, 3, 4]
+    assert detected == [3, 4]
+
+    outputs = _outputs(output_root, output_format)
+    assert outputs == expected
+    assert len(outputs) == len(set(outputs))
+    entities_dir = Config.output_dirs(output_root)[1]
+    if output_format == "manifest":
+        reader = ManifestReader(entities_dir)
+        assert reader.boxes().shape == (len(reader.records), 4)
+    else:
+        with open(os.path.join(entities_dir, TEXT_FILE), encoding="utf-8") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        assert len(ids) == len(set(ids)) == len(outputs)
+
+def test_retry_failed_only_reruns_failed_pages(tmp_path, monkeypatch, sample_pdf):
+    output_root = str(tmp_path / "out")
+    with monkeypatch.context() as patch:
+        crop = main.EntityCropper.crop_entities_from_results
+
+        def failing(self, image, results, page_no, **kwargs):
+            if page_no == 2:
+                raise RuntimeError("encoder broke")
+            return crop(self, image, results, page_no, **kwargs)
+
+        patch.setattr(main.EntityCropper, "crop_entities_from_results", failing)
+        assert _run(sample_pdf, output_root, resume=True) == [1, 3, 4]
+
+    journal = CheckpointJournal.load(CheckpointJournal.path_for(output_root))
+    assert journal.completed_pages() == [1, 3, 4]
+    assert list(journal.failed_pages()) == [2]
+    assert _run(sample_pdf, output_root, retry_failed=True) == [1, 3, 4, 2]
+    assert CheckpointJournal.load(CheckpointJournal.path_for(output_root)).completed_pages() == [1, 2, 3, 4]
+
+def test_resume_with_changed_settings_starts_over(tmp_path, sample_pdf):
+    output_root = str(tmp_path / "out")
+    _run(sample_pdf, output_root, resume=True, pages="1-2")
+    assert _run(sample_pdf, output_root, resume=True, include_classes=["Table"]) == [1, 2, 3, 4]
+    assert {path.split(os.sep)[0] for path in _outputs(output_root, "files")} == {"Table"}
+
+def test_no_journal_unless_asked_for(tmp_path, sample_pdf):
+    _run(sample_pdf, str(tmp_path / "plain"))
+    assert not os.path.exists(CheckpointJournal.path_for(str(tmp_path / "plain")))
+    _run(sample_pdf, str(tmp_path / "journaled"), checkpoint=True)
+    journal = CheckpointJournal.load(CheckpointJournal.path_for(str(tmp_path / "journaled")))
+    assert journal.completed_pages() == [1, 2, 3, 4]
@@ -0,0 +1,54 @@
+import os
+import shutil
+import numpy as np
+from PIL import Image
+from src.crop_cache import CropCache, LazyCropSource
+
+RECORD = {"id": "page001_Text_001", "page": 1, "bbox": [0, 0, 200, 60], "image_size": [200, 260]}
+
+def _overwrite(path, source):
+    stat = os.stat(path)
+    shutil.copyfile(source, path)
+    # A later write, even on file systems with coarse timestamps
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_crop_cache_evicts_least_recently_used():
+    cache = CropCache(max_bytes=2 * 10 * 10 * 3)
+    for key in "abc":
+        cache.put(key, Image.new("RGB", (10, 10)))
+        if key == "b":
+            cache.get("a")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_source_is_replaced_when_the_pdf_is_overwritten(tmp_path, make_pdf):
+    pdf_path = make_pdf(tmp_path / "source.pdf", words=("first",))
+    other = make_pdf(tmp_path / "other.pdf", words=("a completely different headline",))
+    entities_dir = str(tmp_path / "entities")
+    LazyCropSource.write_source(entities_dir, pdf_path, dpi=72)
+    source = LazyCropSource.for_dir(entities_dir)
+    before = np.asarray(source.crop(RECORD))
+    assert LazyCropSource.for_dir(entities_dir) is source
+
+    _overwrite(pdf_path, other)
+    fresh = LazyCropSource.for_dir(entities_dir)
+    assert fresh is not source
+    after = np.asarray(fresh.crop(RECORD))
+    assert before.shape != after.shape or (before != after).any()
+    LazyCropSource.invalidate(entities_dir)
+
+def test_writing_a_new_source_invalidates_the_cached_one(tmp_path, make_pdf):
+    first = make_pdf(tmp_path / "first.pdf", words=("first",))
+    second = make_pdf(tmp_path / "second.pdf", words=("second",))
+    entities_dir = str(tmp_path / "entities")
+    LazyCropSource.write_source(entities_dir, first, dpi=72)
+    source = LazyCropSource.for_dir(entities_dir)
+    source.crop(RECORD)
+
+    LazyCropSource.write_source(entities_dir, second, dpi=72)
+    fresh = LazyCropSource.for_dir(entities_dir)
+    assert fresh is not source
+    assert fresh.pdf_path == os.path.abspath(second)
+    assert fresh.cache.get(RECORD["id"]) is None
+    LazyCropSource.invalidate(entities_dir)
+    assert os.path.abspath(entities_dir) not in LazyCropSource._sources
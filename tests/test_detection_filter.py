@@ -0,0 +1,39 @@
+import numpy as np
+from src.detections import DetectionFilter, PageDetections
+
+def _detections(names):
+    # Text (large, confident), Picture (small), Table (low score), an inverted Text box
+    # and an unnamed class 7
+    boxes = [[0, 0, 50, 40], [0, 0, 5, 4], [10, 10, 60, 60], [30, 30, 20, 40], [0, 0, 20, 20]]
+    return PageDetections(boxes, [3, 1, 2, 3, 7], [0.9, 0.8, 0.3, 0.9, 0.6], names, (100, 100))
+
+def test_inactive_filter_only_drops_invalid_boxes(class_names):
+    detection_filter = DetectionFilter()
+    assert not detection_filter.active
+    assert detection_filter.mask(_detections(class_names)).tolist() == [True, True, True, False, True]
+
+def test_include_and_exclude_match_class_names_case_insensitively(class_names):
+    mask = DetectionFilter(include_classes=["text", "TABLE"]).mask(_detections(class_names))
+    assert mask.tolist() == [True, False, True, False, False]
+    mask = DetectionFilter(exclude_classes=["Picture", "7"]).mask(_detections(class_names))
+    assert mask.tolist() == [True, False, True, False, False]
+
+def test_per_class_confidence(class_names):
+    mask = DetectionFilter(min_confidence={"Table": 0.5}).mask(_detections(class_names))
+    assert mask.tolist() == [True, True, False, False, True]
+
+def test_area_fractions_with_class_overrides(class_names):
+    # Areas: Text 0.2, Picture 0.002, Table 0.25, class 7 0.04 of the page
+    mask = DetectionFilter(default_min_area=0.01).mask(_detections(class_names))
+    assert mask.tolist() == [True, False, True, False, True]
+    mask = DetectionFilter(default_min_area=0.01, min_area={"picture": 0.001, "Table": 0.3}).mask(_detections(class_names))
+    assert mask.tolist() == [True, True, False, False, True]
+
+def test_empty_detections(class_names):
+    empty = PageDetections(np.zeros((0, 4)), [], [], class_names, (100, 100))
+    assert DetectionFilter(include_classes=["Text"]).mask(empty).tolist() == []
+
+def test_settings_are_stable_for_fingerprints():
+    a = DetectionFilter(include_classes=["Table", "text"], min_confidence={"Table": 0.5})
+    b = DetectionFilter(include_classes=["TEXT", "table"], min_confidence={"table": 0.5})
+    assert a.settings() == b.settings()
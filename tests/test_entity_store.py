@@ -0,0 +1,26 @@
+import os
+from src.entity_store import EntityStore
+
+def test_stores_in_one_directory_spill_to_their_own_files(tmp_path):
+    first = EntityStore(str(tmp_path), max_in_memory=2)
+    second = EntityStore(str(tmp_path), max_in_memory=2)
+    for page in range(3):
+        first.add({"Text": [f"a{page}-0", f"a{page}-1"], "Table": [f"a{page}-t"]})
+        second.add({"Text": [f"b{page}"]})
+    assert first.spilled and second.spilled
+    assert first.path != second.path and os.path.dirname(first.path) == str(tmp_path)
+
+    first.close()
+    assert second["Text"] == ["b0", "b1", "b2"]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(second.path)]
+    second.close()
+    assert os.listdir(tmp_path) == []
+
+def test_spilled_references_keep_page_order(tmp_path):
+    store = EntityStore(str(tmp_path), max_in_memory=3)
+    for page in range(5):
+        store.add({"Text": [f"p{page}-0", f"p{page}-1"]})
+    assert store.spilled
+    assert store["Text"] == [f"p{page}-{i}" for page in range(5) for i in range(2)]
+    assert store.counts() == {"Text": 10}
+    store.close()
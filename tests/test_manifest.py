@@ -0,0 +1,91 @@
+import io
+import os
+import tarfile
+import numpy as np
+from PIL import Image
+from src.entity_cropper import encode_crop
+from src.manifest import BOXES_FILE, ManifestReader, ManifestWriter
+
+def _crop(value, size=(12, 8)):
+    return encode_crop(Image.new("RGB", size, (value, value, value)), "png")
+
+def _write_pages(writer, pages, per_page=3):
+    for page in pages:
+        for idx in range(1, per_page + 1):
+            box = (page * 10 + idx, idx, page * 10 + idx + 5, idx + 5)
+            writer.add(f"page{page:03d}_Text_{idx:03d}", page, "Text", 0.5, box, _crop(page * 20 + idx), "png")
+
+def test_round_trip_reads_crops_and_aligned_boxes(tmp_path):
+    writer = ManifestWriter(str(tmp_path))
+    _write_pages(writer, [1, 2])
+    writer.close()
+
+    reader = ManifestReader(str(tmp_path))
+    assert [r["id"] for r in reader.records][:2] == ["page001_Text_001", "page001_Text_002"]
+    assert reader.entities_by_class(page_no=2) == {"Text": [f"page002_Text_{i:03d}" for i in (1, 2, 3)]}
+    np.testing.assert_allclose(reader.boxes(), [r["bbox"] for r in reader.records])
+    assert reader.read_crop_bytes("page002_Text_003") == _crop(43)
+    assert reader.open_crop("page001_Text_002").getpixel((0, 0)) == (22, 22, 22)
+
+def test_npy_crops_round_trip(tmp_path):
+    writer = ManifestWriter(str(tmp_path))
+    array = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    writer.add("page001_Picture_001", 1, "Picture", 0.9, (0, 0, 3, 2), encode_crop(array, "npy"), "npy")
+    writer.close()
+    np.testing.assert_array_equal(np.asarray(ManifestReader(str(tmp_path)).open_crop("page001_Picture_001")), array)
+
+def test_boxes_stay_aligned_across_appending_runs(tmp_path):
+    writer = ManifestWriter(str(tmp_path))
+    _write_pages(writer, [1])
+    writer.close()
+    writer = ManifestWriter(str(tmp_path))
+    _write_pages(writer, [2, 3])
+    writer.close()
+
+    reader = ManifestReader(str(tmp_path))
+    assert len(reader.records) == 9
+    np.testing.assert_allclose(reader.boxes(), [r["bbox"] for r in reader.records])
+
+def test_boxes_fall_back_to_rows_when_run_was_not_closed(tmp_path):
+    writer = ManifestWriter(str(tmp_path))
+    _write_pages(writer, [1])
+    writer.close()
+    # A second run killed before close() leaves boxes.npy one page short
+    killed = ManifestWriter(str(tmp_path))
+    _write_pages(killed, [2])
+    killed._manifest.flush()
+
+    reader = ManifestReader(str(tmp_path))
+    assert len(np.load(os.path.join(tmp_path, BOXES_FILE))) == 3
+    assert reader.boxes().shape == (6, 4)
+    np.testing.assert_allclose(reader.boxes(), [r["bbox"] for r in reader.records])
+
+def test_trim_drops_unfinished_pages_and_keeps_shards_readable(tmp_path):
+    writer = ManifestWriter(str(tmp_path), shard_bytes=4096)
+    _write_pages(writer, [1, 2, 3, 4])
+    assert writer.trim({1, 2}) == 6
+    _write_pages(writer, [3])
+    writer.close()
+
+    reader = ManifestReader(str(tmp_path))
+    ids = [r["id"] for r in reader.records]
+    assert len(ids) == len(set(ids)) == 9
+    assert sorted({r["page"] for r in reader.records}) == [1, 2, 3]
+    assert reader.boxes().shape == (9, 4)
+    for record in reader.records:
+        page, idx = record["page"], int(record["id"][-3:])
+        assert reader.read_crop_bytes(record["id"]) == _crop(page * 20 + idx)
+    for name in os.listdir(tmp_path):
+        if name.endswith(".tar"):
+            with tarfile.open(os.path.join(tmp_path, name)) as shard:
+                for member in shard.getmembers():
+                    Image.open(io.BytesIO(shard.extractfile(member).read())).load()
+
+def test_trim_ignores_a_row_cut_short_by_a_crash(tmp_path):
+    writer = ManifestWriter(str(tmp_path))
+    _write_pages(writer, [1])
+    writer._manifest.write('{"id": "page002_Te')
+    writer._manifest.flush()
+    assert writer.trim({1}) == 0
+    writer.close()
+    assert len(ManifestReader(str(tmp_path)).records) == 3
@@ -0,0 +1,17 @@
+import pytest
+from src.model_registry import export_weights
+
+def test_openvino_int8_requires_calibration_data(tmp_path):
+    with pytest.raises(ValueError, match="calibration"):
+        export_weights("weights.pt", backend="openvino", int8=True, export_dir=str(tmp_path),
+                       calibration_data=None)
+
+def test_cached_exports_are_keyed_on_image_size(tmp_path):
+    for name in ("weights-640.onnx", "weights-1024-int8.onnx"):
+        (tmp_path / name).write_bytes(b"")
+    # Cached exports are returned without exporting again
+    assert export_weights("weights.pt", backend="onnx", export_dir=str(tmp_path),
+                          image_size=640).endswith("weights-640.onnx")
+    assert export_weights("weights.pt", backend="onnx", int8=True, export_dir=str(tmp_path),
+                          image_size=1024).endswith("weights-1024-int8.onnx")
+    assert export_weights("weights.pt", backend="torch") == "weights.pt"
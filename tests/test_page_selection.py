@@ -0,0 +1,43 @@
+import pytest
+from src.page_selection import StopCondition, parse_page_ranges, select_pages
+
+@pytest.mark.parametrize("spec, expected", [
+    ("1-5,40,90-95", [1, 2, 3, 4, 5, 40, 90, 91, 92, 93, 94, 95]),
+    ("3, 1 ,3", [1, 3]),
+    ("98-", [98, 99, 100]),
+    ("-3", [1, 2, 3]),
+    ("0,101,99-120", [99, 100]),
+    ("", []),
+    ([7, "2", 500], [2, 7]),
+])
+def test_parse_page_ranges(spec, expected):
+    assert parse_page_ranges(spec, 100) == expected
+
+@pytest.mark.parametrize("spec", ["a", "1-b", "1,,x-2", "5-3", "1-2,9-4"])
+def test_parse_page_ranges_rejects_garbage(spec):
+    with pytest.raises(ValueError):
+        parse_page_ranges(spec, 10)
+
+def test_select_pages_samples_then_truncates():
+    assert select_pages(10) == list(range(1, 11))
+    assert select_pages(10, every=3) == [1, 4, 7, 10]
+    assert select_pages(10, pages="2-9", every=2, first_pages=3) == [2, 4, 6]
+    assert select_pages(10, first_pages=0) == []
+
+def test_stop_condition_per_class_and_overall_limits():
+    assert not StopCondition().active
+    overall = StopCondition(max_entities=3)
+    assert overall.update({"Text": [1, 2], "Table": [1]}) is None
+    assert "Text" in overall.update({"Text": [3]})
+
+    per_class = StopCondition(max_entities={"table": 2})
+    assert per_class.update({"Text": list(range(10)), "Table": [1]}) is None
+    assert "Table" in per_class.update({"Table": [2]})
+
+def test_stop_condition_time_budget(monkeypatch):
+    condition = StopCondition(time_budget=5)
+    assert condition.active
+    monkeypatch.setattr("src.page_selection.time.time", lambda: condition.started + 4)
+    assert condition.update({}) is None
+    monkeypatch.setattr("src.page_selection.time.time", lambda: condition.started + 5)
+    assert "time budget" in condition.update({})
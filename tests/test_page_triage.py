@@ -0,0 +1,49 @@
+import io
+import random
+import fitz
+import numpy as np
+from PIL import Image
+from src.page_triage import PageTriage, page_hash
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed"]
+
+def render_text_page(seed, dpi=150):
+    """Render a page of 40 lines of words, the same layout for every seed"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    for line in range(40):
+        page.insert_text((50, 60 + line * 17), " ".join(rng.choice(WORDS) for _ in range(9)), fontsize=10)
+    pixmap = page.get_pixmap(dpi=dpi)
+    doc.close()
+    return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+def rescan(image, seed=0):
+    """Add sensor noise and a lossy JPEG round trip, like a scanned copy"""
+    pixels = np.asarray(image, dtype=np.float32)
+    noisy = pixels + np.random.default_rng(seed).normal(0, 12, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=60)
+    return Image.open(io.BytesIO(buffer.getvalue())).convert("RGB")
+
+def thumb_hash(image, size=128):
+    thumbnail = image.copy()
+    thumbnail.thumbnail((size, size))
+    return page_hash(thumbnail)
+
+def test_noisy_copy_is_a_duplicate():
+    triage = PageTriage(dedup=True)
+    original = render_text_page(1)
+    copy = rescan(original)
+    assert triage.find_original(1, thumb_hash(original), original) is None
+    assert triage.find_original(2, thumb_hash(copy), copy) == 1
+
+def test_same_layout_with_other_text_is_not_a_duplicate():
+    # Accept every hash as a candidate, so only the pixel check decides
+    triage = PageTriage(dedup=True, max_distance=256)
+    first, second = render_text_page(1), render_text_page(2)
+    assert triage.find_original(1, thumb_hash(first), first) is None
+    assert triage.find_original(2, thumb_hash(second), second) is None
+    # Both are originals now, a copy of the second matches the second
+    copy = rescan(second)
+    assert triage.find_original(3, thumb_hash(copy), copy) == 2
@@ -0,0 +1,65 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+from src.service import ExtractionService, start_service, validate_options
+
+@pytest.mark.parametrize("options, expected", [
+    ({"pages": 5, "batch_size": 8}, {"pages": "5", "batch_size": 8}),
+    ({"pages": [3, 1], "include_classes": "Table,Picture"},
+     {"pages": [3, 1], "include_classes": ["Table", "Picture"]}),
+    ({"min_confidence": {"Table": 0.5}, "max_entities": {"Table": 3}, "max_memory": "2GB", "tiling": True},
+     {"min_confidence": {"Table": 0.5}, "max_entities": {"Table": 3}, "max_memory": "2GB", "tiling": True}),
+])
+def test_valid_options_pass(options, expected):
+    assert validate_options(options) == expected
+
+@pytest.mark.parametrize("options", [
+    {"device": "cuda:0"},
+    {"batch_size": 10_000},
+    {"batch_size": "4"},
+    {"queue_depth": 0},
+    {"two_pass": 1},
+    {"crop_quality": 101},
+    {"crop_format": "gif"},
+    {"pages": "1-x"},
+    {"pages": True},
+    {"min_confidence": {"Table": 2}},
+    {"max_memory": "lots"},
+    {"include_classes": [1]},
+])
+def test_invalid_options_are_refused(options):
+    with pytest.raises(ValueError, match=next(iter(options))):
+        validate_options(options)
+
+@pytest.fixture
+def server(sample_pdf, tmp_path):
+    # Not started: jobs stay queued, which is all the request checks need
+    service = ExtractionService(process_fn=None, workspace_root=str(tmp_path / "jobs"))
+    server = start_service(service, port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}", service, sample_pdf
+    server.shutdown()
+    server.server_close()
+
+def request(url, data=None, content_type="application/pdf"):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            return response.status, json.loads(response.read().splitlines()[0])
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_bad_requests_get_400(server):
+    url, service, pdf_path = server
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    status, body = request(f"{url}/jobs?pages=5&batch_size=2", data)
+    assert status == 202
+    assert service.jobs[body["job_id"]].options == {"pages": "5", "batch_size": 2}
+
+    assert request(f"{url}/jobs?batch_size=100000", data)[0] == 400
+    assert request(f"{url}/jobs", b'{"pdf_path": 7}', "application/json")[0] == 400
+    assert request(f"{url}/jobs", b'{"options": {"pages": 1.5}}', "application/json")[0] == 400
+    assert request(f"{url}/jobs/{body['job_id']}/pages?since=abc")[0] == 400
+    assert request(f"{url}/jobs/{body['job_id']}/result?wait=soon")[0] == 400
+    assert request(f"{url}/jobs/{body['job_id']}/result?wait=nan")[0] == 400
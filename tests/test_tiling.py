@@ -0,0 +1,79 @@
+import numpy as np
+from PIL import Image
+from src.layout_detector import LayoutDetector
+from src.tiling import class_aware_nms, make_tiles, needs_tiling
+
+def test_needs_tiling_for_wide_or_large_pages():
+    assert not needs_tiling((1700, 2200))
+    assert needs_tiling((3400, 1100), max_aspect=1.8)
+    assert needs_tiling((3000, 3000), max_pixels=6_000_000)
+
+def test_tiles_cover_the_page_with_overlap():
+    tiles = make_tiles((4000, 1500), tile_size=1600, overlap=0.2)
+    assert tiles[0][:2] == (0, 0)
+    assert max(t[2] for t in tiles) == 4000 and max(t[3] for t in tiles) == 1500
+    xs = sorted({t[0] for t in tiles})
+    assert all(b - a <= 1600 * 0.8 for a, b in zip(xs, xs[1:]))
+    assert make_tiles((800, 600), tile_size=1600) == [(0, 0, 800, 600)]
+
+def test_nms_suppresses_overlaps_and_partial_copies_within_a_class():
+    boxes = np.array([
+        [0, 0, 100, 100],     # 0: Text, best
+        [5, 5, 105, 105],     # 1: Text, high IoU with 0
+        [0, 0, 40, 90],       # 2: Text, mostly inside 0 (a copy cut by a tile edge)
+        [0, 0, 100, 100],     # 3: Table on the same spot, other class
+        [300, 300, 400, 400], # 4: Text elsewhere
+    ], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.85, 0.5, 0.4], dtype=np.float32)
+    classes = np.array([3, 3, 3, 2, 3])
+    assert class_aware_nms(boxes, scores, classes, iou_threshold=0.5).tolist() == [0, 3, 4]
+
+def test_nms_of_nothing():
+    assert class_aware_nms(np.zeros((0, 4)), np.zeros(0), np.zeros(0)).tolist() == []
+
+class _Array:
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+class _Boxes:
+    def __init__(self, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, 6)
+        self.xyxy, self.conf, self.cls = _Array(rows[:, :4]), _Array(rows[:, 4]), _Array(rows[:, 5])
+
+class _Result:
+    def __init__(self, image, rows, names):
+        self.names = names
+        self.orig_shape = (image.size[1], image.size[0])
+        self.boxes = _Boxes(rows)
+
+def test_tiled_detection_merges_an_object_cut_by_tile_edges(monkeypatch, class_names):
+    page = Image.new("RGB", (4000, 1500), "white")
+    table = np.array([1200, 300, 1900, 900], dtype=np.float32)
+    tiles = make_tiles(page.size)
+
+    def predict(self, sources, **kwargs):
+        # The whole page comes first, then the tiles in make_tiles order
+        results = []
+        for source, (x0, y0, x1, y1) in zip(sources, [(0, 0) + page.size] + tiles):
+            clipped = np.clip(table, [x0, y0, x0, y0], [x1, y1, x1, y1])
+            visible = np.prod(clipped[2:] - clipped[:2]) / np.prod(table[2:] - table[:2])
+            rows = []
+            if visible > 0:
+                # Tiles see the table sharper than the downscaled page, partial copies less so
+                score = 0.6 if (x0, y0) == (0, 0) and x1 == page.size[0] else 0.9 * visible
+                rows.append([*(clipped - [x0, y0, x0, y0]), score, 2])
+            results.append(_Result(source, rows, class_names))
+        return results
+
+    monkeypatch.setattr(LayoutDetector, "_predict", predict)
+    detections = LayoutDetector().detect_pages([page], tiling=True)[0]
+    assert len(detections) == 1
+    assert detections.class_name(detections.classes[0]) == "Table"
+    np.testing.assert_allclose(detections.boxes[0], table)
+    assert detections.image_size == page.size